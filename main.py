@@ -1,29 +1,42 @@
 # rtcdp_api_kit/main.py
 
 from rtcdp.cli.main import launch_menu
+from rtcdp.core.logger import setup_logging as configure_logging
 import logging
+import argparse
 from pathlib import Path
 
 # --- Constants ---
 BASE_DIR = Path(__file__).resolve().parent
 MAIN_DIR = BASE_DIR / "rtcdp"
 LOG_DIR = BASE_DIR / "logs"
-DATASET_LOG_FILE = LOG_DIR / "main_entry.log"
 
 # --- Setup Logging ---
 def setup_logging():
-    LOG_DIR.mkdir(parents=True, exist_ok=True)  # Ensure log directory exists
-    logging.basicConfig(
-        filename=str(DATASET_LOG_FILE),
-        filemode="a",
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s"
-    )
+    configure_logging("main", log_dir=str(LOG_DIR))
     logging.info("Logging system initialized.")
 
 # --- Main App Entry ---
 def main():
+    parser = argparse.ArgumentParser(description="RTCDP API Kit — interactive menus")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each menu action into logs/profiles/")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Like --profile, plus a tracemalloc allocation diff")
+    parser.add_argument("--cassette", metavar="PATH",
+                        help="Record/replay HTTP traffic through this cassette (default: replay if it exists)")
+    parser.add_argument("--cassette-mode", choices=("record", "replay", "cache"))
+    args = parser.parse_args()
+
     setup_logging()
+    if args.profile or args.profile_memory:
+        from rtcdp.utils.profiling import install_interactive
+        install_interactive(memory=args.profile_memory, output_dir=str(LOG_DIR / "profiles"))
+        logging.info("Menu profiling enabled.")
+    if args.cassette:
+        from rtcdp.utils import http_client
+        cassette = http_client.use_cassette(args.cassette, args.cassette_mode)
+        logging.info(f"HTTP cassette {cassette.path} ({cassette.mode}).")
     logging.info("Launching main menu...")
     launch_menu()
     logging.info("Main menu session ended.")
@@ -0,0 +1,7 @@
+# rtcdp/__main__.py
+
+import sys
+from rtcdp.cli.headless import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,11 +30,6 @@ class AEPClient:
         self.base_url = self.credentials["base_url"]
         self.environments = self.credentials["environments"]
 
-        logging.basicConfig(
-            filename="aep_client.log",
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s"
-        )
         logging.info("AEPClient initialized.")
 
     def _load_credentials(self, file_path):
@@ -117,6 +112,8 @@ class AEPClient:
 
 # Example Usage
 if __name__ == "__main__":
+    from rtcdp.core.logger import setup_logging
+    setup_logging("aep_client")
     try:
         # Initialize the AEPClient
         client = AEPClient("cit-credentials.json")
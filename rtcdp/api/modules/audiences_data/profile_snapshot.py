@@ -1,16 +1,9 @@
 import json
-import requests
 import logging
 import os
 import subprocess
 from datetime import datetime
-
-# Configure logging
-logging.basicConfig(
-    filename="/logs/snapshot_export.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from rtcdp.utils import http_client
 
 class ProfileSnapshotExporter:
     def __init__(self, credentials_file, environment):
@@ -57,7 +50,7 @@ class ProfileSnapshotExporter:
             "x-sandbox-name": self.environment["sandbox_id"]
         }
 
-        response = requests.get(test_url, headers=headers)
+        response = http_client.get(test_url, headers=headers)
 
         if response.status_code == 401:
             logging.warning("⚠️ OAuth token is invalid. Refreshing token...")
@@ -88,7 +81,7 @@ class ProfileSnapshotExporter:
                 "schemaName": "_xdm.context.profile"
             }
 
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload)
 
             if response.status_code in [200, 201, 202]:
                 logging.info("✔ Snapshot export initiated successfully.")
@@ -129,4 +122,6 @@ def main():
     exporter.trigger_profile_snapshot()
 
 if __name__ == "__main__":
+    from rtcdp.core.logger import setup_logging
+    setup_logging("profile_snapshot")
     main()
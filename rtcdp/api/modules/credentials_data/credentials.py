@@ -5,21 +5,9 @@ import os
 import logging
 import time
 from datetime import datetime, timedelta
-import requests
 from rich import print
 from rtcdp.utils.auth_helper import AuthHelper
 
-# Configure Logging
-LOG_DIR = "logs"
-DATASET_LOG = "credentials.log"
-os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{DATASET_LOG}",
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 class CredentialsManager:
     def __init__(self):
         self.auth = AuthHelper()
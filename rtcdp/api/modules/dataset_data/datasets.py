@@ -4,19 +4,17 @@ import json
 import os
 import logging
 import requests
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich import print
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.core.batch_errors import ErrorAggregator
 
-# Configure Logging
 LOG_DIR = "logs"
-DATASET_LOG = "datasets.log"
-os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{DATASET_LOG}",
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+BATCH_PAGE_LIMIT = 100
+MAX_TRIAGE_WORKERS = 8
+TRIAGE_WINDOW = timedelta(days=7)
 
 class DatasetManager:
     def __init__(self):
@@ -27,12 +25,112 @@ class DatasetManager:
         self.sandbox = self.auth.get_sandbox()
         self.token = self.auth.get_access_token()
 
-    def list_datasets(self):
-        print("[cyan]\n📦 Fetching all datasets with pagination...[/cyan]")
-        all_datasets = []
-        limit = 20
-        offset = 0
+    def _headers(self, **extra):
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.sandbox,
+            "Accept": "application/json"
+        }
+        headers.update(extra)
+        return headers
+
+    def list_failed_batches(self, dataset_ids, start, end):
+        """Failed batches for the given datasets created between ``start`` and ``end`` (datetimes)."""
+        url = f"{self.base_url}/data/foundation/catalog/batches"
+        batches = []
+        for dataset_id in dataset_ids:
+            offset = 0
+            while True:
+                params = {
+                    "dataSet": dataset_id, "status": "failed",
+                    "createdAfter": int(start.timestamp() * 1000), "createdBefore": int(end.timestamp() * 1000),
+                    "limit": BATCH_PAGE_LIMIT, "start": offset,
+                }
+                response = http_client.get(url, headers=self._headers(), params=params)
+                response.raise_for_status()
+                page = response.json() or {}
+                batches.extend({"id": batch_id, "dataset": dataset_id, **info} for batch_id, info in page.items())
+                if len(page) < BATCH_PAGE_LIMIT:
+                    break
+                offset += len(page)
+        return batches
+
+    def _triage_batch(self, batch):
+        """List a batch's failed-record files and stream each one into a fresh aggregator."""
+        aggregator = ErrorAggregator()
+        # Batch-level errors from Catalog (e.g. schema or file format problems)
+        for error in batch.get("errors", []):
+            aggregator.add(batch["id"], str(error.get("code", "unknown")), "", str(error.get("description", "")),
+                           count=len(error.get("rows", [])) or 1)
+
+        url = f"{self.base_url}/data/foundation/export/batches/{batch['id']}/failed"
+        response = http_client.get(url, headers=self._headers())
+        if response.status_code == 404:
+            return aggregator, 0
+        response.raise_for_status()
+
+        records = 0
+        for file in response.json().get("data", []):
+            href = file.get("_links", {}).get("self", {}).get("href")
+            if not href:
+                continue
+            with http_client.get(href, headers=self._headers(Accept="application/octet-stream"), stream=True) as download:
+                download.raise_for_status()
+                records += aggregator.add_stream(batch["id"], download.iter_lines())
+        return aggregator, records
+
+    def triage_failed_batches(self, dataset_ids, start=None, end=None, max_workers=MAX_TRIAGE_WORKERS):
+        """
+        Group the errors of every failed batch in a time window by error code and field path.
+
+        Returns the summary DataFrame (also written to logs/batch_triage-<timestamp>.csv).
+        """
+        end = end or datetime.now(timezone.utc)
+        start = start or end - TRIAGE_WINDOW
+        print(f"[cyan]\n🧯 Triaging failed batches from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} UTC...[/cyan]")
+
+        try:
+            batches = self.list_failed_batches(dataset_ids, start, end)
+        except requests.RequestException as e:
+            logging.error(f"Failed to list batches: {e}")
+            print(f"[red]❌ Failed to list batches: {e}[/red]")
+            return None
+        if not batches:
+            print("[green]✔ No failed batches in this window.[/green]")
+            return None
+
+        total = ErrorAggregator()
+        records = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self._triage_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    aggregator, count = future.result()
+                    total.merge(aggregator)
+                    records += count
+                except requests.RequestException as e:
+                    logging.error(f"Failed to fetch errors for batch {futures[future]['id']}: {e}")
+                    print(f"[yellow]⚠ Skipped batch {futures[future]['id']}: {e}[/yellow]")
+
+        summary = total.summary()
+        os.makedirs(LOG_DIR, exist_ok=True)
+        path = os.path.join(LOG_DIR, f"batch_triage-{end:%Y%m%dT%H%M%S}.csv")
+        summary.to_csv(path, index=False)
+
+        print(f"[green]✔ {len(batches)} failed batch(es), {records} failed record error(s), "
+              f"{len(summary)} distinct code/path group(s).[/green]")
+        for row in summary.head(25).itertuples():
+            print(f"  [bold]{row.count:>7}[/bold] × {row.code} {row.path or '(no path)'} "
+                  f"in {row.batches} batch(es) — {row.sample[:100]}")
+        print(f"[green]Full summary saved to {path}[/green]")
+        logging.info(f"Triaged {len(batches)} failed batches for datasets {dataset_ids}")
+        return summary
 
+    def iter_datasets(self, limit=20):
+        """Yield catalog datasets page by page as they arrive."""
+        offset = 0
         while True:
             url = f"{self.base_url}/data/foundation/catalog/dataSets?limit={limit}&start={offset}&sandboxId={self.sandbox}"
             headers = {
@@ -41,29 +139,23 @@ class DatasetManager:
                 "x-gw-ims-org-id": self.org_id,
                 "Accept": "application/json"
             }
+            response = http_client.get(url, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            if not data:
+                return
+            for dataset_id, info in data.items():
+                yield {"id": dataset_id, "name": info.get("name", "Unnamed Dataset"), **info}
+            offset += limit
 
-            try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-
-                if not data:
-                    break
-
-                datasets = [
-                    {"id": dataset_id, "name": info.get("name", "Unnamed Dataset"), **info}
-                    for dataset_id, info in data.items()
-                ]
-
-                if not datasets:
-                    break
-
-                all_datasets.extend(datasets)
-                offset += limit
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Error fetching datasets: {e}")
-                print(f"[red]❌ Error fetching datasets: {e}[/red]")
-                break
+    def list_datasets(self):
+        print("[cyan]\n📦 Fetching all datasets with pagination...[/cyan]")
+        all_datasets = []
+        try:
+            all_datasets.extend(self.iter_datasets())
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching datasets: {e}")
+            print(f"[red]❌ Error fetching datasets: {e}[/red]")
 
         for i, ds in enumerate(all_datasets, 1):
             print(f"{i}. [bold]{ds['name']}[/bold] ({ds['id']})")
@@ -95,7 +187,7 @@ class DatasetManager:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload)
             response.raise_for_status()
             result = response.json()
             print(f"[green]✔ Dataset created successfully. ID: {result.get('id')}[/green]")
@@ -126,7 +218,7 @@ class DatasetManager:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload)
             response.raise_for_status()
             print("[green]✔ Data ingested successfully.[/green]")
             logging.info("Data ingested successfully.")
@@ -157,7 +249,7 @@ class DatasetManager:
                     "x-sandbox-name": self.sandbox
                 }
 
-                response = requests.delete(url, headers=headers)
+                response = http_client.delete(url, headers=headers)
                 response.raise_for_status()
                 print("[green]✔ Dataset deleted successfully.[/green]")
                 logging.info(f"Deleted dataset ID: {dataset_id}")
@@ -213,3 +305,13 @@ class DatasetManager:
             except ValueError:
                 print("Invalid input.")
 
+    def triage_menu(self):
+        print("\n[bold cyan]🧯 Triage Failed Batches[/bold cyan]")
+        dataset_ids = [d.strip() for d in input("Dataset ID(s) (comma-separated): ").split(",") if d.strip()]
+        if not dataset_ids:
+            print("[yellow]⚠ At least one dataset ID is required.[/yellow]")
+            return
+        days = input(f"Look back how many days? [{TRIAGE_WINDOW.days}]: ").strip()
+        end = datetime.now(timezone.utc)
+        start = end - (timedelta(days=int(days)) if days.isdigit() else TRIAGE_WINDOW)
+        self.triage_failed_batches(dataset_ids, start, end)
@@ -2,14 +2,20 @@ import json
 import requests
 import logging
 import os
+import sys
+import time
+import argparse
+import threading
 import subprocess
+from datetime import datetime
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from rtcdp.utils import http_client
+from rtcdp.core.logger import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    filename="source_connection.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+HEALTH_DIR = os.path.join("logs", "fleet_health")
+MAX_HEALTH_WORKERS = 16
+FLOW_PAGE_LIMIT = 100
 
 class SourceConnectionAPI:
     """Handles Source Connection operations in Adobe Experience Platform (AEP)."""
@@ -28,6 +34,7 @@ class SourceConnectionAPI:
         self.api_key = self.credentials["api_key"]
         self.org_id = self.credentials["org_id"]
         self.environment = environment
+        self._refresh_lock = threading.Lock()
 
     def load_credentials(self):
         """Load API credentials from a JSON file."""
@@ -94,7 +101,7 @@ class SourceConnectionAPI:
             }
 
             logging.info(f"🚀 Creating Source Connection: {name}")
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload)
 
             if response.status_code in [200, 201]:
                 logging.info("✔ Source Connection created successfully.")
@@ -108,48 +115,77 @@ class SourceConnectionAPI:
             logging.error(f"❌ Error creating Source Connection: {e}")
             raise
 
+    def _headers(self, content_type=None):
+        headers = {
+            "Authorization": f"Bearer {self.get_access_token()}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.environment["sandbox_id"]
+        }
+        if content_type:
+            headers["Content-Type"] = content_type
+        return headers
+
+    def _request(self, method, url, **kwargs):
+        """Send a request; on 401 refresh the token once and retry."""
+        headers = self._headers()
+        response = http_client.request(method, url, headers=headers, **kwargs)
+        if response.status_code == 401:
+            with self._refresh_lock:
+                # Another worker may already have refreshed while we waited
+                if self._headers()["Authorization"] == headers["Authorization"]:
+                    logging.warning("⚠️ OAuth token expired. Refreshing and retrying...")
+                    self.refresh_token()
+                    self.credentials = self.load_credentials()
+            response = http_client.request(method, url, headers=self._headers(), **kwargs)
+        return response
+
+    def list_all(self, resource, **params):
+        """
+        Page through a Flow Service listing (sourceConnections, flows, runs, ...).
+
+        Args:
+            resource (str): Flow Service collection name.
+            **params: Extra query parameters for the first page.
+
+        Returns:
+            list: Every item across all pages.
+        """
+        url = f"{self.base_url}/flowservice/{resource}"
+        params = {"limit": FLOW_PAGE_LIMIT, **params}
+        items = []
+        while url:
+            response = self._request("GET", url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            items.extend(data.get("items", []))
+            # The next link already carries the continuation token and filters
+            next_href = data.get("_links", {}).get("next", {}).get("href")
+            url = urljoin(f"{self.base_url}/flowservice/", next_href.lstrip("/")) if next_href else None
+            params = None
+        return items
+
     def list_connections(self):
         """Retrieve and display all existing Source Connections."""
         try:
-            access_token = self.get_access_token()
-            url = f"{self.base_url}/flowservice/sourceConnections"
-
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "x-api-key": self.api_key,
-                "x-gw-ims-org-id": self.org_id,
-                "x-sandbox-name": self.environment["sandbox_id"],
-                "Content-Type": "application/json"
-            }
-
             logging.info("🔍 Fetching all Source Connections...")
-            response = requests.get(url, headers=headers)
-
-            if response.status_code == 200:
-                connections = response.json().get('items', [])
-                if not connections:
-                    print("⚠️ No source connections found.")
-                    return []
-                
-                print("\n🔍 **Existing Source Connections:**")
-                for i, conn in enumerate(connections, start=1):
-                    print(f"{i}. 🆔 {conn['id']} | 📌 {conn['name']} | Status: {conn.get('state', 'unknown')}")
-                return connections
-
-            elif response.status_code == 401:
-                logging.warning("⚠️ OAuth token expired. Refreshing and retrying...")
-                print("⚠️ OAuth token expired. Refreshing and retrying...")
-                self.refresh_token()
-                return self.list_connections()
-
-            elif response.status_code == 404:
+            connections = self.list_all("sourceConnections")
+            if not connections:
+                print("⚠️ No source connections found.")
+                return []
+
+            print("\n🔍 **Existing Source Connections:**")
+            for i, conn in enumerate(connections, start=1):
+                print(f"{i}. 🆔 {conn['id']} | 📌 {conn['name']} | Status: {conn.get('state', 'unknown')}")
+            return connections
+
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
                 logging.error("❌ API endpoint not found. Check the base URL.")
                 print("❌ API endpoint not found. Ensure the base URL is correct.")
-
             else:
-                logging.error(f"❌ Failed to fetch source connections: {response.text}")
-                print(f"❌ Error retrieving source connections. Status: {response.status_code}")
-
+                logging.error(f"❌ Failed to fetch source connections: {e}")
+                print(f"❌ Error retrieving source connections: {e}")
         except Exception as e:
             logging.error(f"❌ Error fetching source connections: {e}")
             print(f"❌ An error occurred. See logs for details.")
@@ -194,7 +230,7 @@ class SourceConnectionAPI:
             }
 
             logging.info(f"🗑 Deleting connection: {selected_conn_id}")
-            response = requests.delete(url, headers=headers)
+            response = http_client.delete(url, headers=headers)
 
             if response.status_code == 204:
                 logging.info(f"✔ Connection {selected_conn_id} deleted successfully.")
@@ -247,7 +283,7 @@ class SourceConnectionAPI:
                 "x-sandbox-name": self.environment["sandbox_id"]
             }
 
-            response = requests.post(url, headers=headers)
+            response = http_client.post(url, headers=headers)
 
             if response.status_code == 200:
                 print(f"✅ Connection '{selected_conn_name}' is active and working!")
@@ -271,7 +307,160 @@ class SourceConnectionAPI:
             logging.error(f"❌ Error testing connection: {e}")
             print(f"❌ An error occurred. See logs for details.")
 
+    def check_connection(self, conn):
+        """Test one source connection; returns a status-matrix row."""
+        url = f"{self.base_url}/connections/{conn['id']}/test"
+        started = time.perf_counter()
+        try:
+            response = self._request("POST", url)
+            code, detail = response.status_code, ""
+            status = "OK" if code == 200 else "WARN" if code == 400 else "FAIL"
+            if code != 200:
+                detail = response.text[:200]
+        except requests.RequestException as e:
+            code, status, detail = None, "FAIL", str(e)
+        return {
+            "type": "connection", "id": conn["id"], "name": conn.get("name", ""),
+            "state": conn.get("state", "unknown"), "status": status, "http": code,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1), "detail": detail,
+        }
+
+    def check_flow(self, flow):
+        """Check one dataflow via its most recent run; returns a status-matrix row."""
+        started = time.perf_counter()
+        try:
+            response = self._request("GET", f"{self.base_url}/flowservice/runs", params={
+                "property": f"flowId=={flow['id']}", "orderby": "-createdAt", "limit": 1,
+            })
+            code = response.status_code
+            runs = response.json().get("items", []) if code == 200 else []
+            last_run = runs[0].get("metrics", {}).get("statusSummary", {}).get("status") if runs else None
+            if code != 200:
+                status, detail = "FAIL", response.text[:200]
+            elif flow.get("state") != "enabled":
+                status, detail = "WARN", "flow disabled"
+            elif last_run in ("failed",):
+                status, detail = "FAIL", "last run failed"
+            elif last_run in (None, "partialSuccess"):
+                status, detail = "WARN", f"last run: {last_run or 'none'}"
+            else:
+                status, detail = "OK", f"last run: {last_run}"
+        except requests.RequestException as e:
+            code, status, detail = None, "FAIL", str(e)
+        return {
+            "type": "dataflow", "id": flow["id"], "name": flow.get("name", ""),
+            "state": flow.get("state", "unknown"), "status": status, "http": code,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1), "detail": detail,
+        }
+
+    def fleet_health(self, max_workers=MAX_HEALTH_WORKERS, output_dir=HEALTH_DIR):
+        """
+        Test every source connection and dataflow concurrently.
+
+        Args:
+            max_workers (int): Upper bound on concurrent checks.
+            output_dir (str): Where the JSON status matrix is written.
+
+        Returns:
+            list: One row per connection/dataflow, worst status first.
+        """
+        print("\n🩺 Running fleet health check...")
+        connections = self.list_all("sourceConnections")
+        flows = self.list_all("flows")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            rows = list(pool.map(self.check_connection, connections))
+            rows += list(pool.map(self.check_flow, flows))
+
+        order = {"FAIL": 0, "WARN": 1, "OK": 2}
+        rows.sort(key=lambda r: (order[r["status"]], r["type"], r["name"]))
+        self.print_health_matrix(rows)
+
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"health-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json")
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+        counts = {s: sum(r["status"] == s for r in rows) for s in order}
+        logging.info(f"Fleet health: {counts} ({len(connections)} connections, {len(flows)} dataflows) → {path}")
+        print(f"\n✅ {counts['OK']} OK | ⚠️ {counts['WARN']} WARN | ❌ {counts['FAIL']} FAIL — saved to {path}")
+        return rows
+
+    @staticmethod
+    def print_health_matrix(rows):
+        icons = {"OK": "✅", "WARN": "⚠️", "FAIL": "❌"}
+        name_width = min(max((len(r["name"]) for r in rows), default=4), 40)
+        print(f"\n{'':2} {'TYPE':<10} {'NAME':<{name_width}} {'STATE':<9} {'HTTP':>4} {'LATENCY':>9}  DETAIL")
+        for r in rows:
+            print(f"{icons[r['status']]:2} {r['type']:<10} {r['name'][:name_width]:<{name_width}} "
+                  f"{r['state']:<9} {r['http'] or '-':>4} {r['latency_ms']:>7.0f}ms  {r['detail'][:60]}")
+
+
+    def _harvest_flow(self, flow, since_ms):
+        from rtcdp.core.flow_metrics import REHARVEST_WINDOW_MS
+        params = {"property": [f"flowId=={flow['id']}"], "orderby": "createdAt"}
+        if since_ms:
+            params["property"].append(f"createdAt>={since_ms - REHARVEST_WINDOW_MS}")
+        return flow, self.list_all("runs", **params)
+
+    def harvest_flow_runs(self, store_dir=None, max_workers=MAX_HEALTH_WORKERS):
+        """
+        Pull flow runs created since each dataflow's cursor into the local metrics store.
+
+        Args:
+            store_dir (str): Time-series store location (defaults to logs/flow_metrics).
+            max_workers (int): Dataflows harvested concurrently.
+
+        Returns:
+            int: Number of run records stored.
+        """
+        import pandas as pd
+        from rtcdp.core.flow_metrics import FLOW_METRICS_DIR, open_store, run_record
+        store_dir = store_dir or FLOW_METRICS_DIR
+        print("\n📈 Harvesting flow-run metrics...")
+        store = open_store(store_dir)
+        cursors = store.cursors()
+        flows = self.list_all("flows")
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for flow, runs in pool.map(lambda f: self._harvest_flow(f, cursors.get(f["id"])), flows):
+                rows.extend(run_record(run, flow.get("name", "")) for run in runs)
+                if runs:
+                    cursors[flow["id"]] = max(run.get("createdAt", 0) for run in runs)
+
+        written = store.append(pd.DataFrame(rows))
+        store.save_cursors(cursors)
+        logging.info(f"Harvested {written} flow runs across {len(flows)} dataflows")
+        print(f"✔ Stored {written} run records from {len(flows)} dataflows in {store_dir}")
+        return written
+
+    def show_flow_trends(self, days=14, freq="D", store_dir=None):
+        """Print throughput and failure-rate trends from the local metrics store."""
+        import pandas as pd
+        from rtcdp.core.flow_metrics import FLOW_METRICS_DIR, open_store, throughput_trend, failure_rate_trend
+        store_dir = store_dir or FLOW_METRICS_DIR
+        runs = open_store(store_dir).read(start=pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days))
+        if runs.empty:
+            print("⚠️ No flow-run metrics stored yet. Harvest first.")
+            return None, None
+        throughput, failures = throughput_trend(runs, freq), failure_rate_trend(runs, freq)
+        print(f"\n🚀 Throughput (last {days} days):")
+        print(throughput[["flow_name", "runs", "records_written", "records_per_s"]].to_string())
+        print(f"\n🧯 Failure rates (last {days} days):")
+        print(failures[["flow_name", "runs", "failed_runs", "record_failure_rate", "run_failure_rate"]].to_string())
+        return throughput, failures
+
+
 # ✅ **Main Menu**
+def _run_guarded(action, label):
+    """Run a fleet-wide menu action; HTTP and token refresh errors are reported, not raised."""
+    try:
+        return action()
+    except (requests.RequestException, RuntimeError) as e:
+        logging.error(f"❌ {label} failed: {e}")
+        print(f"❌ {label} failed: {e}")
+        return None
+
 def main_menu():
     """
     Terminal menu for Source Connection API management.
@@ -309,6 +498,9 @@ def main_menu():
         print("6️⃣ Create a Target Dataset and Link to a Connection")
         print("7️⃣ Create a Dataflow")
         print("8️⃣ Post Test Data")
+        print("🩺 H. Fleet Health Check (all connections + dataflows)")
+        print("📈 M. Harvest Flow-Run Metrics")
+        print("📊 T. Show Flow Throughput / Failure Trends")
         print("9️⃣ Exit")
 
         choice = input("\nChoose an option: ")
@@ -329,11 +521,75 @@ def main_menu():
             print("🚧 Create Dataflow function not implemented yet.")
         elif choice == "8":
             print("🚧 Post Test Data function not implemented yet.")
+        elif choice.lower() == "h":
+            _run_guarded(api.fleet_health, "Fleet health check")
+        elif choice.lower() == "m":
+            _run_guarded(api.harvest_flow_runs, "Flow-run harvest")
+        elif choice.lower() == "t":
+            api.show_flow_trends()
         elif choice == "9":
             print("👋 Exiting Source Connection API. Goodbye!")
             break
         else:
             print("❌ Invalid choice. Try again.")
 
+def _load_environment(environment_name, credentials_path):
+    with open(credentials_path, "r") as file:
+        environments = json.load(file).get("environments", [])
+    return next((env for env in environments if env["name"] == environment_name), None)
+
+def run_harvest(environment_name, credentials_path=os.path.join("CREDS", "rol_credentials.json"),
+                max_workers=MAX_HEALTH_WORKERS):
+    """Non-interactive flow-run harvest for cron. Returns an exit code."""
+    environment = _load_environment(environment_name, credentials_path)
+    if environment is None:
+        print(f"❌ Unknown environment: {environment_name}")
+        return 2
+    try:
+        SourceConnectionAPI(credentials_path, environment).harvest_flow_runs(max_workers=max_workers)
+        return 0
+    except (requests.RequestException, RuntimeError) as e:
+        logging.error(f"❌ Flow-run harvest failed: {e}")
+        print(f"❌ Flow-run harvest failed: {e}")
+        return 2
+
+def health_exit_code(rows):
+    """Exit code for fleet health rows: 0 all OK, 1 warnings only, 2 any failure."""
+    statuses = {r["status"] for r in rows}
+    return 2 if "FAIL" in statuses else 1 if "WARN" in statuses else 0
+
+
+def run_fleet_health(environment_name, credentials_path=os.path.join("CREDS", "rol_credentials.json"),
+                     max_workers=MAX_HEALTH_WORKERS):
+    """
+    Non-interactive fleet health check for cron/CI.
+
+    Returns:
+        int: Exit code — 0 all OK, 1 warnings only, 2 any failure.
+    """
+    environment = _load_environment(environment_name, credentials_path)
+    if environment is None:
+        print(f"❌ Unknown environment: {environment_name}")
+        return 2
+
+    try:
+        rows = SourceConnectionAPI(credentials_path, environment).fleet_health(max_workers=max_workers)
+    except (requests.RequestException, RuntimeError) as e:
+        # A check that couldn't run is a failure, never "warnings only"
+        logging.error(f"❌ Fleet health check failed: {e}")
+        print(f"❌ Fleet health check failed: {e}")
+        return 2
+    return health_exit_code(rows)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Source Connection API applet")
+    parser.add_argument("--health", metavar="ENVIRONMENT", help="Run the fleet health check for an environment and exit")
+    parser.add_argument("--harvest", metavar="ENVIRONMENT", help="Harvest flow-run metrics for an environment and exit")
+    parser.add_argument("--workers", type=int, default=MAX_HEALTH_WORKERS, help="Concurrent health checks")
+    args = parser.parse_args()
+    setup_logging("flow")
+    if args.health:
+        sys.exit(run_fleet_health(args.health, max_workers=args.workers))
+    if args.harvest:
+        sys.exit(run_harvest(args.harvest, max_workers=args.workers))
     main_menu()
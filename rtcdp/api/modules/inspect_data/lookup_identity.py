@@ -1,18 +1,29 @@
 # cli/inspect_data/lookup_identity.py
 
+import os
+import csv
+import json
 import logging
 import requests
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich import print
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.utils.helpers import TTLCache, flatten_record
 
-# Logging setup
 LOG_DIR = "logs"
-IDENTITY_LOG = "identity_lookup.log"
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{IDENTITY_LOG}",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+BULK_OUTPUT_PATH = os.path.join(LOG_DIR, "bulk_profiles.parquet")
+EVENTS_OUTPUT_PATH = os.path.join(LOG_DIR, "experience_events.ndjson")
+EVENT_WINDOW = timedelta(days=1)
+EVENT_PAGE_LIMIT = 1000
+BATCH_SIZE = 100
+MAX_LOOKUP_WORKERS = 8
+PROFILE_CACHE_TTL = 900
+PROFILE_SCHEMA = "_xdm.context.profile"
+EVENT_SCHEMA = "_xdm.context.experienceevent"
+
+_profile_cache = TTLCache(ttl=PROFILE_CACHE_TTL, maxsize=100000)
 
 class IdentityHandler:
     def __init__(self):
@@ -22,6 +33,353 @@ class IdentityHandler:
         self.org_id = self.auth.get_org_id()
         self.sandbox = self.auth.get_sandbox()
         self.token = self.auth.get_access_token()
+        self.batch_available = True
+
+    def _headers(self, **extra):
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.sandbox,
+            "Accept": "application/json"
+        }
+        headers.update(extra)
+        return headers
+
+    def _cache_key(self, namespace, identity_value):
+        return (self.base_url, self.org_id, self.sandbox, namespace.lower(), identity_value)
+
+    def fetch_profile(self, namespace, identity_value, use_cache=True):
+        key = self._cache_key(namespace, identity_value)
+        if use_cache and key in _profile_cache:
+            return _profile_cache.get(key)
+
+        url = f"{self.base_url}/profile/entities"
+        params = {"entityIdNS": namespace, "entityId": identity_value}
+        response = http_client.get(url, headers=self._headers(), params=params)
+        if response.status_code == 404:
+            profile = None
+        else:
+            response.raise_for_status()
+            profile = response.json() or None
+
+        _profile_cache.set(key, profile)
+        return profile
+
+    def fetch_profiles_batch(self, pairs):
+        """
+        Resolve many identities with one entity-access POST.
+
+        Returns ``{(namespace, value): profile}`` or None when the batch
+        endpoint isn't available, so the caller can fall back to GETs.
+        """
+        url = f"{self.base_url}/data/core/ups/access/entities"
+        body = {
+            "schema": {"name": PROFILE_SCHEMA},
+            "identities": [{"entityId": value, "entityIdNS": {"code": ns}} for ns, value in pairs]
+        }
+        # A read-only POST, so gateway errors are safe to retry
+        response = http_client.post(url, headers=self._headers(**{"Content-Type": "application/json"}), json=body,
+                                    retry_unsafe=True)
+        if response.status_code in (403, 404, 405, 501):
+            logging.warning(f"Batch entity lookup unavailable ({response.status_code}); falling back to GETs.")
+            self.batch_available = False
+            return None
+        response.raise_for_status()
+
+        found = {}
+        for entry in (response.json() or {}).values():
+            requested = entry.get("requestedIdentity", {})
+            ns = requested.get("entityIdNS", {}).get("code", "")
+            found[(ns.lower(), requested.get("entityId"))] = entry.get("entity", entry)
+
+        results = {}
+        for ns, value in pairs:
+            profile = found.get((ns.lower(), value))
+            _profile_cache.set(self._cache_key(ns, value), profile)
+            results[(ns, value)] = profile
+        return results
+
+    def _resolve_batch(self, pairs):
+        """Returns ``({pair: profile}, {pair: error})``; a failed lookup is reported, never raised."""
+        results, errors = {}, {}
+        pending = []
+        for ns, value in pairs:
+            key = self._cache_key(ns, value)
+            if key in _profile_cache:
+                results[(ns, value)] = _profile_cache.get(key)
+            else:
+                pending.append((ns, value))
+
+        if pending and self.batch_available:
+            try:
+                batch = self.fetch_profiles_batch(pending)
+            except (requests.RequestException, ValueError) as e:
+                # One bad batch (a 500 after retries, a garbled body) shouldn't sink the lookup; retry it per identity
+                logging.warning(f"Batch entity lookup failed ({e}); resolving {len(pending)} identities one by one.")
+                batch = None
+            if batch is not None:
+                results.update(batch)
+                pending = []
+
+        for ns, value in pending:
+            try:
+                results[(ns, value)] = self.fetch_profile(ns, value, use_cache=False)
+            except (requests.RequestException, ValueError) as e:
+                logging.error(f"Profile lookup failed for {ns}:{value}: {e}")
+                results[(ns, value)] = None
+                errors[(ns, value)] = str(e)
+        return results, errors
+
+    @staticmethod
+    def _to_epoch_ms(value):
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+
+    @staticmethod
+    def split_windows(start_ms, end_ms, window_ms):
+        windows = []
+        cursor = start_ms
+        while cursor < end_ms:
+            windows.append((cursor, min(cursor + window_ms, end_ms)))
+            cursor += window_ms
+        return windows
+
+    def fetch_event_window(self, namespace, identity_value, start_ms, end_ms):
+        """Follow the pagination cursor for one time window and return its events sorted by timestamp."""
+        url = f"{self.base_url}/data/core/ups/access/entities"
+        params = {
+            "schema.name": EVENT_SCHEMA,
+            "relatedSchema.name": PROFILE_SCHEMA,
+            "relatedEntityId": identity_value,
+            "relatedEntityIdNS": namespace,
+            "startTime": start_ms,
+            "endTime": end_ms,
+            "orderby": "timestamp",
+            "limit": EVENT_PAGE_LIMIT
+        }
+        events = []
+        while url:
+            response = http_client.get(url, headers=self._headers(), params=params)
+            if response.status_code == 404:
+                break
+            response.raise_for_status()
+            page = response.json()
+            events.extend(page.get("children", []))
+
+            next_href = page.get("_links", {}).get("next", {}).get("href")
+            # The cursor link already carries every query parameter
+            url = f"{self.base_url}/data/core/ups/access{next_href}" if next_href else None
+            params = None
+
+        events.sort(key=lambda e: e.get("timestamp", 0))
+        return events
+
+    def fetch_experience_events(self, namespace, identity_value, start, end,
+                                window=EVENT_WINDOW, output_path=EVENTS_OUTPUT_PATH,
+                                max_workers=MAX_LOOKUP_WORKERS):
+        """
+        Retrieve a profile's experience events between ``start`` and ``end``.
+
+        The range is split into windows fetched concurrently; finished windows
+        are written in timestamp order as soon as every earlier window is done.
+        ``.parquet``/``.csv`` outputs are flattened, anything else is NDJSON.
+        """
+        start_ms, end_ms = self._to_epoch_ms(start), self._to_epoch_ms(end)
+        windows = self.split_windows(start_ms, end_ms, int(window.total_seconds() * 1000))
+        columnar = output_path.endswith((".parquet", ".csv"))
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        if columnar:
+            from rtcdp.utils.columnar import ColumnarWriter
+            writer = ColumnarWriter(output_path)
+        else:
+            writer = open(output_path, "w")
+        written = 0
+        completed = {}
+        next_window = 0
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    pool.submit(self.fetch_event_window, namespace, identity_value, w_start, w_end): index
+                    for index, (w_start, w_end) in enumerate(windows)
+                }
+                for future in as_completed(futures):
+                    completed[futures[future]] = future.result()
+                    while next_window in completed:
+                        events = completed.pop(next_window)
+                        if columnar:
+                            writer.write([flatten_record(e) for e in events])
+                        else:
+                            writer.writelines(json.dumps(e) + "\n" for e in events)
+                        written += len(events)
+                        next_window += 1
+        finally:
+            writer.close()
+
+        logging.info(f"Fetched {written} experience events for {namespace}:{identity_value} across {len(windows)} windows")
+        return output_path, written
+
+    def lookup_experience_events(self):
+        print("\n[bold]🕒 Experience Events by Identity[/bold]")
+        namespace = input("Enter identity namespace (e.g. ECID, IDPUSERID, EMAIL): ").strip()
+        identity_value = input("Enter identity value: ").strip()
+        days = input("How many days back? [30]: ").strip() or "30"
+        output_path = input(f"Output file [{EVENTS_OUTPUT_PATH}]: ").strip() or EVENTS_OUTPUT_PATH
+
+        if not namespace or not identity_value or not days.isdigit():
+            print("[yellow]⚠️ Namespace, value and a whole number of days are required.[/yellow]")
+            return
+
+        end = datetime.now(timezone.utc)
+        try:
+            path, count = self.fetch_experience_events(namespace, identity_value, end - timedelta(days=int(days)), end,
+                                                       output_path=output_path)
+            print(f"[green]✔ {count} events written to {path}[/green]")
+        except requests.RequestException as e:
+            logging.error(f"Experience event retrieval failed: {e}")
+            print(f"[red]❌ Request error: {e}[/red]")
+
+    def fetch_identity_cluster(self, namespace, identity_value):
+        """Return the platform's stitched cluster as (namespace, value) pairs."""
+        url = f"{self.base_url}/data/core/identity/cluster/members"
+        params = {"namespace": namespace, "id": identity_value}
+        response = http_client.get(url, headers=self._headers(), params=params)
+        response.raise_for_status()
+        members = response.json().get("members", [])
+        return [(m.get("namespace", {}).get("code", ""), m.get("id")) for m in members]
+
+    def build_identity_graph(self, links_path, graph_dir=None):
+        from rtcdp.core.identity_graph import IdentityGraph, GRAPH_DIR
+        graph_dir = graph_dir or GRAPH_DIR
+        print("[cyan]🕸️ Building local identity graph...[/cyan]")
+        try:
+            graph = IdentityGraph.build(links_path, graph_dir)
+            print(f"[green]✔ Indexed {len(graph)} identities into {graph_dir}[/green]")
+            return graph
+        except (FileNotFoundError, ValueError) as e:
+            logging.error(f"Identity graph build failed: {e}")
+            print(f"[red]❌ Failed to build identity graph: {e}[/red]")
+            return None
+
+    def show_identity_cluster(self, graph_dir=None):
+        from rtcdp.core.identity_graph import IdentityGraph, GRAPH_DIR
+        graph_dir = graph_dir or GRAPH_DIR
+        print("\n[bold]🕸️ Local Identity Cluster[/bold]")
+        if not os.path.exists(os.path.join(graph_dir, "keys.npy")):
+            print("[yellow]⚠️ No local identity graph found. Build one from exported links first.[/yellow]")
+            return
+        namespace = input("Enter identity namespace (e.g. ECID, IDPUSERID, EMAIL): ").strip()
+        identity_value = input("Enter identity value: ").strip()
+
+        cluster = IdentityGraph(graph_dir).cluster(namespace, identity_value)
+        if not cluster:
+            print("[yellow]⚠️ Identity not found in the local graph.[/yellow]")
+            return
+        print(f"[green]✔ {len(cluster)} identities collapse into this profile:[/green]")
+        for identity in cluster:
+            print(f"  • {identity}")
+
+        if input("Compare with the platform identity graph? (y/n): ").strip().lower() == "y":
+            try:
+                diff = IdentityGraph(graph_dir).compare_cluster(
+                    namespace, identity_value, self.fetch_identity_cluster(namespace, identity_value))
+                print(f"[green]Matching: {len(diff['matching'])}[/green]")
+                print(f"[yellow]Local only: {diff['local_only']}[/yellow]")
+                print(f"[yellow]Platform only: {diff['platform_only']}[/yellow]")
+            except requests.RequestException as e:
+                logging.error(f"Identity cluster fetch failed: {e}")
+                print(f"[red]❌ Request error: {e}[/red]")
+
+    def ingest_fragments(self, export_path, store_dir=None):
+        from rtcdp.core.fragments import FragmentStore, FRAGMENT_STORE_DIR
+        store_dir = store_dir or FRAGMENT_STORE_DIR
+        print("\n[bold]🗄️ Append Export to Local Fragment Store[/bold]")
+        namespace = input("Identity namespace of the export's _id column (blank if already NS:value): ").strip()
+        dataset_id = input("Dataset ID of the export: ").strip()
+        try:
+            written = FragmentStore(store_dir).append_snapshot(
+                export_path, identity_namespace=namespace or None, dataset_id=dataset_id or None)
+            print(f"[green]✔ Appended {written} fragments to {store_dir}[/green]")
+        except (FileNotFoundError, ValueError) as e:
+            logging.error(f"Fragment store append failed: {e}")
+            print(f"[red]❌ Failed to append fragments: {e}[/red]")
+
+    def lookup_local_fragments(self, store_dir=None):
+        from rtcdp.core.fragments import FragmentStore, FRAGMENT_STORE_DIR
+        store_dir = store_dir or FRAGMENT_STORE_DIR
+        print("\n[bold]🗄️ Lookup Fragments in Local Store[/bold]")
+        if not FragmentStore.is_store(store_dir):
+            print("[yellow]⚠️ No local fragment store found. Append an export first.[/yellow]")
+            return None
+        namespace = input("Enter identity namespace (e.g. ECID, IDPUSERID, EMAIL): ").strip()
+        identity_value = input("Enter identity value: ").strip()
+
+        fragments = FragmentStore(store_dir).lookup(namespace, identity_value)
+        if fragments.empty:
+            print("[yellow]⚠️ No fragments stored for the given identity.[/yellow]")
+            return fragments
+        print(f"[green]✔ {len(fragments)} fragments found:[/green]")
+        print(fragments.dropna(axis=1, how="all").to_string(index=False))
+        return fragments
+
+    @staticmethod
+    def read_identity_file(csv_path):
+        """Yield unique (namespace, value) pairs from a CSV with namespace,value columns."""
+        seen = set()
+        with open(csv_path, "r", newline="") as f:
+            reader = csv.reader(f)
+            for row in reader:
+                if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                    continue
+                pair = (row[0].strip(), row[1].strip())
+                if pair[0].lower() == "namespace" or pair in seen:
+                    continue
+                seen.add(pair)
+                yield pair
+
+    def bulk_lookup(self, csv_path, output_path=BULK_OUTPUT_PATH, max_workers=MAX_LOOKUP_WORKERS):
+        print(f"[cyan]🧬 Resolving identities from {csv_path}...[/cyan]")
+        if not os.path.exists(csv_path):
+            print("[red]❌ File not found.[/red]")
+            return None
+
+        pairs = list(self.read_identity_file(csv_path))
+        batches = [pairs[i:i + BATCH_SIZE] for i in range(0, len(pairs), BATCH_SIZE)]
+        found = failed = 0
+
+        from rtcdp.utils.columnar import ColumnarWriter
+        # Batches run concurrently; each finished batch is flushed to the writer straight away
+        with ColumnarWriter(output_path) as writer, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self._resolve_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    results, errors = future.result()
+                except Exception as e:
+                    logging.error(f"Bulk lookup batch failed: {e}")
+                    results = dict.fromkeys(futures[future])
+                    errors = dict.fromkeys(futures[future], str(e))
+                rows = []
+                for (ns, value), profile in results.items():
+                    row = {"lookup.namespace": ns, "lookup.value": value, "lookup.found": profile is not None,
+                           "lookup.error": errors.get((ns, value))}
+                    if profile:
+                        row.update(flatten_record(profile))
+                        found += 1
+                    rows.append(row)
+                failed += len(errors)
+                writer.write(rows)
+
+        print(f"[green]✔ Resolved {found} of {len(pairs)} identities → {writer.path}[/green]")
+        if failed:
+            print(f"[yellow]⚠️ {failed} identities could not be looked up; see the lookup.error column.[/yellow]")
+        logging.info(f"Bulk lookup: {found}/{len(pairs)} identities resolved, {failed} failed, from {csv_path}")
+        return writer.path
 
     def lookup_profile(self):
         print("\n[bold]🧬 Lookup Profile by Identity[/bold]")
@@ -32,19 +390,8 @@ class IdentityHandler:
             print("[yellow]⚠️ Both namespace and value are required.[/yellow]")
             return
 
-        url = f"{self.base_url}/profile/entities?entityIdNS={namespace}&entityId={identity_value}"
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "x-api-key": self.api_key,
-            "x-gw-ims-org-id": self.org_id,
-            "x-sandbox-name": self.sandbox,
-            "Accept": "application/json"
-        }
-
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            profile = response.json()
+            profile = self.fetch_profile(namespace, identity_value)
 
             if not profile:
                 print("[yellow]⚠️ No profile found for the given identity.[/yellow]")
@@ -61,13 +408,35 @@ class IdentityHandler:
         while True:
             print("\n[bold]🧬 PROFILE LOOKUP[/bold]")
             print("1️⃣ Lookup Profile by Namespace + ID")
-            print("2️⃣ Back to Inspect Datalake Menu")
+            print("2️⃣ Bulk Lookup from CSV (namespace,value)")
+            print("3️⃣ Retrieve Experience Events for an Identity")
+            print("4️⃣ Build Local Identity Graph from Exported Links")
+            print("5️⃣ Show Local Identity Cluster")
+            print("6️⃣ Append Snapshot Export to Local Fragment Store")
+            print("7️⃣ Lookup Fragments in Local Store")
+            print("0️⃣ Back to Inspect Datalake Menu")
 
             choice = input("Select an option: ").strip()
 
             if choice == "1":
                 self.lookup_profile()
             elif choice == "2":
+                csv_path = input("Path to identities CSV: ").strip()
+                output_path = input(f"Output file [{BULK_OUTPUT_PATH}]: ").strip() or BULK_OUTPUT_PATH
+                self.bulk_lookup(csv_path, output_path)
+            elif choice == "3":
+                self.lookup_experience_events()
+            elif choice == "4":
+                links_path = input("Path to identity links (CSV/Parquet): ").strip()
+                self.build_identity_graph(links_path)
+            elif choice == "5":
+                self.show_identity_cluster()
+            elif choice == "6":
+                export_path = input("Path to snapshot export (file or directory): ").strip()
+                self.ingest_fragments(export_path)
+            elif choice == "7":
+                self.lookup_local_fragments()
+            elif choice == "0":
                 break
             else:
                 print("[red]❌ Invalid choice. Try again.[/red]")
@@ -1,28 +1,62 @@
 # rtcdp/api/modules/inspect_data/queries.py
 
 import os
-import yaml
+import re
+import json
 import time
+import codecs
 import logging
 import requests
-import pandas as pd
+from rtcdp.utils import http_client
 from rich import print
-from utils.auth_helper import AuthHelper
+from rtcdp.utils.auth_helper import AuthHelper
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-
-QUERY_LOG = "queries.log"
 LAST_QUERY_PATH = os.path.join(LOG_DIR, "last_query.sql")
 RESULT_CSV_PATH = os.path.join(LOG_DIR, "last_query_results.csv")
 QUERIES_YML_PATH = "queries/queries.yml"
 SQL_QUERIES_PATH = "rtcdp/sql"
+POLL_INTERVAL_SECONDS = 5
+RESULT_PAGE_ROWS = 10_000
+_ROWS_ARRAY = re.compile(r'"rows"\s*:\s*\[')
+
+
+def iter_json_rows(chunks, page_size=RESULT_PAGE_ROWS):
+    """
+    Decode the ``rows`` array of a ``{"rows": [...]}`` body incrementally from
+    byte chunks, yielding lists of at most ``page_size`` rows.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, in_rows, page = "", 0, False, []
+    for chunk in chunks:
+        buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+        if not in_rows:
+            match = _ROWS_ARRAY.search(buffer)
+            if not match:
+                continue
+            pos, in_rows = match.end(), True
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                if page:
+                    yield page
+                return
+            try:
+                row, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                break  # Row continues in the next chunk
+            page.append(row)
+            if len(page) >= page_size:
+                yield page
+                page = []
+    if page:
+        yield page
 
-logging.basicConfig(
-    filename=os.path.join(LOG_DIR, QUERY_LOG),
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
 
 class QueryHandler:
     def __init__(self):
@@ -37,6 +71,7 @@ class QueryHandler:
         queries = {}
 
         if os.path.exists(QUERIES_YML_PATH):
+            import yaml
             try:
                 with open(QUERIES_YML_PATH, 'r') as stream:
                     queries.update(yaml.safe_load(stream) or {})
@@ -57,6 +92,44 @@ class QueryHandler:
 
         return queries
 
+    def find_query(self, name, queries=None):
+        """Look a saved query up by key or alias; returns its metadata or None."""
+        queries = queries if queries is not None else self.load_queries()
+        for key, meta in queries.items():
+            if key == name or meta.get("alias") == name:
+                return meta
+        return None
+
+    @staticmethod
+    def query_placeholders(sql):
+        return [p.strip("{}") for p in sql.split() if p.startswith("{{") and p.endswith("}}")]
+
+    def fill_query(self, sql, params):
+        """Substitute ``{{name}}`` placeholders from ``params``; raises KeyError listing any left unset."""
+        missing = [ph for ph in self.query_placeholders(sql) if ph not in params]
+        if missing:
+            raise KeyError(f"Missing query parameters: {', '.join(missing)}")
+        for ph, value in params.items():
+            sql = sql.replace(f"{{{{{ph}}}}}", str(value))
+        return sql
+
+    def iter_query_results(self, query_id, page_size=RESULT_PAGE_ROWS):
+        """Result rows of a finished query in pages, as they arrive; raises requests.HTTPError on failure."""
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.sandbox
+        }
+        url = f"{self.base_url}/data/foundation/query/queries/{query_id}/results"
+        with http_client.get(url, headers=headers, stream=True) as res:
+            res.raise_for_status()
+            yield from iter_json_rows(res.iter_content(chunk_size=1 << 20), page_size)
+
+    def fetch_query_results(self, query_id):
+        """Result rows of a finished query; raises requests.HTTPError on failure."""
+        return [row for page in self.iter_query_results(query_id) for row in page]
+
     def list_queries(self, queries):
         print("\n[bold]📑 AVAILABLE QUERIES[/bold]")
         for key, meta in queries.items():
@@ -81,7 +154,7 @@ class QueryHandler:
             return None
 
         query_template = queries[matched_key].get("sql", "")
-        placeholders = [p.strip("{}") for p in query_template.split() if p.startswith("{{") and p.endswith("}}")]
+        placeholders = self.query_placeholders(query_template)
 
         filled_query = query_template
         for ph in placeholders:
@@ -95,6 +168,7 @@ class QueryHandler:
         return filled_query
 
     def save_last_query(self, sql):
+        os.makedirs(LOG_DIR, exist_ok=True)
         with open(LAST_QUERY_PATH, "w") as f:
             f.write(sql)
 
@@ -121,7 +195,7 @@ class QueryHandler:
             "Content-Type": "application/json"
         }
         body = {"name": "CLI Query Submission", "sql": sql, "description": "Submitted via CLI"}
-        res = requests.post(f"{self.base_url}/data/foundation/query/queries", json=body, headers=headers)
+        res = http_client.post(f"{self.base_url}/data/foundation/query/queries", json=body, headers=headers)
 
         if res.status_code != 201:
             print(f"[red]❌ Failed to submit query: {res.text}[/red]")
@@ -142,36 +216,28 @@ class QueryHandler:
         status_url = f"{self.base_url}/data/foundation/query/queries/{query_id}"
         print("⏳ Polling for query completion...")
         while True:
-            res = requests.get(status_url, headers=headers)
+            res = http_client.get(status_url, headers=headers)
             state = res.json().get("state", "UNKNOWN")
             print(f"🔄 Status: {state}")
             if state in ["SUCCEEDED", "FAILED", "CANCELED"]:
                 break
-            time.sleep(5)
+            time.sleep(POLL_INTERVAL_SECONDS)
         return state
 
     def download_query_results(self, query_id):
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "x-api-key": self.api_key,
-            "x-gw-ims-org-id": self.org_id,
-            "x-sandbox-name": self.sandbox
-        }
-
-        url = f"{self.base_url}/data/foundation/query/queries/{query_id}/results"
-        res = requests.get(url, headers=headers)
-
-        if res.status_code != 200:
-            print(f"[red]❌ Could not download results: {res.text}[/red]")
+        try:
+            rows = self.fetch_query_results(query_id)
+        except requests.RequestException as e:
+            print(f"[red]❌ Could not download results: {e}[/red]")
             return
 
         try:
-            rows = res.json().get("rows", [])
             if not rows:
                 print("[yellow]⚠️ No results returned.[/yellow]")
                 return
 
-            keys = rows[0].keys()
+            import pandas as pd
+            os.makedirs(LOG_DIR, exist_ok=True)
             pd.DataFrame(rows).to_csv(RESULT_CSV_PATH, index=False)
             print(f"[green]📁 Results saved to {RESULT_CSV_PATH}[/green]")
 
@@ -184,6 +250,7 @@ class QueryHandler:
             return
 
         try:
+            import pandas as pd
             df = pd.read_csv(RESULT_CSV_PATH)
             print("[bold blue]📊 Last Query Results Preview:[/bold blue]")
             print(df.head(10).to_string(index=False))
@@ -3,16 +3,12 @@
 import logging
 import requests
 from rich import print
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.core.schema_registry import SchemaRegistryMirror, REGISTRY_DIR
+from rtcdp.core.field_index import FieldIndex, FIELD_INDEX_PATH
 
-# Logging setup
-LOG_DIR = "logs"
-NS_LOG = "namespace_search.log"
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{NS_LOG}",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+CATALOG_PAGE_LIMIT = 100
 
 class NamespaceHandler:
     def __init__(self):
@@ -23,6 +19,60 @@ class NamespaceHandler:
         self.sandbox = self.auth.get_sandbox()
         self.token = self.auth.get_access_token()
 
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.sandbox,
+            "Accept": "application/json"
+        }
+
+    def fetch_datasets(self):
+        """Page through the catalog; returns dataset dicts with id, name, schemaRef and tags."""
+        url = f"{self.base_url}/catalog/dataSets"
+        datasets, start = [], 0
+        while True:
+            params = {"limit": CATALOG_PAGE_LIMIT, "start": start, "properties": "name,schemaRef,tags"}
+            response = http_client.get(url, headers=self._headers(), params=params)
+            response.raise_for_status()
+            page = response.json()
+            # Catalog returns an object keyed by dataset ID
+            page = page.get("children", page) if isinstance(page, dict) else page
+            items = page if isinstance(page, list) else [dict(value, id=key) for key, value in page.items()]
+            datasets.extend(items)
+            if len(items) < CATALOG_PAGE_LIMIT:
+                return datasets
+            start += len(items)
+
+    def build_field_index(self, refresh_mirror=False):
+        print("[cyan]🗂️ Building field index from the schema registry mirror...[/cyan]")
+        try:
+            mirror = SchemaRegistryMirror(REGISTRY_DIR)
+            if refresh_mirror or not len(mirror):
+                from rtcdp.api.modules.schema_data.schemas import SchemaManager
+                manager = SchemaManager()
+                manager.mirror_registry()
+                mirror = manager.mirror
+            index = FieldIndex.build(mirror, self.fetch_datasets(), mirror.descriptors())
+            index.save(FIELD_INDEX_PATH)
+        except requests.RequestException as e:
+            logging.error(f"Field index build failed: {e}")
+            print(f"[red]❌ Request error: {e}[/red]")
+            return None
+
+        print(f"[green]✔ Indexed {len(index.fields)} field paths across {len(index.schemas)} schemas "
+              f"and {len(index.datasets)} datasets.[/green]")
+        return index
+
+    def get_field_index(self):
+        index = FieldIndex.load(FIELD_INDEX_PATH)
+        if index is not None and index.mirror_version == SchemaRegistryMirror(REGISTRY_DIR).fingerprint():
+            return index
+        if index is not None:
+            logging.info("Schema registry mirror changed since the field index was built; rebuilding it.")
+        return self.build_field_index()
+
     def search_datasets_by_namespace(self):
         print("\n[bold]🔍 Search Datasets by Namespace[/bold]")
         namespace = input("Enter identity namespace (e.g. ECID, EMAIL, IDPUSERID): ").strip()
@@ -31,48 +81,74 @@ class NamespaceHandler:
             print("[yellow]⚠️ No namespace provided.[/yellow]")
             return
 
-        url = f"{self.base_url}/catalog/dataSets"
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "x-api-key": self.api_key,
-            "x-gw-ims-org-id": self.org_id,
-            "x-sandbox-name": self.sandbox,
-            "Accept": "application/json"
-        }
+        index = self.get_field_index()
+        if index is None:
+            return
+        matched = index.datasets_with_namespace(namespace)
+        if not matched:
+            print(f"[yellow]⚠️ No datasets found using namespace '{namespace}'.[/yellow]")
+            return
 
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            datasets = response.json().get("children", [])
+        print(f"\n[green]✔ Found {len(matched)} dataset(s) using namespace '{namespace}':[/green]")
+        for i, (dataset_id, paths) in enumerate(matched.items(), 1):
+            print(f"{i}. [bold]{index.datasets[dataset_id]['name']}[/bold] | ID: {dataset_id} | Identity: {', '.join(paths)}")
+
+    def search_datasets_by_field(self):
+        print("\n[bold]🔍 Search Datasets by Field Path[/bold]")
+        term = input("Enter a field path or part of one (e.g. mobilePhone.countryCode): ").strip()
+        if not term:
+            print("[yellow]⚠️ No field provided.[/yellow]")
+            return
+
+        index = self.get_field_index()
+        if index is None:
+            return
+        paths = {term: index.fields[term]["types"]} if term in index.fields else index.search_fields(term)
+        if not paths:
+            print(f"[yellow]⚠️ No field paths match '{term}'.[/yellow]")
+            return
 
-            matched = []
-            for ds in datasets:
-                schema = ds.get("schema", {})
-                if namespace.lower() in str(schema).lower():
-                    matched.append(ds)
+        for path, types in sorted(paths.items()):
+            datasets = index.datasets_with_field(path)
+            print(f"[bold]{path}[/bold] ({', '.join(types)}) → {len(datasets)} dataset(s)")
+            for dataset_id in datasets:
+                print(f"   • {index.datasets[dataset_id]['table']} | ID: {dataset_id}")
 
-            if not matched:
-                print(f"[yellow]⚠️ No datasets found using namespace '{namespace}'.[/yellow]")
-                return
+    def generate_projection(self):
+        print("\n[bold]🧾 Generate Query Projection[/bold]")
+        dataset_id = input("Dataset ID: ").strip()
+        prefix = input("Only fields under path (blank for all): ").strip() or None
 
-            print(f"\n[green]✔ Found {len(matched)} dataset(s) using namespace '{namespace}':[/green]")
-            for i, ds in enumerate(matched, 1):
-                print(f"{i}. [bold]{ds.get('name')}[/bold] | ID: {ds.get('id')}")
-        except requests.RequestException as e:
-            logging.error(f"Namespace dataset search failed: {e}")
-            print(f"[red]❌ Request error: {e}[/red]")
+        index = self.get_field_index()
+        if index is None:
+            return None
+        if dataset_id not in index.datasets:
+            print("[yellow]⚠️ Dataset not in the field index. Rebuild the index if it was created recently.[/yellow]")
+            return None
+        sql = index.projection_sql(dataset_id, prefix, limit=100)
+        print(sql)
+        return sql
 
     def handle_namespace_search(self):
         while True:
             print("\n[bold]🔍 NAMESPACE SEARCH[/bold]")
             print("1️⃣ Search Datasets by Identity Namespace")
-            print("2️⃣ Back to Inspect Datalake Menu")
+            print("2️⃣ Search Datasets by Field Path")
+            print("3️⃣ Generate SELECT Projection for a Dataset")
+            print("4️⃣ Rebuild Field Index (refresh schema mirror)")
+            print("0️⃣ Back to Inspect Datalake Menu")
 
             choice = input("Select an option: ").strip()
 
             if choice == "1":
                 self.search_datasets_by_namespace()
             elif choice == "2":
+                self.search_datasets_by_field()
+            elif choice == "3":
+                self.generate_projection()
+            elif choice == "4":
+                self.build_field_index(refresh_mirror=True)
+            elif choice == "0":
                 break
             else:
-                print("[red]❌ Invalid choice. Try again.[/red]")
\ No newline at end of file
+                print("[red]❌ Invalid choice. Try again.[/red]")
@@ -0,0 +1,121 @@
+# rtcdp/api/modules/merge_policy.py
+
+import os
+import logging
+import requests
+from rich import print
+from rtcdp.utils import http_client
+from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.core.fragments import load_fragments, IDENTITY_COLUMN
+from rtcdp.core.identity_graph import IdentityGraph, GRAPH_DIR
+from rtcdp.core.merge_policy import MergePolicy, merge_profiles, compare_policies
+
+MERGED_OUTPUT_PATH = os.path.join("logs", "merged_profiles.csv")
+
+
+class MergePolicyManager:
+    def __init__(self):
+        self.auth = AuthHelper()
+        self.base_url = f"{self.auth.get_base_url()}/data/core/ups/config/mergePolicies"
+        self.token = self.auth.get_access_token()
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.auth.get_api_key(),
+            "x-gw-ims-org-id": self.auth.get_org_id(),
+            "x-sandbox-name": self.auth.get_sandbox(),
+            "Accept": "application/json"
+        }
+
+    def list_policies(self):
+        try:
+            response = http_client.get(self.base_url, headers=self.headers)
+            response.raise_for_status()
+            policies = response.json().get("children", [])
+            for i, policy in enumerate(policies, 1):
+                merge_type = policy.get("attributeMerge", {}).get("type")
+                print(f"{i}. [bold]{policy.get('name')}[/bold] ({merge_type}) | ID: {policy.get('id')}")
+            return policies
+        except requests.RequestException as e:
+            logging.error(f"Failed to list merge policies: {e}")
+            print(f"[red]❌ Failed to list merge policies: {e}[/red]")
+            return []
+
+    def get_policy(self, policy_id):
+        response = http_client.get(f"{self.base_url}/{policy_id}", headers=self.headers)
+        response.raise_for_status()
+        return MergePolicy.from_definition(response.json())
+
+    @staticmethod
+    def _load_inputs(fragments_path, dataset_column, graph_dir, identity_namespace=None):
+        fragments = load_fragments(fragments_path, dataset_column=dataset_column or None,
+                                   identity_namespace=identity_namespace or None)
+        graph = IdentityGraph(graph_dir) if os.path.exists(os.path.join(graph_dir, "keys.npy")) else None
+        if graph is None:
+            print("[yellow]⚠️ No local identity graph found; fragments merge on their own identity only.[/yellow]")
+        elif not fragments[IDENTITY_COLUMN].astype(str).str.contains(":", regex=False).any():
+            # Graph keys are "NS:value"; bare IDs never match, so nothing would stitch
+            print("[yellow]⚠️ Fragment identities have no namespace; give the identity namespace "
+                  "(e.g. ECID) to stitch them through the identity graph.[/yellow]")
+        return fragments, graph
+
+    def simulate_merge(self, policy_id, fragments_path, dataset_column=None,
+                       output_path=MERGED_OUTPUT_PATH, graph_dir=GRAPH_DIR, identity_namespace=None):
+        print("[cyan]🧩 Simulating merge locally...[/cyan]")
+        try:
+            policy = self.get_policy(policy_id)
+            fragments, graph = self._load_inputs(fragments_path, dataset_column, graph_dir, identity_namespace)
+            merged = merge_profiles(fragments, policy, graph)
+            merged.to_csv(output_path)
+            print(f"[green]✔ {len(fragments)} fragments → {len(merged)} profiles ({policy.name}). Saved to {output_path}[/green]")
+            return merged
+        except (requests.RequestException, FileNotFoundError, ValueError) as e:
+            logging.error(f"Merge simulation failed: {e}")
+            print(f"[red]❌ Merge simulation failed: {e}[/red]")
+            return None
+
+    def compare_policy_change(self, current_id, proposed_id, fragments_path, dataset_column=None, graph_dir=GRAPH_DIR,
+                              identity_namespace=None):
+        print("[cyan]🧩 Comparing merge policies locally...[/cyan]")
+        try:
+            current, proposed = self.get_policy(current_id), self.get_policy(proposed_id)
+            fragments, graph = self._load_inputs(fragments_path, dataset_column, graph_dir, identity_namespace)
+            diff = compare_policies(fragments, current, proposed, graph)
+        except (requests.RequestException, FileNotFoundError, ValueError) as e:
+            logging.error(f"Merge policy comparison failed: {e}")
+            print(f"[red]❌ Merge policy comparison failed: {e}[/red]")
+            return None
+
+        print(f"[green]✔ {len(diff['changed_profiles'])} of {diff['profiles_after']} profiles change under '{proposed.name}'.[/green]")
+        if not diff["changed_attributes"].empty:
+            print("[bold]Changed attributes:[/bold]")
+            print(diff["changed_attributes"].to_string())
+        return diff
+
+    def handle_merge_policies(self):
+        while True:
+            print("\n[bold]🧩 MERGE POLICIES[/bold]")
+            print("1️⃣ List Merge Policies")
+            print("2️⃣ Simulate Merge on Exported Fragments")
+            print("3️⃣ Compare Two Policies on Exported Fragments")
+            print("0️⃣ Back to Segmentation Menu")
+
+            choice = input("Select an option: ").strip()
+
+            if choice == "1":
+                self.list_policies()
+            elif choice in ("2", "3"):
+                fragments_path = input("Fragments export or fragment store path: ").strip()
+                dataset_column = input("Dataset ID column (blank if single dataset or fragment store): ").strip()
+                namespace = input("Identity namespace of the _id column, e.g. ECID (blank if already NS:value): ").strip()
+                if choice == "2":
+                    self.simulate_merge(input("Merge policy ID: ").strip(), fragments_path, dataset_column,
+                                        identity_namespace=namespace)
+                else:
+                    current_id = input("Current merge policy ID: ").strip()
+                    proposed_id = input("Proposed merge policy ID: ").strip()
+                    self.compare_policy_change(current_id, proposed_id, fragments_path, dataset_column,
+                                               identity_namespace=namespace)
+            elif choice == "0":
+                break
+            else:
+                print("[red]❌ Invalid choice. Try again.[/red]")
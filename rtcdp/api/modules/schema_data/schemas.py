@@ -2,18 +2,23 @@ import json
 import os
 import logging
 import requests
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 from rich import print
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.core.schema_registry import SchemaRegistryMirror, RESOURCE_TYPES, REGISTRY_DIR
+from rtcdp.core.json_patch import make_patch
 
-# Configure Logging
-LOG_DIR = "logs"
-SCHEMA_LOG = "schemas.log"
-os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{SCHEMA_LOG}",
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
+REGISTRY_CONTAINERS = ("tenant", "global")
+REGISTRY_PAGE_LIMIT = 300
+MAX_REGISTRY_WORKERS = 8
+PATCH_BATCH_SIZE = 100
+
+# Server-managed keys; never part of a patch
+READ_ONLY_KEYS = (
+    "$id", "meta:altId", "meta:resourceType", "version", "meta:registryMetadata", "meta:containerId",
+    "imsOrg", "meta:sandboxId", "meta:sandboxType", "meta:tenantNamespace", "meta:createdDate",
 )
 
 class SchemaManager:
@@ -24,6 +29,97 @@ class SchemaManager:
         self.org_id = self.auth.get_org_id()
         self.sandbox = self.auth.get_sandbox()
         self.token = self.auth.get_access_token()
+        self.mirror = SchemaRegistryMirror(REGISTRY_DIR)
+
+    def _headers(self, accept):
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "x-api-key": self.api_key,
+            "x-gw-ims-org-id": self.org_id,
+            "x-sandbox-name": self.sandbox,
+            "Accept": accept
+        }
+
+    def iter_resources(self, container, resource_type):
+        """Yield registry listing entries ($id, title, version, ...) page by page."""
+        url = f"{self.base_url}/{container}/{resource_type}"
+        params = {"limit": REGISTRY_PAGE_LIMIT}
+        while True:
+            response = http_client.get(url, headers=self._headers("application/vnd.adobe.xed-id+json"), params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield from data.get("results", [])
+            next_start = data.get("_page", {}).get("next")
+            if not next_start:
+                return
+            params["start"] = next_start
+
+    def _list_resources(self, container, resource_type):
+        """Page through one registry listing; returns (container, type, [summary])."""
+        return container, resource_type, list(self.iter_resources(container, resource_type))
+
+    def _fetch_resource(self, container, resource_type, summary):
+        major = str(summary.get("version", "1")).split(".")[0]
+        url = f"{self.base_url}/{container}/{resource_type}/{quote(summary['$id'], safe='')}"
+        response = http_client.get(url, headers=self._headers(f"application/vnd.adobe.xed+json; version={major}"))
+        response.raise_for_status()
+        return container, resource_type, response.json()
+
+    def _fetch_descriptors(self):
+        url = f"{self.base_url}/tenant/descriptors"
+        params = {"limit": REGISTRY_PAGE_LIMIT}
+        descriptors = []
+        while True:
+            response = http_client.get(url, headers=self._headers("application/vnd.adobe.xdm+json"), params=params)
+            response.raise_for_status()
+            data = response.json()
+            descriptors.extend(data.get("descriptors", data.get("results", [])))
+            next_start = data.get("_page", {}).get("next")
+            if not next_start:
+                return descriptors
+            params["start"] = next_start
+
+    def mirror_registry(self, max_workers=MAX_REGISTRY_WORKERS):
+        """Pull every tenant and global registry resource into the local mirror; only new versions are downloaded."""
+        print("[cyan]\n🪞 Mirroring schema registry...[/cyan]")
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                descriptors = pool.submit(self._fetch_descriptors)
+                listings = list(pool.map(
+                    lambda args: self._list_resources(*args),
+                    [(c, t) for c in REGISTRY_CONTAINERS for t in RESOURCE_TYPES]
+                ))
+                stale = [
+                    (container, resource_type, summary)
+                    for container, resource_type, summaries in listings
+                    for summary in summaries
+                    if self.mirror.version(summary["$id"]) != str(summary.get("version"))
+                ]
+                updated = 0
+                for container, resource_type, resource in pool.map(lambda args: self._fetch_resource(*args), stale):
+                    updated += self.mirror.put(resource, container, resource_type)
+                self.mirror.put_descriptors(descriptors.result())
+            self.mirror.save_index()
+        except requests.RequestException as e:
+            self.mirror.save_index()
+            print(f"[red]❌ Registry mirror failed: {e}[/red]")
+            logging.error(f"Registry mirror failed: {e}")
+            return None
+
+        total = sum(len(summaries) for _, _, summaries in listings)
+        print(f"[green]✔ {total} resources mirrored ({updated} new or updated) → {REGISTRY_DIR}[/green]")
+        logging.info(f"Mirrored schema registry: {total} resources, {updated} updated")
+        return updated
+
+    def get_resolved_schema(self, schema_id):
+        """Fully resolved schema from the local mirror, or None if it isn't mirrored."""
+        if schema_id not in self.mirror:
+            return None
+        try:
+            return self.mirror.resolve(schema_id)
+        except ValueError as e:
+            logging.error(f"Failed to resolve schema {schema_id}: {e}")
+            return None
 
     def list_schemas(self, container="tenant"):
         print("[cyan]\n📘 Listing Schemas...[/cyan]")
@@ -37,7 +133,7 @@ class SchemaManager:
         url = f"{self.base_url}/{container}/schemas"
 
         try:
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             response.raise_for_status()
             schemas = response.json().get("results", [])
 
@@ -54,8 +150,14 @@ class SchemaManager:
             logging.error(f"Failed to list schemas: {e}")
             return []
 
-    def get_schema_by_id(self, container, schema_id):
+    def get_schema_by_id(self, container, schema_id, use_mirror=True):
         print(f"[cyan]\n🔍 Retrieving schema {schema_id}...[/cyan]")
+        if use_mirror:
+            schema_details = self.get_resolved_schema(schema_id)
+            if schema_details is not None:
+                print(json.dumps(schema_details, indent=2))
+                print(f"[green]✔ Served from local registry mirror (version {self.mirror.version(schema_id)}).[/green]")
+                return schema_details
         headers = {
             "Authorization": f"Bearer {self.token}",
             "x-api-key": self.api_key,
@@ -66,7 +168,7 @@ class SchemaManager:
         url = f"{self.base_url}/{container}/schemas/{schema_id}"
 
         try:
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             response.raise_for_status()
             schema_details = response.json()
             print(json.dumps(schema_details, indent=2))
@@ -101,7 +203,7 @@ class SchemaManager:
         url = f"{self.base_url}/tenant/schemas"
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload)
             response.raise_for_status()
             new_schema = response.json()
             print(f"[green]✔ Schema created. ID: {new_schema.get('$id')}[/green]")
@@ -121,16 +223,78 @@ class SchemaManager:
         }
 
         try:
-            response = requests.delete(url, headers=headers)
+            response = http_client.delete(url, headers=headers)
             if response.status_code == 204:
                 print("[green]✔ Schema deleted successfully.[/green]")
                 logging.info(f"Deleted schema ID: {schema_id}")
+                self.mirror.discard(schema_id)
             else:
                 print(f"[red]❌ Failed to delete schema: {response.status_code}[/red]")
         except Exception as e:
             print(f"[red]❌ Error deleting schema: {e}[/red]")
             logging.error(f"Error deleting schema {schema_id}: {e}")
 
+    def get_current_schema(self, schema_id):
+        """Raw (unresolved) schema as stored in the registry, from the mirror when possible."""
+        cached = self.mirror.raw(schema_id)
+        if cached is not None:
+            return cached
+        _, _, schema = self._fetch_resource("tenant", "schemas", {"$id": schema_id})
+        return schema
+
+    @staticmethod
+    def plan_schema_patch(current, desired):
+        """Minimal JSON Patch from ``current`` to ``desired``, ignoring server-managed keys."""
+        strip = lambda doc: {k: v for k, v in doc.items() if k not in READ_ONLY_KEYS}
+        return make_patch(strip(current), strip(desired))
+
+    def send_patch(self, schema_id, ops):
+        """PATCH ``ops`` in batches of ``PATCH_BATCH_SIZE``; batches for one schema go in order."""
+        url = f"{self.base_url}/tenant/schemas/{quote(schema_id, safe='')}"
+        headers = self._headers("application/vnd.adobe.xed+json")
+        headers["Content-Type"] = "application/json"
+        for start in range(0, len(ops), PATCH_BATCH_SIZE):
+            response = http_client.request("PATCH", url, headers=headers, json=ops[start:start + PATCH_BATCH_SIZE])
+            response.raise_for_status()
+        self.mirror.discard(schema_id)
+        logging.info(f"Patched schema ID: {schema_id} with {len(ops)} operations")
+
+    def apply_schema_definition(self, desired):
+        """Bring one registry schema in line with a desired local definition; returns (id, ops)."""
+        schema_id = desired.get("$id") or desired.get("meta:altId")
+        if not schema_id:
+            raise ValueError("Schema definition needs a $id or meta:altId.")
+        ops = self.plan_schema_patch(self.get_current_schema(schema_id), desired)
+        if ops:
+            self.send_patch(schema_id, ops)
+        return schema_id, ops
+
+    def sync_schema_definitions(self, paths, max_workers=MAX_REGISTRY_WORKERS):
+        """Diff many local schema definition files against the registry and patch them concurrently."""
+        print(f"[cyan]\n🔧 Syncing {len(paths)} schema definition(s)...[/cyan]")
+        definitions = []
+        for path in paths:
+            with open(path, "r") as f:
+                definitions.append(json.load(f))
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.apply_schema_definition, d): d for d in definitions}
+            for future, desired in futures.items():
+                schema_id = desired.get("$id") or desired.get("meta:altId")
+                try:
+                    _, ops = future.result()
+                    results[schema_id] = ops
+                    full_size = len(json.dumps(desired))
+                    patch_size = len(json.dumps(ops))
+                    status = f"{len(ops)} op(s), {patch_size} of {full_size} bytes" if ops else "already up to date"
+                    print(f"[green]✔ {schema_id}: {status}[/green]")
+                except (requests.RequestException, ValueError) as e:
+                    results[schema_id] = None
+                    print(f"[red]❌ {schema_id}: {e}[/red]")
+                    logging.error(f"Schema sync failed for {schema_id}: {e}")
+        return results
+
     def update_schema(self):
         print("[cyan]\n✏ Update Schema[/cyan]")
         schema_id = input("Enter schema ID to update: ").strip()
@@ -140,27 +304,15 @@ class SchemaManager:
         ref = input("Enter allOf $refs (comma-separated): ").strip()
         allOf = [{"$ref": r.strip()} for r in ref.split(",") if r.strip()]
 
-        payload = {
-            "type": "object",
-            "title": title,
-            "description": description,
-            "allOf": allOf
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "x-api-key": self.api_key,
-            "x-gw-ims-org-id": self.org_id,
-            "x-sandbox-name": self.sandbox,
-            "Content-Type": "application/json"
-        }
-        url = f"{self.base_url}/tenant/schemas/{schema_id}"
-
         try:
-            response = requests.put(url, headers=headers, json=payload)
-            response.raise_for_status()
-            print("[green]✔ Schema updated successfully.[/green]")
-            logging.info(f"Updated schema ID: {schema_id}")
+            current = self.get_current_schema(schema_id)
+            desired = dict(current, type="object", title=title, description=description, allOf=allOf)
+            ops = self.plan_schema_patch(current, desired)
+            if not ops:
+                print("[yellow]⚠ No changes to apply.[/yellow]")
+                return
+            self.send_patch(schema_id, ops)
+            print(f"[green]✔ Schema updated successfully ({len(ops)} operation(s)).[/green]")
         except Exception as e:
             print(f"[red]❌ Failed to update schema: {e}[/red]")
             logging.error(f"Update error for schema {schema_id}: {e}")
@@ -183,10 +335,11 @@ class SchemaManager:
         }
 
         try:
-            response = requests.patch(url, headers=headers, json=payload)
+            response = http_client.patch(url, headers=headers, json=payload)
             response.raise_for_status()
             print("[green]✔ Schema patched successfully.[/green]")
             logging.info(f"Patched schema ID: {schema_id} with {payload}")
+            self.mirror.discard(schema_id)
         except Exception as e:
             print(f"[red]❌ Patch failed: {e}[/red]")
             logging.error(f"Patch failed for {schema_id}: {e}")
@@ -1,10 +1,20 @@
 # modules/segment_data/audience_handler.py
 
-import requests
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.utils.helpers import TTLCache
 from rich import print
 
+AUDIENCE_PAGE_SIZE = 50
+AUDIENCE_CACHE_TTL = 300
+MAX_PAGE_WORKERS = 8
+
+# Shared by every handler so list and single-audience views hit the same entries
+_audience_cache = TTLCache(ttl=AUDIENCE_CACHE_TTL)
+
 class AudienceHandler:
     def __init__(self, auth_helper: AuthHelper):
         self.auth = auth_helper
@@ -17,17 +27,58 @@ class AudienceHandler:
             "x-sandbox-name": self.auth.get_sandbox(),
             "Content-Type": "application/json"
         }
+        self.sandbox = self.headers["x-sandbox-name"]
+
+    def _cache_key(self, audience_id):
+        # The daemon serves callers with different credentials; keep their orgs apart
+        return (self.base_url, self.headers["x-gw-ims-org-id"], self.sandbox, audience_id)
+
+    def _fetch_page(self, start):
+        params = {"start": start, "limit": AUDIENCE_PAGE_SIZE}
+        response = http_client.get(self.base_url, headers=self.headers, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_all_audiences(self, force_refresh=False):
+        """Return the full audience inventory, paging concurrently and serving from cache when fresh."""
+        if not force_refresh:
+            cached = _audience_cache.get(self._cache_key(None))
+            if cached is not None:
+                return cached
+
+        first_page = self._fetch_page(0)
+        audiences = list(first_page.get("children", []))
+        total = first_page.get("_page", {}).get("totalCount")
+
+        if total is not None:
+            page_size = len(audiences)
+            starts = range(page_size, total, page_size) if page_size else []
+            with ThreadPoolExecutor(max_workers=MAX_PAGE_WORKERS) as pool:
+                for page in pool.map(self._fetch_page, starts):
+                    audiences.extend(page.get("children", []))
+        else:
+            # No total advertised: walk pages until a short one comes back
+            page = first_page
+            while len(page.get("children", [])) == AUDIENCE_PAGE_SIZE:
+                page = self._fetch_page(len(audiences))
+                audiences.extend(page.get("children", []))
 
-    def list_audiences(self):
+        for audience in audiences:
+            _audience_cache.set(self._cache_key(audience.get("id")), audience)
+        _audience_cache.set(self._cache_key(None), audiences)
+        logging.info(f"Fetched {len(audiences)} audiences (sandbox: {self.sandbox})")
+        return audiences
+
+    def list_audiences(self, force_refresh=False):
         print("[cyan]📋 Fetching existing audiences...[/cyan]")
         try:
-            response = requests.get(self.base_url, headers=self.headers)
-            response.raise_for_status()
-            data = response.json().get("children", [])
-            for idx, audience in enumerate(data, 1):
+            audiences = self.fetch_all_audiences(force_refresh=force_refresh)
+            for idx, audience in enumerate(audiences, 1):
                 print(f"{idx}. {audience.get('name')} (ID: {audience.get('id')})")
+            return audiences
         except Exception as e:
             print(f"[red]❌ Failed to list audiences: {e}[/red]")
+            return []
 
     def create_audience(self, name, description, pql_expr):
         payload = {
@@ -45,8 +96,9 @@ class AudienceHandler:
         }
 
         try:
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
+            response = http_client.post(self.base_url, headers=self.headers, json=payload)
             response.raise_for_status()
+            _audience_cache.invalidate(self._cache_key(None))
             print("[green]✔ Audience created successfully![/green]")
             print(response.json())
         except Exception as e:
@@ -54,18 +106,44 @@ class AudienceHandler:
 
     def delete_audience(self, audience_id):
         try:
-            response = requests.delete(f"{self.base_url}/{audience_id}", headers=self.headers)
+            response = http_client.delete(f"{self.base_url}/{audience_id}", headers=self.headers)
             if response.status_code == 204:
+                _audience_cache.invalidate(self._cache_key(audience_id))
+                _audience_cache.invalidate(self._cache_key(None))
                 print(f"[green]✔ Audience {audience_id} deleted.[/green]")
             else:
                 print(f"[yellow]⚠️ Response: {response.status_code}[/yellow]")
         except Exception as e:
             print(f"[red]❌ Error deleting audience: {e}[/red]")
 
-    def get_audience_by_id(self, audience_id):
+    def get_audience_by_id(self, audience_id, force_refresh=False):
+        audience = None if force_refresh else _audience_cache.get(self._cache_key(audience_id))
         try:
-            response = requests.get(f"{self.base_url}/{audience_id}", headers=self.headers)
-            response.raise_for_status()
-            print(json.dumps(response.json(), indent=2))
+            if audience is None:
+                response = http_client.get(f"{self.base_url}/{audience_id}", headers=self.headers)
+                response.raise_for_status()
+                audience = response.json()
+                _audience_cache.set(self._cache_key(audience_id), audience)
+            print(json.dumps(audience, indent=2))
+            return audience
         except Exception as e:
             print(f"[red]❌ Failed to retrieve audience: {e}[/red]")
+            return None
+
+    def preview_audience(self, pql_expr, snapshot_path, sample_size=10):
+        from rtcdp.core.pql import preview_audience, PQLError
+        print("[cyan]🧪 Evaluating PQL against local snapshot...[/cyan]")
+        try:
+            result = preview_audience(pql_expr, snapshot_path, sample_size=sample_size)
+        except (PQLError, FileNotFoundError) as e:
+            print(f"[red]❌ Preview failed: {e}[/red]")
+            return None
+
+        print(
+            f"[green]✔ Estimated size: [bold]{result['matched']}[/bold] of {result['total']} profiles "
+            f"({result['ratio']:.1%}) in {result['elapsed_ms']:.1f} ms[/green]"
+        )
+        if not result["sample"].empty:
+            print(f"[bold]Sample members (first {len(result['sample'])}):[/bold]")
+            print(result["sample"].to_string(index=False))
+        return result
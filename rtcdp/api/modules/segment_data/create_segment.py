@@ -1,4 +1,4 @@
-import requests
+from rtcdp.utils import http_client
 import json
 from api.modules.segment_data.merge_policy_utils import MergePolicyHelper
 
@@ -38,7 +38,7 @@ class CreateSegment:
             "mergePolicyId": selected_policy_id
         }
 
-        response = requests.post(self.segment_jobs_url, headers=self.headers, data=json.dumps(payload))
+        response = http_client.post(self.segment_jobs_url, headers=self.headers, data=json.dumps(payload))
         if response.status_code in [200, 201]:
             print(f"✅ Segment '{name}' created successfully.")
         else:
@@ -1,4 +1,4 @@
-import requests
+from rtcdp.utils import http_client
 import time
 
 class ListSegments:
@@ -19,7 +19,7 @@ class ListSegments:
         for _ in range(max_pages):
             full_url = f"{self.url}?start={start}&limit={limit}"
             print(f"🔄 Fetching segments {start} to {start + limit - 1}")
-            response = requests.get(full_url, headers=self.headers)
+            response = http_client.get(full_url, headers=self.headers)
 
             if response.status_code != 200:
                 print(f"❌ Failed to retrieve segments: {response.status_code}")
@@ -1,4 +1,4 @@
-import requests
+from rtcdp.utils import http_client
 
 class MergePolicyHelper:
     def __init__(self, auth_helper):
@@ -7,7 +7,7 @@ class MergePolicyHelper:
         self.url = self.auth.get_endpoint("merge_policies")
 
     def get_merge_policies(self):
-        response = requests.get(self.url, headers=self.headers)
+        response = http_client.get(self.url, headers=self.headers)
         if response.status_code != 200:
             print(f"❌ Merge policy retrieval failed: {response.status_code}")
             return []
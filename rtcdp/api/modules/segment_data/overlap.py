@@ -0,0 +1,90 @@
+# modules/segment_data/overlap.py
+
+import os
+import logging
+from rich import print
+from rtcdp.core.snapshot import load_profile_snapshot
+from rtcdp.core.bitmap_index import SegmentBitmapIndex, INDEX_DIR
+
+
+class AudienceOverlapHandler:
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.index = None
+
+    def load_index(self):
+        if self.index is None:
+            if not os.path.exists(os.path.join(self.index_dir, "manifest.json")):
+                print("[yellow]⚠️ No segment index found. Build one from an export first.[/yellow]")
+                return None
+            self.index = SegmentBitmapIndex.load(self.index_dir)
+        return self.index
+
+    def build_index(self, export_path, id_column="_id"):
+        print("[cyan]🧱 Building segment bitmap index...[/cyan]")
+        try:
+            frame = load_profile_snapshot(export_path)
+            self.index = SegmentBitmapIndex.from_export(frame, id_column=id_column)
+            self.index.save(self.index_dir)
+            print(f"[green]✔ Indexed {len(self.index.segments)} segments over {len(self.index.dictionary)} profiles.[/green]")
+        except (FileNotFoundError, ValueError) as e:
+            logging.error(f"Segment index build failed: {e}")
+            print(f"[red]❌ Failed to build index: {e}[/red]")
+
+    def show_overlap(self, segment_ids=None):
+        index = self.load_index()
+        if not index:
+            return None
+        try:
+            matrix = index.overlap_matrix(segment_ids)
+        except KeyError as e:
+            print(f"[red]❌ {e}[/red]")
+            return None
+        print("[bold]📊 Audience Overlap (profiles in both):[/bold]")
+        print(matrix.to_string())
+        return matrix
+
+    def combine(self, operation, segment_ids):
+        index = self.load_index()
+        if not index:
+            return None
+        try:
+            if operation == "and":
+                result = index.intersection(*segment_ids)
+            elif operation == "or":
+                result = index.union(*segment_ids)
+            else:
+                result = index.difference(*segment_ids)
+        except KeyError as e:
+            print(f"[red]❌ {e}[/red]")
+            return None
+        print(f"[green]✔ {len(result)} profiles[/green] | sample: {index.members(result, limit=5)}")
+        return result
+
+    def handle_overlap(self):
+        while True:
+            print("\n[bold]📊 AUDIENCE OVERLAP[/bold]")
+            print("1️⃣ Build Index from Segment Export")
+            print("2️⃣ Show Overlap Matrix")
+            print("3️⃣ Intersection (A and B ...)")
+            print("4️⃣ Union (A or B ...)")
+            print("5️⃣ Difference (A minus B ...)")
+            print("0️⃣ Back to Segmentation Menu")
+
+            choice = input("Select an option: ").strip()
+
+            if choice == "1":
+                export_path = input("Export path (file or directory): ").strip()
+                id_column = input("Profile ID column [_id]: ").strip() or "_id"
+                self.build_index(export_path, id_column)
+            elif choice == "2":
+                ids = input("Segment IDs (comma-separated, blank for all): ").strip()
+                self.show_overlap([s.strip() for s in ids.split(",") if s.strip()] or None)
+            elif choice in ("3", "4", "5"):
+                ids = [s.strip() for s in input("Segment IDs (comma-separated): ").split(",") if s.strip()]
+                if ids:
+                    self.combine({"3": "and", "4": "or", "5": "not"}[choice], ids)
+            elif choice == "0":
+                break
+            else:
+                print("[red]❌ Invalid choice. Try again.[/red]")
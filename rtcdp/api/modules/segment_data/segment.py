@@ -1,7 +1,8 @@
 # modules/segment_data/segment_manager.py
 
+import json
 import time
-import requests
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
 from api.modules.segment_data.merge_policy_utils import MergePolicyHelper
 from rich import print
@@ -30,6 +31,15 @@ class SegmentManager:
         description = input("Enter description: ").strip()
         pql = input("Enter PQL expression: ").strip()
 
+        snapshot_path = input("Local snapshot path for a size preview (leave blank to skip): ").strip()
+        if snapshot_path:
+            from rtcdp.core.pql import preview_audience, PQLError
+            try:
+                preview = preview_audience(pql, snapshot_path)
+                print(f"🧪 Estimated size: {preview['matched']} of {preview['total']} profiles ({preview['ratio']:.1%})")
+            except (PQLError, FileNotFoundError) as e:
+                print(f"⚠️ Preview skipped: {e}")
+
         merge_policies = self.policy_helper.get_merge_policies()
         if not merge_policies:
             print("❌ No merge policies available.")
@@ -53,7 +63,7 @@ class SegmentManager:
             "mergePolicyId": selected_policy_id
         }
 
-        response = requests.post(self.segment_jobs_url, headers=self.headers, data=json.dumps(payload))
+        response = http_client.post(self.segment_jobs_url, headers=self.headers, data=json.dumps(payload))
         if response.status_code in [200, 201]:
             print(f"✅ Segment '{name}' created successfully.")
         else:
@@ -75,7 +85,7 @@ class SegmentManager:
         for _ in range(max_pages):
             full_url = f"{self.url}?start={start}&limit={limit}"
             print(f"🔄 Fetching segments {start} to {start + limit - 1}")
-            response = requests.get(full_url, headers=self.headers)
+            response = http_client.get(full_url, headers=self.headers)
 
             if response.status_code != 200:
                 print(f"❌ Failed to retrieve segments: {response.status_code}")
@@ -116,7 +126,7 @@ class SegmentManager:
         }
 
         try:
-            response = requests.post(f"{self.base_url}/audiences", headers=self.headers, json=payload)
+            response = http_client.post(f"{self.base_url}/audiences", headers=self.headers, json=payload)
             response.raise_for_status()
             print("[green]✔ 'All Profiles' segment created successfully![/green]")
         except Exception as e:
@@ -1,16 +1,11 @@
 import json
-import requests
 import logging
 import os
 import subprocess
 import time
+from rtcdp.utils import http_client
 
-# Configure logging
-logging.basicConfig(
-    filename="segment_export.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+EXPORT_POLL_SECONDS = 10
 
 class SegmentExporter:
     def __init__(self, credentials_file, environment):
@@ -57,7 +52,7 @@ class SegmentExporter:
             "x-sandbox-name": self.environment["sandbox_id"]
         }
 
-        response = requests.get(test_url, headers=headers)
+        response = http_client.get(test_url, headers=headers)
 
         if response.status_code == 401:
             logging.warning("⚠️ OAuth token is invalid. Refreshing token...")
@@ -80,7 +75,7 @@ class SegmentExporter:
         }
 
         payload = [{"segmentId": segment_id}]
-        response = requests.post(url, headers=headers, json=payload)
+        response = http_client.post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             job_info = response.json()
@@ -112,7 +107,7 @@ class SegmentExporter:
             "name": "Stitched Profiles Snapshot Export"
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = http_client.post(url, headers=headers, json=payload)
 
         if response.status_code in [200, 201]:
             export_job = response.json()
@@ -138,21 +133,21 @@ class SegmentExporter:
 
         print("⏳ Monitoring export job status...")
         while True:
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             if response.status_code == 200:
                 status = response.json().get("status")
                 print(f"🔍 Export status: {status}")
                 if status == "SUCCEEDED":
                     print("🎉 Export completed successfully!")
-                    break
+                    return status
                 elif status in ["FAILED", "CANCELLED"]:
                     print(f"❌ Export failed with status: {status}")
-                    break
+                    return status
                 else:
-                    time.sleep(10)
+                    time.sleep(EXPORT_POLL_SECONDS)
             else:
                 print(f"❌ Failed to fetch export status: {response.text}")
-                break
+                return None
 
 # === Terminal Entry Point ===
 def main():
@@ -188,4 +183,6 @@ def main():
         exporter.monitor_export_status(job_id)
 
 if __name__ == "__main__":
+    from rtcdp.core.logger import setup_logging
+    setup_logging("segment_export")
     main()
@@ -1,7 +1,9 @@
 # modules/segment_data/snapshot_export.py
 
-import requests
+import json
+from rtcdp.utils import http_client
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.core.snapshot_diff import diff_snapshots
 from rich import print
 from datetime import datetime
 
@@ -30,7 +32,7 @@ class SnapshotExporter:
 
         try:
             url = f"{self.base_url}/data/core/ups/profileSnapshots"
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = http_client.post(url, headers=self.headers, json=payload)
             if response.status_code in [200, 201, 202]:
                 print("[green]✔ Snapshot export started successfully.[/green]")
                 print(json.dumps(response.json(), indent=2))
@@ -38,3 +40,20 @@ class SnapshotExporter:
                 print(f"[red]❌ Snapshot failed: {response.text}[/red]")
         except Exception as e:
             print(f"[red]❌ Error triggering snapshot: {e}[/red]")
+
+    def compare_snapshots(self, old_path, new_path, id_column="_id"):
+        print("[cyan]🔍 Diffing profile snapshots...[/cyan]")
+        try:
+            summary = diff_snapshots(old_path, new_path, id_column=id_column)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"[red]❌ Snapshot diff failed: {e}[/red]")
+            return None
+
+        print(f"[green]✔ {summary['old_rows']} → {summary['new_rows']} profiles in {summary['elapsed_s']}s[/green]")
+        print(f"  ➕ Added: {summary['added']}")
+        print(f"  ➖ Removed: {summary['removed']}")
+        print(f"  ✏️ Changed: {summary['changed']}")
+        for field, count in list(summary["changed_fields"].items())[:20]:
+            print(f"     • {field}: {count}")
+        print(f"[green]Field-level deltas saved to {summary['output_path']}[/green]")
+        return summary
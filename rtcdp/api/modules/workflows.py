@@ -0,0 +1,162 @@
+# rtcdp/api/modules/workflows.py
+
+import os
+import sys
+import json
+import shlex
+import logging
+import importlib
+import subprocess
+from rtcdp.core.workflow import Workflow, WorkflowRunner, WORKFLOW_DIR
+
+DEFAULT_CREDENTIALS = os.path.join("CREDS", "cit_credentials.json")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+# ── actions ──────────────────────────────────────────────────────────────
+# Each action takes the step's ``with:`` mapping as keyword arguments, raises
+# on failure and returns a dict that later steps can reference as
+# ``${steps.<id>.<key>}``.
+
+def refresh_token(force=False):
+    from rtcdp.utils.auth_helper import AuthHelper
+    auth = AuthHelper()
+    if force:
+        auth.refresh_token()
+    token = auth.get_access_token()
+    if not token:
+        raise RuntimeError("Could not obtain a valid access token")
+    return {"expires_at": auth.credentials.get("token_expires_at")}
+
+
+def run_query(name, params=None, output=None):
+    from rtcdp.api.modules.inspect_data.queries import QueryHandler
+    handler = QueryHandler()
+    meta = handler.find_query(name)
+    if meta is None:
+        raise ValueError(f"Query not found: {name}")
+    sql = handler.fill_query(meta.get("sql", ""), {k: str(v) for k, v in (params or {}).items()})
+    query_id = handler.submit_query(sql)
+    state = handler.poll_query_status(query_id) if query_id else None
+    if state != "SUCCEEDED":
+        raise RuntimeError(f"Query {query_id or '(not submitted)'} finished as {state}")
+
+    rows = handler.fetch_query_results(query_id)
+    output = output or os.path.join("logs", f"{meta.get('alias', name)}.parquet")
+    if output.endswith((".parquet", ".csv")):
+        from rtcdp.utils.columnar import ColumnarWriter
+        from rtcdp.utils.helpers import flatten_record
+        with ColumnarWriter(output) as writer:
+            writer.write(flatten_record(row) for row in rows)
+        output = writer.path
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+    return {"query_id": query_id, "rows": len(rows), "output": output}
+
+
+def export_segment(segment_id, dataset_id, merge_policy_id, environment, credentials=DEFAULT_CREDENTIALS, wait=True):
+    from rtcdp.api.modules.segment_data.segment_exporter import SegmentExporter
+    with open(credentials, "r") as f:
+        environments = json.load(f).get("environments", [])
+    env = next((e for e in environments if e["name"] == environment), None)
+    if env is None:
+        raise ValueError(f"Unknown environment: {environment}")
+
+    exporter = SegmentExporter(credentials, env)
+    job_id = exporter.export_segment_to_dataset(segment_id, dataset_id, merge_policy_id)
+    if not job_id:
+        raise RuntimeError(f"Export job for segment {segment_id} was not created")
+    status = exporter.monitor_export_status(job_id) if wait else "SUBMITTED"
+    if status not in ("SUCCEEDED", "SUBMITTED"):
+        raise RuntimeError(f"Export job {job_id} finished as {status}")
+    return {"job_id": job_id, "status": status}
+
+
+def trigger_snapshot():
+    from rtcdp.utils.auth_helper import AuthHelper
+    from rtcdp.api.modules.segment_data.snapshot import SnapshotExporter
+    SnapshotExporter(AuthHelper()).trigger_snapshot()
+    return {}
+
+
+def diff_snapshots(old, new, id_column="_id"):
+    from rtcdp.core.snapshot_diff import diff_snapshots as diff
+    return diff(old, new, id_column=id_column)
+
+
+def download(url, output, params=None):
+    """Stream a platform URL (absolute, or relative to the base URL) to a local file."""
+    from rtcdp.utils import http_client
+    from rtcdp.utils.auth_helper import AuthHelper
+    auth = AuthHelper()
+    if not url.startswith("http"):
+        url = f"{auth.get_base_url()}/{url.lstrip('/')}"
+    headers = {
+        "Authorization": f"Bearer {auth.get_access_token()}",
+        "x-api-key": auth.get_api_key(),
+        "x-gw-ims-org-id": auth.get_org_id(),
+        "x-sandbox-name": auth.get_sandbox()
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    response = http_client.get(url, headers=headers, params=params, stream=True)
+    response.raise_for_status()
+    size = 0
+    with open(output, "wb") as f:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            size += len(chunk)
+    return {"output": output, "bytes": size}
+
+
+def _run_process(command, output=None):
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            result = subprocess.run(command, stdout=f, stderr=subprocess.PIPE, text=True)
+    else:
+        result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{command[0]} exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+    return {"returncode": result.returncode, "output": output}
+
+
+def run_cli(args, output=None):
+    """Any headless command, e.g. ``args: [schemas, mirror]``; stdout goes to ``output``."""
+    if isinstance(args, str):
+        args = shlex.split(args)
+    return _run_process([sys.executable, "-m", "rtcdp", *[str(a) for a in args]], output)
+
+
+def run_shell(command, output=None):
+    return _run_process(shlex.split(command) if isinstance(command, str) else [str(c) for c in command], output)
+
+
+def call_python(target, kwargs=None):
+    """Call ``package.module:function`` with ``kwargs``."""
+    module_name, _, func_name = target.partition(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    return func(**(kwargs or {}))
+
+
+ACTIONS = {
+    "token.refresh": refresh_token,
+    "query.run": run_query,
+    "segment.export": export_segment,
+    "snapshot.trigger": trigger_snapshot,
+    "snapshot.diff": diff_snapshots,
+    "download": download,
+    "cli": run_cli,
+    "shell": run_shell,
+    "python": call_python,
+}
+
+
+def run_workflow(manifest_path, resume=False, force=False, max_workers=None, on_step=None):
+    """Load a YAML manifest and run it with the kit's actions. Returns the run state."""
+    workflow = Workflow.load(manifest_path)
+    runner = WorkflowRunner(workflow, ACTIONS, os.path.join(WORKFLOW_DIR, workflow.name))
+    logging.info(f"Running workflow {workflow.name} from {manifest_path} (resume={resume}, force={force})")
+    return runner.run(resume=resume, force=force, max_workers=max_workers, on_step=on_step)
@@ -1,6 +1,7 @@
 # cli/credentials_cli.py
 
 from rich import print
+from rtcdp.core.logger import setup_logging
 from rtcdp.api.modules.credentials_data.credentials import CredentialsManager
 
 def credentials_menu():
@@ -38,4 +39,5 @@ def credentials_menu():
             print("[red]❌ Invalid choice. Try again.[/red]")
 
 if __name__ == "__main__":
+    setup_logging("credentials")
     credentials_menu()
@@ -0,0 +1,389 @@
+# rtcdp/cli/daemon.py
+
+"""
+Optional background daemon that keeps the kit warm between headless invocations.
+
+    rtcdp daemon start          # fork a daemon for the current directory
+    rtcdp datasets list         # forwarded to the daemon while it is running
+    rtcdp daemon stop
+
+The daemon holds everything a cold process has to rebuild: imported modules,
+the pooled HTTP session (open TLS connections), the validated access token
+and the in-memory caches. ``rtcdp`` forwards its argv over a Unix socket and
+relays stdout, stderr and the exit code, falling back to running locally
+whenever no daemon answers. Commands run one at a time, since managers print
+to the process-wide stdout; status and stop are answered immediately.
+
+Each command runs with the caller's environment (``RTCDP_CREDENTIALS``,
+workflow variables, ...). Settings fixed when the daemon started, such as
+logging and cassettes, can't change per command. When the caller's differ,
+the daemon declines and the client runs the command itself. A command whose
+client disconnects (Ctrl-C, a killed shell) is interrupted as if by Ctrl-C.
+
+Set ``RTCDP_NO_DAEMON=1`` to bypass a running daemon, or
+``RTCDP_DAEMON_SOCKET`` to use a socket other than ``logs/rtcdpd.sock``.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import ctypes
+import select
+import socket
+import struct
+import logging
+import threading
+import contextlib
+import socketserver
+
+DEFAULT_SOCKET = os.path.join("logs", "rtcdpd.sock")
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+STARTUP_WAIT_SECONDS = 15
+FRAME_HEADER = struct.Struct(">cI")
+STDOUT, STDERR, RESULT = b"o", b"e", b"x"
+# Read once per process (logger setup, the pooled session's cassette), so they can't vary per command
+PROCESS_ENV_PREFIXES = ("RTCDP_LOG_", "RTCDP_CASSETTE")
+CLIENT_POLL_SECONDS = 0.5
+
+
+def socket_path():
+    return os.environ.get("RTCDP_DAEMON_SOCKET", DEFAULT_SOCKET)
+
+
+# ── wire format ──────────────────────────────────────────────────────────
+# Client sends one JSON line; the daemon answers with length-prefixed frames
+# tagged stdout/stderr, ending with a RESULT frame holding a JSON payload.
+
+def _send_frame(sock, channel, payload):
+    sock.sendall(FRAME_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("daemon closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock):
+    channel, size = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    return channel, _recv_exact(sock, size)
+
+
+class _FrameStream(io.TextIOBase):
+    """Text stream that ships every write to the client as a frame on one channel."""
+
+    def __init__(self, sock, channel, lock):
+        self.sock = sock
+        self.channel = channel
+        self.lock = lock  # Shared by both channels; worker threads print concurrently
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, text):
+        if text:
+            with self.lock:
+                _send_frame(self.sock, self.channel, text.encode("utf-8"))
+        return len(text)
+
+
+# ── client ───────────────────────────────────────────────────────────────
+
+def _connect(path=None, timeout=None):
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _call(message, path=None, stdout=None, stderr=None, timeout=None):
+    """Send one request; relay output frames and return the RESULT payload, or None if no daemon answered."""
+    sock = _connect(path, timeout)
+    if sock is None:
+        return None
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    try:
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        while True:
+            channel, payload = _recv_frame(sock)
+            if channel == RESULT:
+                return json.loads(payload)
+            stream = stdout if channel == STDOUT else stderr
+            stream.write(payload.decode("utf-8"))
+            stream.flush()
+    except (ConnectionError, socket.timeout):
+        return None
+    finally:
+        sock.close()
+
+
+def forward(argv):
+    """
+    Run a headless command in the daemon. Returns its exit code, or None when
+    the caller should run the command itself (no daemon, different working
+    directory or process-wide settings, or the daemon went away before answering).
+    """
+    if os.environ.get("RTCDP_NO_DAEMON") == "1":
+        return None
+    try:
+        result = _call({"op": "run", "argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)})
+    except BrokenPipeError:
+        # Downstream closed our stdout; the daemon notices when its next frame fails
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    if result is None or result.get("code") is None:
+        return None
+    return result["code"]
+
+
+def status(path=None):
+    return _call({"op": "status"}, path, timeout=5)
+
+
+def stop(path=None):
+    return _call({"op": "stop"}, path, timeout=5)
+
+
+def start(idle_timeout=DEFAULT_IDLE_TIMEOUT, path=None):
+    """Spawn a detached daemon for the current directory and wait until it answers."""
+    import subprocess
+    path = path or socket_path()
+    running = status(path)
+    if running:
+        return running
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    env = dict(os.environ, RTCDP_DAEMON_SOCKET=path)
+    with open(os.path.join("logs", "daemon.out"), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "rtcdp", "daemon", "start", "--foreground", "--idle-timeout", str(idle_timeout)],
+            cwd=os.getcwd(), env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True
+        )
+    deadline = time.monotonic() + STARTUP_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        running = status(path)
+        if running:
+            return running
+        time.sleep(0.1)
+    return None
+
+
+# ── server ───────────────────────────────────────────────────────────────
+
+def _process_env(env):
+    return {name: value for name, value in env.items() if name.startswith(PROCESS_ENV_PREFIXES)}
+
+
+@contextlib.contextmanager
+def _client_environment(env):
+    """Run with the caller's environment; this daemon must still never forward to itself."""
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    os.environ["RTCDP_NO_DAEMON"] = "1"
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def _client_gone(sock):
+    try:
+        readable, _, _ = select.select([sock], [], [], CLIENT_POLL_SECONDS)
+        # The client sends nothing after its request line, so readable means EOF
+        return bool(readable) and not sock.recv(1, socket.MSG_PEEK)
+    except (OSError, ValueError):
+        return True
+
+
+class _ClientWatch:
+    """Interrupt the command thread with KeyboardInterrupt if its client disconnects."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        self.done = False
+        self.interrupted = False
+
+    def __enter__(self):
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.done = True
+
+    def _watch(self):
+        while True:
+            gone = _client_gone(self.sock)
+            with self.lock:
+                if self.done:
+                    return
+                if gone:
+                    self.interrupted = True
+                    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id),
+                                                               ctypes.py_object(KeyboardInterrupt))
+                    return
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        try:
+            message = json.loads(self.rfile.readline() or b"{}")
+        except json.JSONDecodeError:
+            return
+        server.touch()
+        op = message.get("op")
+        if op == "status":
+            result = server.describe()
+        elif op == "stop":
+            result = {"stopping": True, "pid": os.getpid()}
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        elif op == "run":
+            result = server.run_command(self.request, message)
+        else:
+            result = {"error": f"unknown op {op!r}"}
+        try:
+            _send_frame(self.request, RESULT, json.dumps(result).encode("utf-8"))
+        except OSError:
+            pass  # Client went away (e.g. `| head` closed the pipe)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.cwd = os.getcwd()
+        self.started = time.time()
+        self.last_activity = time.monotonic()
+        self.commands = 0
+        self._run_lock = threading.Lock()
+        super().__init__(path, _RequestHandler)
+        os.chmod(path, 0o600)
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def describe(self):
+        return {
+            "pid": os.getpid(), "cwd": self.cwd, "socket": self.path,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "uptime_s": round(time.time() - self.started, 1), "commands": self.commands,
+            "busy": self._run_lock.locked(), "idle_timeout_s": self.idle_timeout,
+        }
+
+    def run_command(self, sock, message):
+        if os.path.realpath(message.get("cwd", "")) != os.path.realpath(self.cwd):
+            # Relative paths (credentials, logs/) would resolve differently; let the client run it
+            return {"code": None, "error": f"daemon serves {self.cwd}"}
+        env = message.get("env", os.environ)
+        if _process_env(env) != _process_env(os.environ):
+            return {"code": None, "error": "logging/cassette settings differ from the daemon's"}
+
+        from rtcdp.cli import headless
+        with self._run_lock:
+            saved = sys.stdout, sys.stderr
+            send_lock = threading.Lock()
+            sys.stdout, sys.stderr = _FrameStream(sock, STDOUT, send_lock), _FrameStream(sock, STDERR, send_lock)
+            try:
+                with _client_environment(env), _ClientWatch(sock):
+                    code = headless.main(message.get("argv", []))
+            except KeyboardInterrupt:
+                code = 130
+            except SystemExit as e:  # argparse usage errors and --help
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception as e:
+                logging.exception(f"Daemon command failed: {message.get('argv')}")
+                try:
+                    sys.stderr.write(f"rtcdp: {e}\n")
+                except OSError:
+                    pass
+                code = 1
+            finally:
+                sys.stdout, sys.stderr = saved
+                self.commands += 1
+                self.touch()
+                from rtcdp.utils import metrics
+                metrics.flush()  # The daemon outlives many commands; make their calls visible now
+        logging.info(f"Daemon ran {message.get('argv')} -> {code}")
+        return {"code": code}
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(min(30, max(1, self.idle_timeout / 4)))
+            if not self._run_lock.locked() and time.monotonic() - self.last_activity > self.idle_timeout:
+                logging.info("Daemon idle timeout reached; shutting down")
+                self.shutdown()
+                return
+
+    def warm_up(self):
+        """Import the managers, open the pooled session and validate the token once."""
+        try:
+            from rtcdp.utils.auth_helper import AuthHelper
+            from rtcdp.api.modules.dataset_data import datasets  # noqa: F401
+            from rtcdp.api.modules.schema_data import schemas  # noqa: F401
+            from rtcdp.api.modules.inspect_data import queries, lookup_identity  # noqa: F401
+            saved = sys.stdout
+            sys.stdout = sys.stderr
+            try:
+                AuthHelper().get_access_token()
+            finally:
+                sys.stdout = saved
+        except Exception as e:
+            logging.warning(f"Daemon warm-up incomplete: {e}")
+
+    def serve(self):
+        if self.idle_timeout:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            logging.info(f"Daemon {os.getpid()} stopped after {self.commands} command(s)")
+
+
+def serve(idle_timeout=DEFAULT_IDLE_TIMEOUT, path=None):
+    """Run the daemon in the foreground until stopped, interrupted or idle."""
+    import signal
+    path = path or socket_path()
+    if status(path):
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    if os.path.exists(path):
+        os.remove(path)  # Stale socket left by a daemon that was killed
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # Commands executed here must never try to forward back to this daemon
+    os.environ["RTCDP_NO_DAEMON"] = "1"
+    server = DaemonServer(path, idle_timeout)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    server.warm_up()
+    logging.info(f"Daemon {os.getpid()} listening on {path}")
+    server.serve()
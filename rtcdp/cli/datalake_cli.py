@@ -1,6 +1,7 @@
 # cli/datalake_cli.py
 
 from rich import print
+from rtcdp.core.logger import setup_logging
 
 def datalake_menu():
     while True:
@@ -47,5 +48,6 @@ def datalake_menu():
             print("[red]❌ Invalid choice. Try again.[/red]")
 
 if __name__ == "__main__":
+    setup_logging("menu")
     datalake_menu()
 
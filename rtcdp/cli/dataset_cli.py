@@ -1,4 +1,5 @@
 from rich import print
+from rtcdp.core.logger import setup_logging
 from rtcdp.api.modules.dataset_data.datasets import DatasetManager
 
 def dataset_menu():
@@ -12,6 +13,7 @@ def dataset_menu():
         print("3️⃣ Ingest Data into a Dataset")
         print("4️⃣ Delete a Dataset")
         print("5️⃣ Browse Metadata")
+        print("6️⃣ Triage Failed Batches")
         print("0️⃣ Back to Inspect Datalake Menu")
 
         choice = input("Select an option: ").strip()
@@ -26,10 +28,13 @@ def dataset_menu():
             manager.delete_datasets()
         elif choice == "5":
             manager.browse_datasets_menu()
+        elif choice == "6":
+            manager.triage_menu()
         elif choice == "0":
             break
         else:
             print("[red]❌ Invalid choice. Try again.[/red]")
 
 if __name__ == "__main__":
+    setup_logging("datasets")
     dataset_menu()
\ No newline at end of file
@@ -0,0 +1,593 @@
+# rtcdp/cli/headless.py
+
+"""
+Non-interactive subcommand CLI for scripts and cron jobs.
+
+    rtcdp datasets list --format ndjson
+    rtcdp query run sample_0 --out parquet
+    rtcdp audiences get <id> | jq .name
+    rtcdp --profile query run sample_0   # profile lands in logs/profiles/
+    rtcdp --cassette crawl.jsonl.gz datasets list   # record once, then replay offline
+
+Records go to stdout as they are produced; progress and diagnostics go to
+stderr. Exit codes: 0 ok, 1 operation failed, 2 usage error, 3 not found,
+4 missing/invalid credentials, 130 interrupted. ``flows health`` exits like
+``flow.py --health``: 1 warnings only, 2 any failure.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import contextlib
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_NOT_FOUND = 3
+EXIT_AUTH = 4
+EXIT_INTERRUPTED = 130
+
+OUTPUT_FORMATS = ("ndjson", "json", "csv")
+
+
+class CommandError(Exception):
+    def __init__(self, message, exit_code=EXIT_FAILURE):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+class RecordWriter:
+    """Streams records to a file object as NDJSON, a JSON array or CSV, flushing each one."""
+
+    def __init__(self, fmt="ndjson", stream=None):
+        self.format = fmt
+        self.stream = stream or sys.stdout
+        self.count = 0
+        self._csv = None
+
+    def write(self, record):
+        if self.format == "ndjson":
+            self.stream.write(json.dumps(record, default=str) + "\n")
+        elif self.format == "json":
+            self.stream.write(("[\n" if not self.count else ",\n") + json.dumps(record, default=str))
+        else:
+            from rtcdp.utils.helpers import flatten_record
+            flat = flatten_record(record)
+            if self._csv is None:
+                # Column set comes from the first record; later extras are dropped
+                self._csv = csv.DictWriter(self.stream, fieldnames=list(flat), extrasaction="ignore")
+                self._csv.writeheader()
+            self._csv.writerow(flat)
+        self.count += 1
+        self.stream.flush()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self):
+        if self.format == "json":
+            self.stream.write("[]\n" if not self.count else "\n]\n")
+            self.stream.flush()
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Send the managers' human-readable console output to stderr so stdout stays machine-readable."""
+    with contextlib.redirect_stdout(sys.stderr):
+        yield
+
+
+def _require_credentials():
+    from rtcdp.utils.auth_helper import AuthHelper
+    with _quiet():
+        auth = AuthHelper()
+    if not auth.credentials or not auth.credentials.get("access_token"):
+        raise CommandError(f"No usable credentials in {auth.credentials_path}", EXIT_AUTH)
+    return auth
+
+
+def _parse_params(pairs):
+    params = {}
+    for pair in pairs or []:
+        if "=" not in pair:
+            raise CommandError(f"Expected NAME=VALUE, got '{pair}'", EXIT_USAGE)
+        key, value = pair.split("=", 1)
+        params[key] = value
+    return params
+
+
+# ── datasets ─────────────────────────────────────────────────────────────
+
+def cmd_datasets_list(args, out):
+    _require_credentials()
+    from rtcdp.api.modules.dataset_data.datasets import DatasetManager
+    with _quiet():
+        manager = DatasetManager()
+    out.write_all(manager.iter_datasets())
+
+
+def cmd_datasets_triage(args, out):
+    _require_credentials()
+    from datetime import datetime, timedelta, timezone
+    from rtcdp.api.modules.dataset_data.datasets import DatasetManager
+    end = datetime.now(timezone.utc)
+    with _quiet():
+        summary = DatasetManager().triage_failed_batches(args.dataset, end - timedelta(days=args.days), end)
+    if summary is not None:
+        out.write_all(summary.to_dict(orient="records"))
+
+
+# ── schemas ──────────────────────────────────────────────────────────────
+
+def cmd_schemas_list(args, out):
+    _require_credentials()
+    from rtcdp.api.modules.schema_data.schemas import SchemaManager
+    with _quiet():
+        manager = SchemaManager()
+    out.write_all(manager.iter_resources(args.container, "schemas"))
+
+
+def cmd_schemas_get(args, out):
+    _require_credentials()
+    from rtcdp.api.modules.schema_data.schemas import SchemaManager
+    with _quiet():
+        schema = SchemaManager().get_schema_by_id(args.container, args.schema_id)
+    if schema is None:
+        raise CommandError(f"Schema not found: {args.schema_id}", EXIT_NOT_FOUND)
+    out.write(schema)
+
+
+def cmd_schemas_mirror(args, out):
+    _require_credentials()
+    from rtcdp.api.modules.schema_data.schemas import SchemaManager
+    with _quiet():
+        manager = SchemaManager()
+        updated = manager.mirror_registry()
+    if updated is None:
+        raise CommandError("Registry mirror failed")
+    out.write({"resources": len(manager.mirror), "updated": updated})
+
+
+def cmd_schemas_sync(args, out):
+    _require_credentials()
+    from rtcdp.api.modules.schema_data.schemas import SchemaManager
+    with _quiet():
+        results = SchemaManager().sync_schema_definitions(args.files)
+    for schema_id, ops in results.items():
+        out.write({"schema": schema_id, "ok": ops is not None, "operations": len(ops or [])})
+    if any(ops is None for ops in results.values()):
+        raise CommandError("One or more schemas failed to sync")
+
+
+# ── audiences ────────────────────────────────────────────────────────────
+
+def _audience_handler():
+    auth = _require_credentials()
+    from rtcdp.api.modules.segment_data.audience import AudienceHandler
+    with _quiet():
+        return AudienceHandler(auth)
+
+
+def cmd_audiences_list(args, out):
+    handler = _audience_handler()
+    out.write_all(handler.fetch_all_audiences(force_refresh=args.refresh))
+
+
+def cmd_audiences_get(args, out):
+    handler = _audience_handler()
+    with _quiet():
+        audience = handler.get_audience_by_id(args.audience_id, force_refresh=args.refresh)
+    if audience is None:
+        raise CommandError(f"Audience not found: {args.audience_id}", EXIT_NOT_FOUND)
+    out.write(audience)
+
+
+def cmd_audiences_preview(args, out):
+    from rtcdp.core.pql import preview_audience, PQLError
+    try:
+        result = preview_audience(args.pql, args.snapshot, sample_size=args.sample)
+    except PQLError as e:
+        raise CommandError(f"Invalid PQL: {e}", EXIT_USAGE)
+    except FileNotFoundError as e:
+        raise CommandError(str(e), EXIT_NOT_FOUND)
+    out.write(dict(result, sample=result["sample"].to_dict(orient="records")))
+
+
+# ── identity ─────────────────────────────────────────────────────────────
+
+def _identity_handler():
+    _require_credentials()
+    from rtcdp.api.modules.inspect_data.lookup_identity import IdentityHandler
+    with _quiet():
+        return IdentityHandler()
+
+
+def cmd_identity_lookup(args, out):
+    handler = _identity_handler()
+    with _quiet():
+        profile = handler.fetch_profile(args.namespace, args.value)
+    if not profile:
+        raise CommandError(f"No profile for {args.namespace}:{args.value}", EXIT_NOT_FOUND)
+    out.write(profile)
+
+
+def cmd_identity_bulk(args, out):
+    handler = _identity_handler()
+    with _quiet():
+        path = handler.bulk_lookup(args.csv_path, args.output)
+    if path is None:
+        raise CommandError(f"File not found: {args.csv_path}", EXIT_NOT_FOUND)
+    out.write({"output": path})
+
+
+# ── query ────────────────────────────────────────────────────────────────
+
+def _query_handler():
+    _require_credentials()
+    from rtcdp.api.modules.inspect_data.queries import QueryHandler
+    with _quiet():
+        return QueryHandler()
+
+
+def cmd_query_list(args, out):
+    handler = _query_handler()
+    for key, meta in handler.load_queries().items():
+        out.write({"key": key, "alias": meta.get("alias"), "description": meta.get("description"),
+                   "parameters": handler.query_placeholders(meta.get("sql", ""))})
+
+
+def cmd_query_run(args, out):
+    handler = _query_handler()
+    meta = handler.find_query(args.name)
+    if meta is None:
+        raise CommandError(f"Query not found: {args.name}", EXIT_NOT_FOUND)
+    try:
+        sql = handler.fill_query(meta.get("sql", ""), _parse_params(args.param))
+    except KeyError as e:
+        raise CommandError(e.args[0], EXIT_USAGE)
+
+    with _quiet():
+        query_id = handler.submit_query(sql)
+        state = handler.poll_query_status(query_id) if query_id else None
+    if state != "SUCCEEDED":
+        raise CommandError(f"Query {query_id or '(not submitted)'} finished as {state}")
+
+    pages = handler.iter_query_results(query_id)
+    if args.out == "parquet":
+        from rtcdp.utils.columnar import ColumnarWriter
+        from rtcdp.utils.helpers import flatten_record
+        output = args.output or os.path.join("logs", f"{meta.get('alias', args.name)}.parquet")
+        with ColumnarWriter(output) as writer:
+            for page in pages:
+                writer.write(flatten_record(row) for row in page)
+        out.write({"query_id": query_id, "rows": writer.rows, "output": writer.path})
+    else:
+        out.format = args.out or out.format
+        for page in pages:
+            out.write_all(page)
+
+
+# ── flows & snapshots ────────────────────────────────────────────────────
+
+def cmd_flows_health(args, out):
+    from rtcdp.api.modules.flow_data.flow import SourceConnectionAPI, _load_environment, health_exit_code
+    environment = _load_environment(args.environment, args.credentials)
+    if environment is None:
+        raise CommandError(f"Unknown environment: {args.environment}", EXIT_USAGE)
+    try:
+        with _quiet():
+            rows = SourceConnectionAPI(args.credentials, environment).fleet_health(max_workers=args.workers)
+    except RuntimeError as e:  # Token refresh failed
+        raise CommandError(str(e), EXIT_AUTH)
+    out.write_all(rows)
+    # Same codes as `flow.py --health` so cron jobs read both alike: 1 warnings only, 2 any failure
+    code = health_exit_code(rows)
+    if code == 2:
+        raise CommandError("One or more connections or dataflows failed their health check", code)
+    if code == 1:
+        raise CommandError("One or more connections or dataflows reported warnings", code)
+
+
+def cmd_snapshots_diff(args, out):
+    from rtcdp.core.snapshot_diff import diff_snapshots
+    try:
+        summary = diff_snapshots(args.old, args.new, id_column=args.id_column)
+    except FileNotFoundError as e:
+        raise CommandError(str(e), EXIT_NOT_FOUND)
+    except ValueError as e:
+        raise CommandError(str(e), EXIT_USAGE)
+    out.write(summary)
+
+
+# ── workflows ────────────────────────────────────────────────────────────
+
+def cmd_workflow_plan(args, out):
+    from rtcdp.core.workflow import Workflow, WorkflowError
+    try:
+        workflow = Workflow.load(args.manifest)
+    except FileNotFoundError as e:
+        raise CommandError(str(e), EXIT_NOT_FOUND)
+    except WorkflowError as e:
+        raise CommandError(str(e), EXIT_USAGE)
+    for level, step_ids in enumerate(workflow.levels()):
+        for step_id in step_ids:
+            step = workflow.steps[step_id]
+            out.write({"level": level, "step": step_id, "action": step.action, "needs": step.needs,
+                       "cache": step.cache, "attempts": step.attempts})
+
+
+def cmd_workflow_run(args, out):
+    from rtcdp.core.workflow import WorkflowError
+    from rtcdp.api.modules.workflows import run_workflow
+    try:
+        with _quiet():
+            state = run_workflow(args.manifest, resume=args.resume, force=args.force,
+                                 max_workers=args.workers, on_step=out.write)
+    except FileNotFoundError as e:
+        raise CommandError(str(e), EXIT_NOT_FOUND)
+    except WorkflowError as e:
+        raise CommandError(str(e), EXIT_USAGE)
+    if state["status"] != "succeeded":
+        failed = [r["step"] for r in state["steps"].values() if r["status"] == "failed"]
+        raise CommandError(f"Workflow run {state['run_id']} failed at: {', '.join(failed)} (rerun with --resume)")
+
+
+# ── metrics ──────────────────────────────────────────────────────────────
+
+def cmd_metrics_summary(args, out):
+    from rtcdp.utils import metrics
+    rows = metrics.summary(metrics.load())
+    if args.endpoint:
+        rows = [r for r in rows if args.endpoint in r["endpoint"]]
+    out.write_all(rows[:args.top] if args.top else rows)
+
+
+def cmd_metrics_export(args, out):
+    from rtcdp.utils import metrics
+    path = args.output or os.path.join(metrics.METRICS_DIR, metrics.OPENMETRICS_FILE)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    current = metrics.load()
+    out.write({"output": metrics.write_openmetrics(current, path), "series": len(current)})
+
+
+def cmd_metrics_serve(args, out):
+    from rtcdp.utils import metrics
+    print(f"rtcdp: serving http://{args.host}:{args.port}/metrics (Ctrl-C to stop)", file=sys.stderr)
+    metrics.serve(port=args.port, host=args.host)
+
+
+def cmd_metrics_reset(args, out):
+    from rtcdp.utils import metrics
+    metrics.reset()
+    out.write({"reset": True})
+
+
+# ── emulator ─────────────────────────────────────────────────────────────
+
+EMULATOR_OPTIONS = (
+    ("datasets", int), ("audiences", int), ("schemas", int), ("flows", int), ("query_rows", int),
+    ("payload_bytes", int), ("latency_ms", float), ("jitter_ms", float), ("query_polls", int),
+    ("export_polls", int), ("throttle_every", int), ("throttle_rate", float), ("retry_after", int),
+    ("unauthorized_every", int), ("fault_pattern", str), ("seed", int),
+)
+
+
+def cmd_emulator_serve(args, out):
+    from rtcdp.core.emulator import AEPEmulator, EmulatorConfig
+    settings = {name: getattr(args, name) for name, _ in EMULATOR_OPTIONS if getattr(args, name) is not None}
+    emulator = AEPEmulator(EmulatorConfig(strict_tokens=args.strict_tokens, **settings), args.host, args.port)
+    try:
+        emulator.start()
+    except OSError as e:
+        raise CommandError(f"Cannot listen on {args.host}:{args.port}: {e}")
+    credentials = emulator.write_credentials(args.credentials) if args.credentials else None
+    out.write({"url": emulator.url, "credentials": credentials})
+    hint = f"; export RTCDP_CREDENTIALS={credentials}" if credentials else ""
+    print(f"rtcdp: AEP emulator on {emulator.url}{hint} (Ctrl-C to stop)", file=sys.stderr)
+    emulator.serve_forever()
+
+
+# ── daemon ───────────────────────────────────────────────────────────────
+
+def cmd_daemon_start(args, out):
+    from rtcdp.cli import daemon
+    if args.foreground:
+        try:
+            daemon.serve(idle_timeout=args.idle_timeout)
+        except RuntimeError as e:
+            raise CommandError(str(e), EXIT_USAGE)
+        return
+    info = daemon.start(idle_timeout=args.idle_timeout)
+    if info is None:
+        raise CommandError("Daemon did not start; see logs/daemon.out")
+    out.write(info)
+
+
+def cmd_daemon_stop(args, out):
+    from rtcdp.cli import daemon
+    result = daemon.stop()
+    if result is None:
+        raise CommandError(f"No daemon listening on {daemon.socket_path()}", EXIT_NOT_FOUND)
+    out.write(result)
+
+
+def cmd_daemon_status(args, out):
+    from rtcdp.cli import daemon
+    info = daemon.status()
+    if info is None:
+        raise CommandError(f"No daemon listening on {daemon.socket_path()}", EXIT_NOT_FOUND)
+    out.write(info)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="rtcdp", description="RTCDP API Kit — headless commands")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="ndjson", help="Output format (default: ndjson)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write CPU profile and flame-graph stacks to logs/profiles/")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Like --profile, plus a tracemalloc allocation diff")
+    parser.add_argument("--cassette", metavar="PATH",
+                        help="Record/replay HTTP traffic through this cassette (default: replay if it exists)")
+    parser.add_argument("--cassette-mode", choices=("record", "replay", "cache"),
+                        help="record: always hit the platform; replay: offline only; cache: replay hits, record misses")
+    groups = parser.add_subparsers(dest="group", required=True, metavar="<group>")
+
+    def command(group, name, func, help_text):
+        sub = group.add_parser(name, help=help_text)
+        sub.set_defaults(func=func)
+        return sub
+
+    datasets = groups.add_parser("datasets", help="Catalog datasets").add_subparsers(dest="action", required=True)
+    command(datasets, "list", cmd_datasets_list, "Stream every dataset")
+    triage = command(datasets, "triage", cmd_datasets_triage, "Group failed-batch errors by code and field")
+    triage.add_argument("dataset", nargs="+", help="Dataset ID(s)")
+    triage.add_argument("--days", type=int, default=7)
+
+    schemas = groups.add_parser("schemas", help="Schema registry").add_subparsers(dest="action", required=True)
+    command(schemas, "list", cmd_schemas_list, "Stream schema summaries").add_argument(
+        "--container", default="tenant", choices=("tenant", "global"))
+    get = command(schemas, "get", cmd_schemas_get, "Fetch one schema (resolved from the mirror when available)")
+    get.add_argument("schema_id")
+    get.add_argument("--container", default="tenant", choices=("tenant", "global"))
+    command(schemas, "mirror", cmd_schemas_mirror, "Refresh the local registry mirror")
+    command(schemas, "sync", cmd_schemas_sync, "Patch schemas to match local definitions").add_argument("files", nargs="+")
+
+    audiences = groups.add_parser("audiences", help="Audiences").add_subparsers(dest="action", required=True)
+    command(audiences, "list", cmd_audiences_list, "Stream every audience").add_argument("--refresh", action="store_true")
+    get = command(audiences, "get", cmd_audiences_get, "Fetch one audience")
+    get.add_argument("audience_id")
+    get.add_argument("--refresh", action="store_true")
+    preview = command(audiences, "preview", cmd_audiences_preview, "Evaluate PQL against a local snapshot")
+    preview.add_argument("pql")
+    preview.add_argument("snapshot")
+    preview.add_argument("--sample", type=int, default=10)
+
+    identity = groups.add_parser("identity", help="Profile lookups").add_subparsers(dest="action", required=True)
+    lookup = command(identity, "lookup", cmd_identity_lookup, "Fetch one profile by identity")
+    lookup.add_argument("namespace")
+    lookup.add_argument("value")
+    bulk = command(identity, "bulk", cmd_identity_bulk, "Resolve a namespace,value CSV to a columnar file")
+    bulk.add_argument("csv_path")
+    bulk.add_argument("--output", default=os.path.join("logs", "bulk_profiles.parquet"))
+
+    query = groups.add_parser("query", help="Query Service").add_subparsers(dest="action", required=True)
+    command(query, "list", cmd_query_list, "List saved queries and their parameters")
+    run = command(query, "run", cmd_query_run, "Run a saved query and stream or save its rows")
+    run.add_argument("name", help="Query key or alias, e.g. sample_0")
+    run.add_argument("--param", action="append", metavar="NAME=VALUE", help="Fill a {{NAME}} placeholder")
+    run.add_argument("--out", choices=OUTPUT_FORMATS + ("parquet",), help="Output format (default: --format)")
+    run.add_argument("--output", help="File path for --out parquet")
+
+    flows = groups.add_parser("flows", help="Sources and dataflows").add_subparsers(dest="action", required=True)
+    health = command(flows, "health", cmd_flows_health,
+                     "Health-check every connection and dataflow (exit 1: warnings only, 2: any failure)")
+    health.add_argument("environment")
+    health.add_argument("--credentials", default=os.path.join("CREDS", "rol_credentials.json"))
+    health.add_argument("--workers", type=int, default=16)
+
+    snapshots = groups.add_parser("snapshots", help="Profile snapshots").add_subparsers(dest="action", required=True)
+    diff = command(snapshots, "diff", cmd_snapshots_diff, "Diff two snapshot exports")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--id-column", default="_id")
+
+    workflow = groups.add_parser("workflow", help="YAML workflow manifests").add_subparsers(dest="action", required=True)
+    command(workflow, "plan", cmd_workflow_plan, "Validate a manifest and show its execution waves").add_argument("manifest")
+    run = command(workflow, "run", cmd_workflow_run, "Run a manifest, streaming one record per finished step")
+    run.add_argument("manifest")
+    run.add_argument("--resume", action="store_true", help="Reuse steps completed by the previous run")
+    run.add_argument("--force", action="store_true", help="Ignore cached step results")
+    run.add_argument("--workers", type=int, help="Override the manifest's worker count")
+
+    metrics = groups.add_parser("metrics", help="Per-endpoint HTTP latency metrics").add_subparsers(
+        dest="action", required=True)
+    summary = command(metrics, "summary", cmd_metrics_summary, "Latency percentiles, 429s and retries per endpoint")
+    summary.add_argument("--top", type=int, help="Only the N endpoints with the most total time")
+    summary.add_argument("--endpoint", help="Only endpoints containing this text")
+    command(metrics, "export", cmd_metrics_export, "Write the OpenMetrics text file").add_argument("--output")
+    serve = command(metrics, "serve", cmd_metrics_serve, "Serve /metrics for a local Prometheus scrape")
+    serve.set_defaults(forward=False)  # Never returns; it would hold the daemon's command slot forever
+    serve.add_argument("--port", type=int, default=9464)
+    serve.add_argument("--host", default="127.0.0.1")
+    command(metrics, "reset", cmd_metrics_reset, "Discard recorded metrics")
+
+    emulator = groups.add_parser("emulator", help="Local AEP emulator for offline runs").add_subparsers(
+        dest="action", required=True)
+    serve = command(emulator, "serve", cmd_emulator_serve, "Serve emulated AEP endpoints until interrupted")
+    serve.set_defaults(forward=False)
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--credentials", help="Write a credentials file pointing at the emulator here")
+    serve.add_argument("--strict-tokens", action="store_true", help="Only accept tokens issued by the emulator")
+    for name, kind in EMULATOR_OPTIONS:
+        serve.add_argument(f"--{name.replace('_', '-')}", type=kind)
+
+    daemon = groups.add_parser("daemon", help="Background daemon that keeps sessions and caches warm").add_subparsers(
+        dest="action", required=True)
+    start = command(daemon, "start", cmd_daemon_start, "Start a daemon for the current directory")
+    start.add_argument("--foreground", action="store_true", help="Serve in this process instead of forking")
+    start.add_argument("--idle-timeout", type=int, default=1800, help="Exit after this many idle seconds (0 = never)")
+    command(daemon, "stop", cmd_daemon_stop, "Stop the running daemon")
+    command(daemon, "status", cmd_daemon_status, "Show the running daemon's pid, uptime and command count")
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = build_parser().parse_args(argv)
+    if args.group != "daemon" and getattr(args, "forward", True) and not args.cassette:
+        # Hand the command to a warm daemon when one is running for this directory
+        from rtcdp.cli import daemon
+        code = daemon.forward(argv)
+        if code is not None:
+            return code
+    from rtcdp.core.logger import setup_logging
+    setup_logging("daemon" if args.group == "daemon" else "headless")
+    out = RecordWriter(args.format)
+    try:
+        if args.cassette:
+            from rtcdp.utils import http_client
+            try:
+                http_client.use_cassette(args.cassette, args.cassette_mode)
+            except FileNotFoundError as e:
+                raise CommandError(str(e), EXIT_USAGE)
+        if args.profile or args.profile_memory:
+            from rtcdp.utils.profiling import profiled
+            with profiled(f"{args.group}-{getattr(args, 'action', '')}", memory=args.profile_memory):
+                args.func(args, out)
+        else:
+            args.func(args, out)
+        return EXIT_OK
+    except CommandError as e:
+        print(f"rtcdp: {e}", file=sys.stderr)
+        return e.exit_code
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # Downstream closed the pipe (e.g. `| head`); not an error for us
+        sys.stdout = open(os.devnull, "w")
+        return EXIT_OK
+    except Exception as e:
+        import requests
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            code = e.response.status_code
+            print(f"rtcdp: {e}", file=sys.stderr)
+            return EXIT_AUTH if code in (401, 403) else EXIT_NOT_FOUND if code == 404 else EXIT_FAILURE
+        if isinstance(e, requests.RequestException):
+            print(f"rtcdp: {e}", file=sys.stderr)
+            return EXIT_FAILURE
+        raise
+    finally:
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
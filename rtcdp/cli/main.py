@@ -1,21 +1,11 @@
 # cli/main_cli.py
 
-import os
 from rich import print
 import logging
-
-# Configure Logging
-LOG_DIR = "logs"
-DATASET_LOG = "main_menu.log"
-os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(
-    filename=f"{LOG_DIR}/{DATASET_LOG}",
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from rtcdp.core.logger import setup_logging
 
 def launch_menu():
+    setup_logging("menu")
     while True:
         print("\n📘 [bold]RTCDP API KIT – MAIN MENU[/bold]")
         print("──────────────────────────────────────")
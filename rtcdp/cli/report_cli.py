@@ -6,6 +6,19 @@ from rich import print
 
 RESULT_CSV_PATH = "logs/last_query_results.csv"
 
+
+def render_results_table(csv_path=RESULT_CSV_PATH, rows=10):
+    df = pd.read_csv(csv_path)
+    return df.head(rows).to_string(index=False)
+
+
+def export_results_json(csv_path=RESULT_CSV_PATH):
+    df = pd.read_csv(csv_path)
+    json_path = csv_path.replace(".csv", ".json")
+    df.to_json(json_path, orient="records", indent=2)
+    return json_path
+
+
 def report_menu():
     while True:
         print("\n🗂️ [bold]REPORT MENU[/bold]")
@@ -20,14 +33,11 @@ def report_menu():
             return
 
         if choice == "1":
-            df = pd.read_csv(RESULT_CSV_PATH)
             print("[bold green]📊 Showing first 10 rows:[/bold green]")
-            print(df.head(10).to_string(index=False))
+            print(render_results_table())
 
         elif choice == "2":
-            df = pd.read_csv(RESULT_CSV_PATH)
-            json_path = RESULT_CSV_PATH.replace(".csv", ".json")
-            df.to_json(json_path, orient="records", indent=2)
+            json_path = export_results_json()
             print(f"[green]✅ Exported to {json_path}[/green]")
 
         elif choice == "0":
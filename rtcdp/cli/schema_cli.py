@@ -1,4 +1,5 @@
 from rich import print
+from rtcdp.core.logger import setup_logging
 from rtcdp.api.modules.schema_data.schemas import SchemaManager
 
 def schema_menu():
@@ -10,9 +11,11 @@ def schema_menu():
         print("1️⃣ List Schemas")
         print("2️⃣ Get Schema by ID")
         print("3️⃣ Create Schema")
-        print("4️⃣ Update Schema (PUT)")
+        print("4️⃣ Update Schema (minimal patch)")
         print("5️⃣ Patch Schema (JSON Patch)")
         print("6️⃣ Delete Schema")
+        print("7️⃣ Mirror Schema Registry Locally")
+        print("8️⃣ Sync Schemas from Local Definitions")
         print("0️⃣ Back to Inspect Datalake Menu")
 
         choice = input("Select an option: ").strip()
@@ -31,6 +34,11 @@ def schema_menu():
             manager.patch_schema()
         elif choice == "6":
             manager.delete_schema()
+        elif choice == "7":
+            manager.mirror_registry()
+        elif choice == "8":
+            paths = input("Schema definition JSON files (comma-separated): ").strip()
+            manager.sync_schema_definitions([p.strip() for p in paths.split(",") if p.strip()])
         elif choice == "0":
             print("[cyan]🔙 Returning to Inspect Datalake Menu...[/cyan]")
             break
@@ -38,4 +46,5 @@ def schema_menu():
             print("[red]❌ Invalid choice. Try again.[/red]")
 
 if __name__ == "__main__":
+    setup_logging("schemas")
     schema_menu()
@@ -20,18 +20,28 @@ def segments_menu():
         print("4️⃣ Delete Audience")
         print("5️⃣ View Audience by ID")
         print("6️⃣ Trigger Profile Snapshot Export")
+        print("7️⃣ Preview Audience Size (local snapshot)")
+        print("8️⃣ Audience Overlap Analytics")
+        print("9️⃣ Merge Policy Simulation")
+        print("🔟 Compare Two Profile Snapshots")
         print("0️⃣ Back to Main Menu")
 
         choice = input("Select an option: ").strip()
 
         if choice == "1":
-            audience_handler.list_audiences()
+            refresh = input("Force refresh from AEP? (y/n): ").strip().lower() == "y"
+            audience_handler.list_audiences(force_refresh=refresh)
         elif choice == "2":
             segment_manager.create_all_profiles_segment()
         elif choice == "3":
             name = input("Audience Name: ")
             desc = input("Description: ")
             pql = input("PQL Expression: ")
+            snapshot_path = input("Local snapshot path for a size preview (leave blank to skip): ").strip()
+            if snapshot_path:
+                audience_handler.preview_audience(pql, snapshot_path)
+                if input("Create this audience? (y/n): ").strip().lower() != "y":
+                    continue
             audience_handler.create_audience(name, desc, pql)
         elif choice == "4":
             aid = input("Audience ID to delete: ")
@@ -41,6 +51,21 @@ def segments_menu():
             audience_handler.get_audience_by_id(aid)
         elif choice == "6":
             snapshot_exporter.trigger_snapshot()
+        elif choice == "7":
+            pql = input("PQL Expression: ")
+            snapshot_path = input("Local snapshot path (file or export directory): ").strip()
+            audience_handler.preview_audience(pql, snapshot_path)
+        elif choice == "8":
+            from api.modules.segment_data.overlap import AudienceOverlapHandler
+            AudienceOverlapHandler().handle_overlap()
+        elif choice == "9":
+            from rtcdp.api.modules.merge_policy import MergePolicyManager
+            MergePolicyManager().handle_merge_policies()
+        elif choice == "10":
+            old_path = input("Earlier snapshot export path: ").strip()
+            new_path = input("Later snapshot export path: ").strip()
+            id_column = input("Profile ID column [_id]: ").strip() or "_id"
+            snapshot_exporter.compare_snapshots(old_path, new_path, id_column)
         elif choice == "0":
             print("[cyan]🔙 Returning to Main Menu...[/cyan]")
             break
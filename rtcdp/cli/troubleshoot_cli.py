@@ -0,0 +1,58 @@
+# cli/troubleshoot_cli.py
+
+import os
+from rich import print
+from rtcdp.core.logger import setup_logging
+from rtcdp.utils import metrics
+
+
+def show_endpoint_latency(top=20):
+    current = metrics.load()
+    current.merge(metrics.registry.series())
+    rows = metrics.summary(current)
+    if not rows:
+        print("[yellow]⚠️ No HTTP calls recorded yet.[/yellow]")
+        return rows
+
+    print(f"\n[bold]⏱️ Slowest endpoints (by total time, top {top})[/bold]")
+    print(f"{'METHOD':<7} {'STATUS':>6} {'CALLS':>7} {'P50':>8} {'P95':>8} {'P99':>8} {'MAX':>8} {'429s':>5} {'RETRY':>5}  ENDPOINT")
+    for r in rows[:top]:
+        flag = "red" if r["status"].startswith(("4", "5")) or r["status"] == "error" else "white"
+        print(f"[{flag}]{r['method']:<7} {r['status']:>6} {r['calls']:>7} {r['p50_ms']:>7}ms {r['p95_ms']:>7}ms "
+              f"{r['p99_ms']:>7}ms {r['max_ms']:>7}ms {r['throttled']:>5} {r['retries']:>5}  "
+              f"{r['endpoint']}{' @' + r['sandbox'] if r['sandbox'] else ''}[/{flag}]")
+    return rows
+
+
+def troubleshoot_menu():
+    while True:
+        print("\n🛠️ [bold]TROUBLESHOOTING MENU[/bold]")
+        print("────────────────────────────")
+        print("1️⃣ Endpoint Latency & Throttling Summary")
+        print("2️⃣ Export OpenMetrics File")
+        print("3️⃣ Reset Recorded Metrics")
+        print("0️⃣ Back to Main Menu")
+
+        choice = input("Select an option: ").strip()
+
+        if choice == "1":
+            show_endpoint_latency()
+        elif choice == "2":
+            metrics.flush()
+            path = os.path.join(metrics.METRICS_DIR, metrics.OPENMETRICS_FILE)
+            if os.path.exists(path):
+                print(f"[green]📁 OpenMetrics written to {path}[/green]")
+            else:
+                print("[yellow]⚠️ No HTTP calls recorded yet.[/yellow]")
+        elif choice == "3":
+            metrics.reset()
+            print("[green]✔ Metrics cleared.[/green]")
+        elif choice == "0":
+            print("[cyan]🔙 Returning to Main Menu...[/cyan]")
+            break
+        else:
+            print("[red]❌ Invalid choice. Try again.[/red]")
+
+if __name__ == "__main__":
+    setup_logging("troubleshoot")
+    troubleshoot_menu()
@@ -4,16 +4,6 @@ import time
 import logging
 import requests
 
-# === Setup Logging ===
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-
-logging.basicConfig(
-    filename=os.path.join(LOG_DIR, "token.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 class AEPTokenRefresher:
     def __init__(self, credentials_file):
         """
@@ -115,7 +105,13 @@ class AEPTokenRefresher:
 
 # === Entry point for subprocess execution ===
 if __name__ == "__main__":
-    credentials_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "cit-credentials.json"))
+    # Run by path from AuthHelper, so the package root isn't on sys.path yet
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from rtcdp.core.logger import setup_logging
+    setup_logging("token_refresh")
+    default_path = os.path.join(os.path.dirname(__file__), "cit-credentials.json")
+    credentials_path = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else default_path)
     refresher = AEPTokenRefresher(credentials_path)
 
     token = refresher.get_access_token()
@@ -0,0 +1,79 @@
+# rtcdp/core/batch_errors.py
+
+import re
+import json
+import logging
+
+# Field paths show up as JSON pointers ("/_tenant/email") or XDM paths ("#/properties/...") in messages
+PATH_PATTERN = re.compile(r"(#?/[\w:@.\-]+(?:/[\w:@.\-]+)+)")
+SAMPLE_MESSAGE_LENGTH = 300
+
+
+def _error_path(error):
+    for key in ("path", "fieldPath", "xdmPath", "pointer"):
+        if error.get(key):
+            return str(error[key])
+    match = PATH_PATTERN.search(str(error.get("message", "")))
+    return match.group(1) if match else ""
+
+
+def iter_record_errors(lines):
+    """
+    Parse failed-record lines (NDJSON) lazily and yield ``(code, path, message)``.
+
+    Lines that aren't JSON are reported under a ``parse`` code rather than
+    aborting the whole file.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield "parse", "", line[:SAMPLE_MESSAGE_LENGTH]
+            continue
+        errors = record.get("_errors") or record.get("errors") or []
+        if isinstance(errors, dict):
+            errors = [errors]
+        for error in errors:
+            yield str(error.get("code", "unknown")), _error_path(error), str(error.get("message", ""))
+
+
+class ErrorAggregator:
+    """Counts errors by (code, field path), keeping one sample message and the batches affected."""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, batch_id, code, path, message, count=1):
+        group = self.groups.setdefault((code, path), {"count": 0, "batches": set(), "sample": message})
+        group["count"] += count
+        group["batches"].add(batch_id)
+
+    def add_stream(self, batch_id, lines):
+        records = 0
+        for code, path, message in iter_record_errors(lines):
+            self.add(batch_id, code, path, message)
+            records += 1
+        return records
+
+    def merge(self, other):
+        for (code, path), group in other.groups.items():
+            mine = self.groups.setdefault((code, path), {"count": 0, "batches": set(), "sample": group["sample"]})
+            mine["count"] += group["count"]
+            mine["batches"] |= group["batches"]
+
+    def summary(self):
+        import pandas as pd
+        rows = [
+            {"code": code, "path": path, "count": g["count"], "batches": len(g["batches"]),
+             "sample": g["sample"][:SAMPLE_MESSAGE_LENGTH]}
+            for (code, path), g in self.groups.items()
+        ]
+        if not rows:
+            return pd.DataFrame(columns=["code", "path", "count", "batches", "sample"])
+        frame = pd.DataFrame(rows).sort_values(["count", "batches"], ascending=False).reset_index(drop=True)
+        logging.info(f"Aggregated {int(frame['count'].sum())} errors into {len(frame)} groups")
+        return frame
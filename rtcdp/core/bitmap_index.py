@@ -0,0 +1,325 @@
+# rtcdp/core/bitmap_index.py
+
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+INDEX_DIR = os.path.join("logs", "segment_index")
+MANIFEST_FILE = "manifest.json"
+CONTAINERS_FILE = "containers.bin"
+PROFILE_IDS_FILE = "profile_ids.txt"
+
+ARRAY_MAX = 4096          # containers above this cardinality are stored as bitmaps
+BITMAP_WORDS = 1024       # 65536 bits per chunk
+MEMBER_STATUSES = ("realized", "existing")
+
+
+# --- Roaring-style containers (sorted uint16 arrays or 1024 x uint64 bitmaps) ---
+
+def _is_bitmap(container):
+    return container.dtype == np.uint64
+
+
+def _array_to_bitmap(values):
+    bits = np.zeros(BITMAP_WORDS * 64, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _bitmap_to_array(words):
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _bitmap_cardinality(words):
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _cardinality(container):
+    return _bitmap_cardinality(container) if _is_bitmap(container) else len(container)
+
+
+def _normalize(container):
+    if _is_bitmap(container):
+        if _bitmap_cardinality(container) <= ARRAY_MAX:
+            return _bitmap_to_array(container)
+        return container
+    if len(container) > ARRAY_MAX:
+        return _array_to_bitmap(container)
+    return container
+
+
+def _array_in_bitmap(values, words):
+    shifts = (values & 63).astype(np.uint64)
+    return ((words[values >> 6] >> shifts) & np.uint64(1)).astype(bool)
+
+
+def _container_and(a, b):
+    if _is_bitmap(a) and _is_bitmap(b):
+        return _normalize(np.bitwise_and(a, b))
+    if _is_bitmap(a):
+        return b[_array_in_bitmap(b, a)]
+    if _is_bitmap(b):
+        return a[_array_in_bitmap(a, b)]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _container_and_cardinality(a, b):
+    if _is_bitmap(a) and _is_bitmap(b):
+        return _bitmap_cardinality(np.bitwise_and(a, b))
+    if _is_bitmap(a):
+        return int(_array_in_bitmap(b, a).sum())
+    if _is_bitmap(b):
+        return int(_array_in_bitmap(a, b).sum())
+    return len(np.intersect1d(a, b, assume_unique=True))
+
+
+def _container_or(a, b):
+    if _is_bitmap(a) or _is_bitmap(b):
+        a = a if _is_bitmap(a) else _array_to_bitmap(a)
+        b = b if _is_bitmap(b) else _array_to_bitmap(b)
+        return np.bitwise_or(a, b)
+    return _normalize(np.union1d(a, b))
+
+
+def _container_andnot(a, b):
+    if _is_bitmap(a):
+        b = b if _is_bitmap(b) else _array_to_bitmap(b)
+        return _normalize(np.bitwise_and(a, np.bitwise_not(b)))
+    if _is_bitmap(b):
+        return a[~_array_in_bitmap(a, b)]
+    return np.setdiff1d(a, b, assume_unique=True)
+
+
+class RoaringBitmap:
+    """
+    Compressed set of 32-bit integers, split into 65536-wide chunks.
+
+    Sparse chunks are kept as sorted uint16 arrays and dense chunks as
+    fixed-size bitmaps, so both small and very large segments stay compact.
+    """
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_ints(cls, values):
+        values = np.unique(np.asarray(values, dtype=np.uint32))
+        if not len(values):
+            return cls()
+
+        high = (values >> 16).astype(np.uint32)
+        low = (values & 0xFFFF).astype(np.uint16)
+        keys, starts = np.unique(high, return_index=True)
+        bounds = list(starts[1:]) + [len(values)]
+
+        containers = {}
+        for key, start, end in zip(keys, starts, bounds):
+            containers[int(key)] = _normalize(low[start:end])
+        return cls(containers)
+
+    def __len__(self):
+        return sum(_cardinality(c) for c in self.containers.values())
+
+    def __contains__(self, value):
+        container = self.containers.get(int(value) >> 16)
+        if container is None:
+            return False
+        low = np.array([int(value) & 0xFFFF], dtype=np.uint16)
+        if _is_bitmap(container):
+            return bool(_array_in_bitmap(low, container)[0])
+        index = np.searchsorted(container, low[0])
+        return index < len(container) and container[index] == low[0]
+
+    def __and__(self, other):
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            result = _container_and(self.containers[key], other.containers[key])
+            if len(result):
+                containers[key] = result
+        return RoaringBitmap(containers)
+
+    def __or__(self, other):
+        containers = dict(self.containers)
+        for key, container in other.containers.items():
+            containers[key] = _container_or(containers[key], container) if key in containers else container
+        return RoaringBitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for key, container in self.containers.items():
+            result = _container_andnot(container, other.containers[key]) if key in other.containers else container
+            if _cardinality(result):
+                containers[key] = result
+        return RoaringBitmap(containers)
+
+    def intersection_count(self, other):
+        return sum(
+            _container_and_cardinality(self.containers[key], other.containers[key])
+            for key in self.containers.keys() & other.containers.keys()
+        )
+
+    def to_array(self):
+        parts = []
+        for key in sorted(self.containers):
+            container = self.containers[key]
+            low = _bitmap_to_array(container) if _is_bitmap(container) else container
+            parts.append((np.uint32(key) << np.uint32(16)) | low.astype(np.uint32))
+        return np.concatenate(parts) if parts else np.array([], dtype=np.uint32)
+
+
+# --- Dense profile ID dictionary ---
+
+class ProfileIdDictionary:
+    """Maps profile IDs to dense integers so segment bitmaps stay compact."""
+
+    def __init__(self, profile_ids=None):
+        self.profile_ids = list(profile_ids or [])
+        self.codes = {pid: code for code, pid in enumerate(self.profile_ids)}
+
+    def __len__(self):
+        return len(self.profile_ids)
+
+    def encode(self, profile_ids):
+        series = pd.Series(profile_ids, dtype="object").dropna().astype(str)
+        for pid in pd.unique(series):
+            if pid not in self.codes:
+                self.codes[pid] = len(self.profile_ids)
+                self.profile_ids.append(pid)
+        return series.map(self.codes).to_numpy(dtype=np.uint32)
+
+    def lookup(self, profile_id):
+        return self.codes.get(str(profile_id))
+
+    def decode(self, codes):
+        return [self.profile_ids[int(code)] for code in codes]
+
+
+# --- Segment membership index ---
+
+class SegmentBitmapIndex:
+    def __init__(self, dictionary=None, segments=None):
+        self.dictionary = dictionary or ProfileIdDictionary()
+        self.segments = segments or {}
+
+    def add_segment(self, segment_id, profile_ids):
+        codes = self.dictionary.encode(profile_ids)
+        bitmap = RoaringBitmap.from_ints(codes)
+        if segment_id in self.segments:
+            bitmap = self.segments[segment_id] | bitmap
+        self.segments[segment_id] = bitmap
+        return bitmap
+
+    @classmethod
+    def from_export(cls, frame, id_column="_id", statuses=MEMBER_STATUSES):
+        """
+        Build an index from a flattened segment export or profile snapshot.
+
+        Membership is read from ``segmentMembership.<namespace>.<segmentId>.status``
+        columns; profiles in a realized/existing state are counted as members.
+        """
+        if id_column not in frame.columns:
+            raise ValueError(f"Profile ID column '{id_column}' not found in export.")
+
+        index = cls()
+        index.dictionary.encode(frame[id_column])
+        for column in frame.columns:
+            parts = column.split(".")
+            if len(parts) != 4 or parts[0] != "segmentMembership" or parts[3] != "status":
+                continue
+            members = frame.loc[frame[column].isin(statuses), id_column]
+            index.add_segment(parts[2], members)
+
+        logging.info(f"Built segment bitmap index: {len(index.segments)} segments, {len(index.dictionary)} profiles")
+        return index
+
+    def _bitmap(self, segment_id):
+        if segment_id not in self.segments:
+            raise KeyError(f"Segment not indexed: {segment_id}")
+        return self.segments[segment_id]
+
+    def count(self, segment_id):
+        return len(self._bitmap(segment_id))
+
+    def intersection(self, *segment_ids):
+        bitmaps = [self._bitmap(s) for s in segment_ids]
+        result = bitmaps[0]
+        for bitmap in sorted(bitmaps[1:], key=len):
+            result = result & bitmap
+        return result
+
+    def union(self, *segment_ids):
+        result = RoaringBitmap()
+        for segment_id in segment_ids:
+            result = result | self._bitmap(segment_id)
+        return result
+
+    def difference(self, segment_id, *others):
+        result = self._bitmap(segment_id)
+        for other in others:
+            result = result - self._bitmap(other)
+        return result
+
+    def overlap_matrix(self, segment_ids=None):
+        """Pairwise intersection counts; the diagonal holds each segment's size."""
+        segment_ids = list(segment_ids or self.segments)
+        matrix = np.zeros((len(segment_ids), len(segment_ids)), dtype=np.int64)
+        bitmaps = [self._bitmap(s) for s in segment_ids]
+        for i, left in enumerate(bitmaps):
+            matrix[i, i] = len(left)
+            for j in range(i + 1, len(bitmaps)):
+                matrix[i, j] = matrix[j, i] = left.intersection_count(bitmaps[j])
+        return pd.DataFrame(matrix, index=segment_ids, columns=segment_ids)
+
+    def members(self, bitmap, limit=None):
+        codes = bitmap.to_array()
+        return self.dictionary.decode(codes[:limit] if limit else codes)
+
+    # --- Persistence ---
+
+    def save(self, path=INDEX_DIR):
+        os.makedirs(path, exist_ok=True)
+        manifest = {"profiles": len(self.dictionary), "segments": {}}
+        offset = 0
+
+        with open(os.path.join(path, CONTAINERS_FILE), "wb") as out:
+            for segment_id, bitmap in self.segments.items():
+                entries = []
+                for key in sorted(bitmap.containers):
+                    data = np.ascontiguousarray(bitmap.containers[key]).tobytes()
+                    padding = -offset % 8  # keep bitmaps 8-byte aligned for zero-copy views
+                    out.write(b"\0" * padding)
+                    offset += padding
+                    kind = "bitmap" if _is_bitmap(bitmap.containers[key]) else "array"
+                    entries.append([key, kind, offset, len(data)])
+                    out.write(data)
+                    offset += len(data)
+                manifest["segments"][segment_id] = entries
+
+        with open(os.path.join(path, PROFILE_IDS_FILE), "w") as f:
+            f.write("\n".join(self.dictionary.profile_ids))
+        with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        logging.info(f"Saved segment bitmap index to {path}")
+
+    @classmethod
+    def load(cls, path=INDEX_DIR):
+        """Load an index with containers memory-mapped straight from disk."""
+        with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+        with open(os.path.join(path, PROFILE_IDS_FILE), "r") as f:
+            profile_ids = f.read().split("\n") if manifest["profiles"] else []
+
+        containers_path = os.path.join(path, CONTAINERS_FILE)
+        buffer = np.memmap(containers_path, dtype=np.uint8, mode="r") if os.path.getsize(containers_path) else None
+
+        segments = {}
+        for segment_id, entries in manifest["segments"].items():
+            containers = {}
+            for key, kind, offset, length in entries:
+                raw = buffer[offset:offset + length]
+                containers[key] = raw.view(np.uint64 if kind == "bitmap" else np.uint16)
+            segments[segment_id] = RoaringBitmap(containers)
+
+        return cls(ProfileIdDictionary(profile_ids), segments)
@@ -0,0 +1,1112 @@
+# rtcdp/core/emulator.py
+
+"""
+Local stand-in for the AEP endpoints the kit calls, for offline development and benchmarking.
+
+    with AEPEmulator(EmulatorConfig(datasets=5000, latency_ms=40, throttle_every=25)) as emulator:
+        os.environ["RTCDP_CREDENTIALS"] = emulator.write_credentials("logs/emulator/credentials.json")
+        DatasetManager().list_datasets()
+
+    rtcdp emulator serve --port 8765 --latency-ms 40 --credentials logs/emulator/credentials.json
+
+Served: IMS token (``/ims/token/v2|v3``), Catalog datasets/batches/failed-record
+exports, Query Service submit/poll/results, Schema Registry listings, resources
+and descriptors, audiences, segment definitions/jobs, export jobs, profile
+snapshots, merge policies, Profile entity access (single, batch and
+experience events), identity clusters and Flow Service connections, flows and
+runs. Paths are accepted with or without their ``/data/foundation`` or
+``/data/core/ups`` prefix, because parts of the kit build them both ways.
+
+Every collection is generated on demand from its index, so ``datasets=1_000_000``
+costs nothing until a page is requested, and the same config always yields
+the same payloads. Query results stream as chunked JSON, so million-row
+results don't have to fit in the emulator's memory.
+
+Faults are injected after the configured latency: every Nth request (or a
+seeded random fraction) is answered 429 with ``Retry-After`` or 401, optionally
+only on paths matching ``fault_pattern``. With ``strict_tokens`` only
+unexpired tokens issued by the emulator's IMS endpoint are accepted.
+
+``/__emulator/stats``, ``/__emulator/config`` (GET/PATCH) and
+``/__emulator/reset`` inspect and steer a running emulator.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs, unquote, quote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_PORT = 8765
+RESULT_CHUNK_ROWS = 5000
+# Real services cap page sizes; the kit has to paginate against these
+CATALOG_MAX_LIMIT = 100
+REGISTRY_MAX_LIMIT = 300
+AUDIENCE_MAX_LIMIT = 50
+FLOW_MAX_LIMIT = 100
+EVENT_MAX_LIMIT = 100
+SEGMENT_MAX_LIMIT = 100
+
+_PREFIX = r"^(?:/data/(?:foundation|core(?:/ups)?))?"
+
+
+class EmulatorConfig:
+    """Data volumes, pacing and fault injection. Unknown settings raise ``ValueError``."""
+
+    DEFAULTS = {
+        # Data volumes
+        "datasets": 250,
+        "audiences": 120,
+        "segment_definitions": 150,
+        "schemas": 40,
+        "fieldgroups": 20,
+        "schema_fields": 20,
+        "connections": 20,
+        "flows": 30,
+        "runs_per_flow": 10,
+        "merge_policies": 3,
+        "failed_batches": 2,          # per dataset, inside the last week
+        "failed_records": 50,         # per failed batch file
+        "events_per_profile": 25,
+        "query_rows": 1000,           # used when the SQL has no LIMIT
+        "payload_bytes": 0,           # filler added to each catalog/audience/schema entry
+        # Pacing
+        "latency_ms": 0.0,
+        "jitter_ms": 0.0,
+        "query_polls": 1,             # IN_PROGRESS answers before a query SUCCEEDED
+        "export_polls": 1,            # PROCESSING answers before an export job SUCCEEDED
+        "advertise_totals": True,     # audiences listing carries _page.totalCount
+        # Faults
+        "throttle_every": 0,          # every Nth request gets a 429
+        "throttle_rate": 0.0,         # ...or this random fraction
+        "retry_after": 0,
+        "unauthorized_every": 0,      # every Nth request gets a 401
+        "fault_pattern": None,        # only inject faults on paths matching this regex
+        "strict_tokens": False,
+        "token_ttl": 86400,
+        "seed": 7,
+    }
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown emulator settings: {', '.join(sorted(unknown))}")
+        for key, value in {**self.DEFAULTS, **settings}.items():
+            setattr(self, key, value)
+
+    def update(self, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown emulator settings: {', '.join(sorted(unknown))}")
+        for key, value in settings.items():
+            setattr(self, key, value)
+        return self
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.DEFAULTS}
+
+
+# ── deterministic synthetic ids ──────────────────────────────────────────
+# Indexes are embedded in the ids so a GET by id needs no lookup table.
+
+def _digest(kind, index):
+    return hashlib.md5(f"{kind}:{index}".encode()).hexdigest()
+
+
+def _hex_id(kind, index):
+    return f"{index:08x}{_digest(kind, index)[:16]}"
+
+
+def _uuid_id(kind, index):
+    h = _digest(kind, index)
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{index:012x}"
+
+
+def _index_of(identifier, size):
+    """Index embedded by ``_hex_id``/``_uuid_id``, or None if it's malformed or out of range."""
+    try:
+        index = int(identifier[-12:], 16) if "-" in identifier else int(identifier[:8], 16)
+    except ValueError:
+        return None
+    return index if 0 <= index < size else None
+
+
+def _iso(epoch_ms):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(epoch_ms / 1000)) + f".{epoch_ms % 1000:03d}Z"
+
+
+class _Request:
+    def __init__(self, handler, body):
+        parts = urlsplit(handler.path)
+        self.method = handler.command
+        self.path = unquote(parts.path)
+        self.query = parse_qs(parts.query)
+        self.headers = handler.headers
+        self.body = body
+        self.groups = ()
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def int_param(self, name, default=0):
+        try:
+            return int(self.param(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    def json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except json.JSONDecodeError:
+            return None
+
+    def form(self):
+        return {key: values[0] for key, values in parse_qs(self.body.decode("utf-8", "replace")).items()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so the kit's pooled session behaves as it does against AEP
+    server_version = "AEPEmulator/1.0"
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes; don't let delayed ACKs stall them
+
+    def _dispatch(self):
+        self.server.emulator.dispatch(self)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, fmt, *args):
+        logging.debug(f"emulator: {fmt % args}")
+
+
+class AEPEmulator:
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or EmulatorConfig()
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._routes = self._build_routes()
+        self.reset()
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+
+    def start(self):
+        """Serve on a background thread; ``port=0`` picks a free port."""
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.emulator = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="aep-emulator", daemon=True)
+        self._thread.start()
+        logging.info(f"AEP emulator listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def serve_forever(self):
+        if self._server is None:
+            self.start()
+        try:
+            self._thread.join()
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def reset(self):
+        """Forget created resources, running jobs, issued tokens and counters."""
+        with self._lock:
+            self.requests = 0
+            self.stats = Counter()
+            self.tokens = {}
+            self.queries = {}
+            self.jobs = {}
+            self.created_audiences = {}
+            self.deleted = set()
+            self.patched = {}
+            self._random = random.Random(self.config.seed)
+            self.static_token = self._issue_token()
+
+    def _issue_token(self):
+        token = f"emulator-{uuid.uuid4().hex}"
+        self.tokens[token] = time.time() + self.config.token_ttl
+        return token
+
+    def credentials(self):
+        """A credentials object every part of the kit accepts (AuthHelper, token refresh, flow/export environments)."""
+        return {
+            "base_url": self.url,
+            "ims_url": self.url,
+            "access_token": self.static_token,
+            "token_expires_at": int(self.tokens[self.static_token]),
+            "api_key": "emulator-api-key",
+            "client_id": "emulator-client",
+            "client_secret": "emulator-secret",
+            "org_id": "EMULATOR@AdobeOrg",
+            "sandbox": "emulator",
+            "scopes": ["openid", "AdobeID", "read_organizations"],
+            "environments": [{"name": "emulator", "sandbox_id": "emulator"}],
+        }
+
+    def write_credentials(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.credentials(), f, indent=4)
+        return path
+
+    # ── request handling ─────────────────────────────────────────────────
+
+    def _build_routes(self):
+        table = [
+            ("POST", r"^/ims/token/v\d$", self._ims_token, False),
+            ("GET", r"/catalog/dataSets", self._list_datasets, True),
+            ("POST", r"/catalog/dataSets", self._create_dataset, True),
+            ("GET", r"/catalog/dataSets/([^/]+)", self._get_dataset, True),
+            ("GET", r"/catalog/batches", self._list_batches, True),
+            ("GET", r"/export/batches/([^/]+)/failed", self._failed_files, True),
+            ("GET", r"/query/queries", self._list_queries, True),
+            ("POST", r"/query/queries", self._submit_query, True),
+            ("GET", r"/query/queries/([^/]+)", self._get_query, True),
+            ("GET", r"/query/queries/([^/]+)/results", self._query_results, True),
+            ("GET", r"/schemaregistry/(tenant)/descriptors", self._list_descriptors, True),
+            ("GET", r"/schemaregistry/(tenant|global)/(\w+)", self._list_registry, True),
+            ("POST", r"/schemaregistry/(tenant)/(\w+)", self._create_registry, True),
+            ("GET", r"/schemaregistry/(tenant|global)/(\w+)/(.+)", self._get_registry, True),
+            ("PATCH", r"/schemaregistry/(tenant)/(\w+)/(.+)", self._patch_registry, True),
+            ("PUT", r"/schemaregistry/(tenant)/(\w+)/(.+)", self._patch_registry, True),
+            ("DELETE", r"/schemaregistry/(tenant)/(\w+)/(.+)", self._delete_registry, True),
+            ("GET", r"/audiences", self._list_audiences, True),
+            ("POST", r"/audiences", self._create_audience, True),
+            ("GET", r"/audiences/([^/]+)", self._get_audience, True),
+            ("DELETE", r"/audiences/([^/]+)", self._delete_audience, True),
+            ("GET", r"/segment/definitions", self._list_segment_definitions, True),
+            ("POST", r"/segment/definitions", self._create_audience, True),
+            ("POST", r"/segment/jobs", self._create_segment_job, True),
+            ("GET", r"/segment/jobs/([^/]+)", self._get_job, True),
+            ("POST", r"/export/jobs", self._create_export_job, True),
+            ("GET", r"/export/jobs/([^/]+)", self._get_job, True),
+            ("POST", r"/profileSnapshots", self._create_snapshot, True),
+            ("GET", r"/profileSnapshots/([^/]+)", self._get_job, True),
+            ("GET", r"/config/mergePolicies", self._list_merge_policies, True),
+            ("GET", r"/config/mergePolicies/([^/]+)", self._get_merge_policy, True),
+            ("GET", r"/(?:access|profile)/entities", self._get_entities, True),
+            ("POST", r"/access/entities", self._batch_entities, True),
+            ("GET", r"/identity/cluster/members", self._identity_cluster, True),
+            ("GET", r"/flowservice/(connections|sourceConnections|targetConnections|flows|runs)", self._list_flow, True),
+            ("POST", r"(?:/flowservice)?/connections", self._create_connection, True),
+            ("POST", r"(?:/flowservice)?/connections/([^/]+)/test", self._test_connection, True),
+            ("DELETE", r"/flowservice/(connections|sourceConnections|flows)/([^/]+)", self._delete_flow_item, True),
+        ]
+        routes = []
+        for method, pattern, handler, authenticated in table:
+            regex = re.compile(pattern if pattern.startswith("^") else f"{_PREFIX}{pattern}$")
+            routes.append((method, regex, handler, authenticated))
+        return routes
+
+    def dispatch(self, handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        request = _Request(handler, handler.rfile.read(length) if length else b"")
+        try:
+            if request.path.startswith("/__emulator/"):
+                response = self._control(request)
+            else:
+                response = self._handle(request)
+        except Exception as e:
+            logging.exception(f"Emulator failed on {request.method} {request.path}")
+            response = (500, {"title": "Internal Server Error", "detail": str(e)}, {})
+        self._send(handler, *response)
+
+    def _handle(self, request):
+        route = None
+        path_matched = False
+        for method, regex, func, authenticated in self._routes:
+            match = regex.match(request.path)
+            if match:
+                path_matched = True
+                if method == request.method:
+                    route = (func, authenticated)
+                    request.groups = match.groups()
+                    break
+
+        with self._lock:
+            self.requests += 1
+            count = self.requests
+            self.stats[f"{request.method} {request.path}" if route is None else f"{request.method} {route[0].__name__[1:]}"] += 1
+
+        if self.config.latency_ms or self.config.jitter_ms:
+            with self._lock:
+                jitter = self._random.uniform(0, self.config.jitter_ms) if self.config.jitter_ms else 0
+            time.sleep((self.config.latency_ms + jitter) / 1000)
+
+        if route is None:
+            status = 405 if path_matched else 404
+            return status, {"title": "Method Not Allowed" if path_matched else "Not Found", "path": request.path}, {}
+        func, authenticated = route
+
+        fault = self._inject_fault(request, count) if authenticated else None
+        if fault:
+            return fault
+        if authenticated:
+            denied = self._check_auth(request)
+            if denied:
+                return denied
+        return func(request)
+
+    def _inject_fault(self, request, count):
+        config = self.config
+        if config.fault_pattern and not re.search(config.fault_pattern, request.path):
+            return None
+        if config.unauthorized_every and count % config.unauthorized_every == 0:
+            self._count("injected_401")
+            return 401, {"error_code": "401013", "message": "Oauth token is not valid"}, {}
+        throttle = config.throttle_every and count % config.throttle_every == 0
+        if not throttle and config.throttle_rate:
+            with self._lock:
+                throttle = self._random.random() < config.throttle_rate
+        if throttle:
+            self._count("injected_429")
+            return 429, {"error_code": "429050", "message": "Too many requests"}, {"Retry-After": str(config.retry_after)}
+        return None
+
+    def _check_auth(self, request):
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else ""
+        if not token:
+            return 401, {"error_code": "401013", "message": "Oauth token is not valid"}, {}
+        if not request.headers.get("x-api-key"):
+            return 403, {"error_code": "403010", "message": "Api Key is required"}, {}
+        if self.config.strict_tokens:
+            with self._lock:
+                expires = self.tokens.get(token)
+            if expires is None or expires < time.time():
+                self._count("rejected_token")
+                return 401, {"error_code": "401013", "message": "Oauth token is not valid"}, {}
+        return None
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _control(self, request):
+        action = request.path[len("/__emulator/"):]
+        if action == "stats":
+            with self._lock:
+                return 200, {"requests": self.requests, "counts": dict(self.stats),
+                             "queries": len(self.queries), "jobs": len(self.jobs)}, {}
+        if action == "config":
+            if request.method in ("PATCH", "POST", "PUT"):
+                try:
+                    self.config.update(**(request.json() or {}))
+                except ValueError as e:
+                    return 400, {"title": str(e)}, {}
+            return 200, self.config.as_dict(), {}
+        if action == "reset" and request.method == "POST":
+            self.reset()
+            return 200, {"reset": True}, {}
+        return 404, {"title": "Not Found"}, {}
+
+    @staticmethod
+    def _send(handler, status, payload, headers):
+        content_type = headers.pop("Content-Type", "application/json")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        try:
+            if payload is None:
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+            elif isinstance(payload, (bytes, str, dict, list)):
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload)
+                body = payload.encode("utf-8") if isinstance(payload, str) else payload
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+            else:  # Iterable of byte chunks, sent with chunked transfer encoding
+                handler.send_header("Transfer-Encoding", "chunked")
+                handler.end_headers()
+                for chunk in payload:
+                    if chunk:
+                        handler.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            handler.close_connection = True
+
+    # ── synthetic data ───────────────────────────────────────────────────
+
+    def _filler(self, kind, index):
+        size = self.config.payload_bytes
+        if not size:
+            return None
+        seed = _digest(kind, index)
+        return (seed * (size // len(seed) + 1))[:size]
+
+    def _now_ms(self):
+        return int(time.time() * 1000)
+
+    def _schema_id(self, index):
+        return f"https://ns.adobe.com/emulator/schemas/{_digest('schema', index)[:32]}"
+
+    def _fieldgroup_id(self, index):
+        return f"https://ns.adobe.com/emulator/mixins/{_digest('fieldgroup', index)[:32]}"
+
+    def _dataset(self, index):
+        created = 1_700_000_000_000 + index * 3_600_000
+        dataset = {
+            "name": f"Emulator Dataset {index:05d}",
+            "description": self._filler("dataset", index) or f"Synthetic dataset #{index}",
+            "imsOrg": "EMULATOR@AdobeOrg",
+            "sandboxId": "emulator",
+            "state": "ENABLED",
+            "version": "1.0.0",
+            "created": created,
+            "updated": created + 86_400_000,
+            "schemaRef": {"id": self._schema_id(index % max(self.config.schemas, 1)),
+                          "contentType": "application/vnd.adobe.xed-full+json;version=1"},
+            "tags": {"unifiedProfile": ["enabled:true"] if index % 3 == 0 else ["enabled:false"],
+                     "adobe/pqs/table": [f"emulator_dataset_{index:05d}"]},
+            "files": f"@/dataSetFiles?dataSetId={_hex_id('dataset', index)}",
+        }
+        return dataset
+
+    def _audience(self, index):
+        audience_id = _uuid_id("audience", index)
+        return {
+            "id": audience_id,
+            "name": f"Emulator Audience {index:04d}",
+            "description": self._filler("audience", index) or f"Synthetic audience #{index}",
+            "namespace": "AEPSegments",
+            "type": "SegmentDefinition",
+            "expression": {"type": "PQL", "format": "pql/text",
+                           "value": f"person.age >= {18 + index % 50} and homeAddress.countryCode = \"US\""},
+            "schema": {"name": "_xdm.context.profile"},
+            "mergePolicyId": _uuid_id("merge_policy", index % max(self.config.merge_policies, 1)),
+            "evaluationInfo": {"batch": {"enabled": True}, "continuous": {"enabled": index % 4 == 0},
+                               "synchronous": {"enabled": False}},
+            "createdAt": 1_700_000_000_000 + index * 60_000,
+            "updateTime": 1_700_000_000_000 + index * 120_000,
+        }
+
+    def _merge_policy(self, index):
+        return {
+            "id": _uuid_id("merge_policy", index),
+            "name": "Default Timebased" if index == 0 else f"Emulator Policy {index}",
+            "imsOrgId": "EMULATOR@AdobeOrg",
+            "schema": {"name": "_xdm.context.profile"},
+            "version": 1,
+            "identityGraph": {"type": "pdg" if index % 2 else "none"},
+            "attributeMerge": {"type": "timestampOrdered" if index % 2 == 0 else "dataSetPrecedence",
+                               "order": [_hex_id("dataset", i) for i in range(min(3, self.config.datasets))]},
+            "default": index == 0,
+            "updateEpoch": 1_700_000_000,
+        }
+
+    def _profile(self, namespace, value):
+        h = _digest("profile", f"{namespace}:{value}")
+        return {
+            "entityId": h[:24],
+            "sources": [_hex_id("dataset", 0)],
+            "entity": {
+                "identityMap": {namespace.lower(): [{"id": value, "primary": True}],
+                                "ecid": [{"id": str(int(h[:15], 16))}]},
+                "person": {"name": {"firstName": f"First{h[:4]}", "lastName": f"Last{h[4:8]}"},
+                           "birthDate": f"19{50 + int(h[8:10], 16) % 50}-0{1 + int(h[10], 16) % 9}-1{int(h[11], 16) % 9}"},
+                "personalEmail": {"address": f"{h[:10]}@example.com"},
+                "homeAddress": {"countryCode": "US", "city": "Emulator City"},
+                "_emulator": {"loyaltyTier": ("bronze", "silver", "gold")[int(h[12], 16) % 3],
+                              "lifetimeValue": int(h[13:17], 16) / 100},
+            },
+            "lastModifiedAt": _iso(1_700_000_000_000),
+        }
+
+    def _flow_item(self, resource, index):
+        if resource == "runs":
+            return self._run(index // max(self.config.runs_per_flow, 1), index % max(self.config.runs_per_flow, 1))
+        kind = {"connections": "connection", "sourceConnections": "source", "targetConnections": "target",
+                "flows": "flow"}[resource]
+        item = {
+            "id": _uuid_id(kind, index),
+            "name": f"Emulator {kind.title()} {index:03d}",
+            "createdAt": 1_700_000_000_000 + index * 86_400_000,
+            "updatedAt": 1_700_000_000_000 + index * 86_400_000,
+            "etag": f"\"{_digest(kind, index)[:8]}\"",
+            "state": "disabled" if resource == "flows" and index % 10 == 9 else "enabled",
+        }
+        if resource == "flows":
+            item["sourceConnectionIds"] = [_uuid_id("source", index % max(self.config.connections, 1))]
+            item["targetConnectionIds"] = [_uuid_id("target", index)]
+            item["flowSpec"] = {"id": "9753525b-82c7-4dce-8a9b-5ccfce2b9876", "version": "1.0"}
+        else:
+            item["connectionSpec"] = {"id": "ecadc60c-7455-4d87-84dc-2a0e293d997b", "version": "1.0"}
+        return item
+
+    def _run(self, flow_index, run_index):
+        flow_id = _uuid_id("flow", flow_index)
+        created = self._now_ms() - (self.config.runs_per_flow - run_index) * 3_600_000
+        outcome = "failed" if (flow_index + run_index) % 13 == 0 else (
+            "partialSuccess" if (flow_index + run_index) % 7 == 0 else "success")
+        read = 10_000 + (flow_index * 37 + run_index * 101) % 5000
+        failed = 0 if outcome == "success" else read // (2 if outcome == "failed" else 50)
+        return {
+            "id": _uuid_id("run", flow_index * 100_000 + run_index),
+            "flowId": flow_id,
+            "createdAt": created,
+            "metrics": {
+                "durationSummary": {"startedAtUTC": created, "completedAtUTC": created + 60_000 + run_index * 1000},
+                "sizeSummary": {"inputBytes": read * 512, "outputBytes": (read - failed) * 480},
+                "recordSummary": {"inputRecordCount": read, "outputRecordCount": read - failed,
+                                  "failedRecordCount": failed},
+                "statusSummary": {"status": outcome,
+                                  "errors": [{"code": "CONNECTOR-2001-500", "message": "Synthetic failure"}]
+                                  if outcome != "success" else []},
+            },
+        }
+
+    def _query_row(self, index):
+        h = _digest("row", index)
+        return {
+            "profile_id": h[:24],
+            "email": f"user{index}@example.com",
+            "segment_id": _uuid_id("audience", index % max(self.config.audiences, 1)),
+            "country": ("US", "CA", "GB", "DE", "FR", "JP")[index % 6],
+            "score": round(int(h[24:28], 16) / 655.35, 2),
+            "events": int(h[28:30], 16),
+            "last_seen": _iso(1_700_000_000_000 + index * 1000),
+        }
+
+    # ── IMS ──────────────────────────────────────────────────────────────
+
+    def _ims_token(self, request):
+        form = request.form() if request.body else {}
+        form.update({key: values[0] for key, values in request.query.items()})
+        if not form.get("client_id") or not form.get("client_secret"):
+            return 400, {"error": "invalid_client", "error_description": "client_id and client_secret are required"}, {}
+        with self._lock:
+            token = self._issue_token()
+        return 200, {"access_token": token, "token_type": "bearer", "expires_in": self.config.token_ttl}, {}
+
+    # ── Catalog ──────────────────────────────────────────────────────────
+
+    def _page_bounds(self, request, total, max_limit, default_limit=20):
+        start = max(request.int_param("start", 0), 0)
+        limit = min(max(request.int_param("limit", default_limit), 1), max_limit)
+        return start, min(start + limit, total)
+
+    def _list_datasets(self, request):
+        start, end = self._page_bounds(request, self.config.datasets, CATALOG_MAX_LIMIT)
+        properties = [p for p in (request.param("properties") or "").split(",") if p]
+        page = {}
+        for index in range(start, end):
+            dataset = self._dataset(index)
+            page[_hex_id("dataset", index)] = {k: dataset[k] for k in properties if k in dataset} if properties else dataset
+        return 200, page, {}
+
+    def _get_dataset(self, request):
+        dataset_id = request.groups[0]
+        index = _index_of(dataset_id, self.config.datasets)
+        if index is None or _hex_id("dataset", index) != dataset_id:
+            return 404, {"title": "Not Found", "detail": f"Dataset {dataset_id} not found"}, {}
+        return 200, {dataset_id: self._dataset(index)}, {}
+
+    def _create_dataset(self, request):
+        payload = request.json() or {}
+        if not payload.get("name") or not payload.get("schemaRef"):
+            return 400, {"title": "Bad Request", "detail": "name and schemaRef are required"}, {}
+        return 201, [f"@/dataSets/{uuid.uuid4().hex[:24]}"], {}
+
+    def _batch_id(self, dataset_index, batch_index):
+        return f"{dataset_index:08x}{batch_index:04x}{_digest('batch', (dataset_index, batch_index))[:12]}"
+
+    def _list_batches(self, request):
+        dataset_id = request.param("dataSet")
+        dataset_index = _index_of(dataset_id or "", self.config.datasets)
+        if dataset_index is None or request.param("status", "failed") != "failed":
+            return 200, {}, {}
+        after = request.int_param("createdAfter", 0)
+        before = request.int_param("createdBefore", 2 ** 62)
+        now = self._now_ms()
+        batches = []
+        for batch_index in range(self.config.failed_batches):
+            created = now - (batch_index + 1) * 3_600_000
+            if after <= created <= before:
+                batches.append((self._batch_id(dataset_index, batch_index), {
+                    "status": "failed", "created": created, "completed": created + 30_000,
+                    "relatedObjects": [{"type": "dataSet", "id": dataset_id}],
+                    "errors": [{"code": "101", "description": "Batch failed schema validation", "rows": ["1", "2"]}],
+                }))
+        start, end = self._page_bounds(request, len(batches), CATALOG_MAX_LIMIT)
+        return 200, dict(batches[start:end]), {}
+
+    def _failed_files(self, request):
+        batch_id = request.groups[0]
+        path = request.param("path")
+        if path is None:
+            files = [{"name": f"part-{n:05d}.json", "length": self.config.failed_records * 200,
+                      "_links": {"self": {"href": f"{self.url}/data/foundation/export/batches/{batch_id}/failed"
+                                                  f"?path=part-{n:05d}.json"}}} for n in range(2)]
+            return 200, {"data": files, "_page": {"limit": 100, "count": len(files)}}, {}
+
+        fields = ("/_emulator/email", "/_emulator/loyaltyTier", "/person/birthDate")
+        lines = []
+        for n in range(self.config.failed_records):
+            field = fields[n % len(fields)]
+            code = ("ERR-1001", "ERR-2003", "ERR-4002")[n % 3]
+            lines.append(json.dumps({"_id": f"{batch_id}-{path}-{n}", "_errors": [
+                {"code": code, "message": f"Value at {field} does not match the expected type", "path": field}]}))
+        return 200, ("\n".join(lines) + "\n").encode(), {"Content-Type": "application/octet-stream"}
+
+    # ── Query Service ────────────────────────────────────────────────────
+
+    def _submit_query(self, request):
+        payload = request.json() or {}
+        sql = payload.get("sql")
+        if not sql:
+            return 400, {"message": "sql is required", "statusCode": 400}, {}
+        limit = re.search(r"\blimit\s+(\d+)\s*;?\s*$", sql, re.IGNORECASE)
+        query_id = str(uuid.uuid4())
+        query = {"id": query_id, "sql": sql, "name": payload.get("name"), "state": "SUBMITTED",
+                 "created": _iso(self._now_ms()), "rows": int(limit.group(1)) if limit else self.config.query_rows,
+                 "polls": 0}
+        with self._lock:
+            self.queries[query_id] = query
+        return 201, {k: v for k, v in query.items() if k not in ("rows", "polls")}, {}
+
+    def _list_queries(self, request):
+        with self._lock:
+            queries = [{k: v for k, v in q.items() if k not in ("rows", "polls")} for q in self.queries.values()]
+        return 200, {"queries": queries[-request.int_param("limit", 50):], "_links": {}}, {}
+
+    def _get_query(self, request):
+        with self._lock:
+            query = self.queries.get(request.groups[0])
+            if query is None:
+                return 404, {"message": "Query not found", "statusCode": 404}, {}
+            query["polls"] += 1
+            if query["state"] != "SUCCEEDED":
+                query["state"] = "SUCCEEDED" if query["polls"] > self.config.query_polls else "IN_PROGRESS"
+            return 200, {k: v for k, v in query.items() if k not in ("rows", "polls")}, {}
+
+    def _query_results(self, request):
+        with self._lock:
+            query = self.queries.get(request.groups[0])
+        if query is None:
+            return 404, {"message": "Query not found", "statusCode": 404}, {}
+        if query["state"] != "SUCCEEDED":
+            return 400, {"message": f"Query is {query['state']}", "statusCode": 400}, {}
+        return 200, self._stream_rows(query["rows"]), {}
+
+    def _stream_rows(self, total):
+        yield b'{"rows":['
+        for start in range(0, total, RESULT_CHUNK_ROWS):
+            chunk = json.dumps([self._query_row(i) for i in range(start, min(start + RESULT_CHUNK_ROWS, total))])
+            yield (b"," if start else b"") + chunk[1:-1].encode()
+        yield b"]}"
+
+    # ── Schema Registry ──────────────────────────────────────────────────
+
+    def _registry(self, container, resource_type):
+        """Ids of one registry listing, in order."""
+        config = self.config
+        if container == "tenant":
+            if resource_type == "schemas":
+                return [self._schema_id(i) for i in range(config.schemas)]
+            if resource_type in ("fieldgroups", "mixins"):
+                return [self._fieldgroup_id(i) for i in range(config.fieldgroups)]
+            return []
+        return {
+            "classes": ["https://ns.adobe.com/xdm/context/profile", "https://ns.adobe.com/xdm/context/experienceevent"],
+            "behaviors": ["https://ns.adobe.com/xdm/data/record", "https://ns.adobe.com/xdm/data/time-series"],
+            "datatypes": ["https://ns.adobe.com/xdm/context/person-name"],
+        }.get(resource_type, [])
+
+    def _registry_resource(self, container, resource_type, resource_id):
+        ids = self._registry(container, resource_type)
+        if resource_id not in ids and not any(_alt_id(i) == resource_id for i in ids):
+            return None
+        if resource_id not in ids:
+            resource_id = next(i for i in ids if _alt_id(i) == resource_id)
+        if (container, resource_id) in self.deleted:
+            return None
+        index = ids.index(resource_id)
+        resource = {
+            "$id": resource_id, "meta:altId": _alt_id(resource_id), "meta:resourceType": resource_type,
+            "meta:containerId": container, "version": "1.0", "type": "object",
+            "title": f"Emulator {resource_type[:-1].title()} {index}",
+            "description": self._filler(resource_type, index) or "",
+        }
+        if resource_type == "schemas":
+            fieldgroup = self._fieldgroup_id(index % max(self.config.fieldgroups, 1))
+            resource.update({"meta:class": "https://ns.adobe.com/xdm/context/profile",
+                             "allOf": [{"$ref": "https://ns.adobe.com/xdm/context/profile"}, {"$ref": fieldgroup}]})
+        elif resource_type in ("fieldgroups", "mixins"):
+            fields = {f"field{k}": {"type": "string", "title": f"Field {k}"} for k in range(self.config.schema_fields)}
+            fields["email"] = {"type": "string", "format": "email", "title": "Email"}
+            fields["loyaltyTier"] = {"type": "string", "enum": ["bronze", "silver", "gold"]}
+            resource.update({"meta:intendedToExtend": ["https://ns.adobe.com/xdm/context/profile"],
+                             "definitions": {"fields": {"properties": {"_emulator": {
+                                 "type": "object", "properties": fields}}}},
+                             "allOf": [{"$ref": "#/definitions/fields"}]})
+        elif resource_type == "classes":
+            resource.update({"meta:extends": ["https://ns.adobe.com/xdm/data/record"],
+                             "properties": {"_id": {"type": "string", "format": "uri-reference"},
+                                            "personalEmail": {"type": "object",
+                                                              "properties": {"address": {"type": "string"}}}}})
+        elif resource_type == "datatypes":
+            resource.update({"properties": {"firstName": {"type": "string"}, "lastName": {"type": "string"}}})
+        else:
+            resource.update({"properties": {"timestamp": {"type": "string", "format": "date-time"}}})
+        patched = self.patched.get(resource_id)
+        if patched:
+            resource.update(patched)
+        return resource
+
+    def _list_registry(self, request):
+        container, resource_type = request.groups
+        ids = [i for i in self._registry(container, resource_type) if (container, i) not in self.deleted]
+        start, end = self._page_bounds(request, len(ids), REGISTRY_MAX_LIMIT, default_limit=REGISTRY_MAX_LIMIT)
+        full = "xed-id" not in request.headers.get("Accept", "xed-id")
+        results = []
+        for resource_id in ids[start:end]:
+            resource = self._registry_resource(container, resource_type, resource_id)
+            results.append(resource if full else {key: resource[key] for key in ("$id", "meta:altId", "version", "title")})
+        next_start = str(end) if end < len(ids) else None
+        return 200, {"results": results, "_page": {"orderby": "title", "next": next_start, "count": len(results)},
+                     "_links": {"next": {"href": f"?start={next_start}"} if next_start else None}}, {}
+
+    def _get_registry(self, request):
+        container, resource_type, resource_id = request.groups
+        resource = self._registry_resource(container, resource_type, unquote(resource_id))
+        if resource is None:
+            return 404, {"type": "/placeholder/type/uri", "status": 404, "title": "NotFoundError",
+                         "detail": f"{resource_id} not found"}, {}
+        return 200, resource, {}
+
+    def _create_registry(self, request):
+        payload = request.json() or {}
+        if not payload.get("title"):
+            return 400, {"status": 400, "title": "Bad Request", "detail": "title is required"}, {}
+        resource_id = f"https://ns.adobe.com/emulator/{request.groups[1]}/{uuid.uuid4().hex}"
+        return 201, dict(payload, **{"$id": resource_id, "meta:altId": _alt_id(resource_id), "version": "1.0"}), {}
+
+    def _patch_registry(self, request):
+        container, resource_type, resource_id = request.groups
+        resource = self._registry_resource(container, resource_type, unquote(resource_id))
+        if resource is None:
+            return 404, {"status": 404, "title": "NotFoundError", "detail": f"{resource_id} not found"}, {}
+        payload = request.json()
+        changes = dict(payload) if isinstance(payload, dict) else {}
+        major, minor = resource["version"].split(".")
+        changes["version"] = f"{major}.{int(minor) + 1}"
+        with self._lock:
+            self.patched.setdefault(resource["$id"], {}).update(changes)
+        return 200, self._registry_resource(container, resource_type, resource["$id"]), {}
+
+    def _delete_registry(self, request):
+        container, resource_type, resource_id = request.groups
+        resource = self._registry_resource(container, resource_type, unquote(resource_id))
+        if resource is None:
+            return 404, {"status": 404, "title": "NotFoundError", "detail": f"{resource_id} not found"}, {}
+        with self._lock:
+            self.deleted.add((container, resource["$id"]))
+        return 204, None, {}
+
+    def _list_descriptors(self, request):
+        ids = self._registry("tenant", "schemas")
+        start, end = self._page_bounds(request, len(ids), REGISTRY_MAX_LIMIT, default_limit=REGISTRY_MAX_LIMIT)
+        descriptors = [{
+            "@id": _digest("descriptor", i), "@type": "xdm:descriptorIdentity",
+            "xdm:sourceSchema": ids[i], "xdm:sourceVersion": 1, "xdm:sourceProperty": "/_emulator/email",
+            "xdm:namespace": "Email", "xdm:property": "xdm:code", "xdm:isPrimary": True,
+        } for i in range(start, end)]
+        return 200, {"descriptors": descriptors,
+                     "_page": {"next": str(end) if end < len(ids) else None, "count": len(descriptors)}}, {}
+
+    # ── Segmentation ─────────────────────────────────────────────────────
+
+    def _list_audiences(self, request):
+        total = self.config.audiences
+        with self._lock:
+            created = list(self.created_audiences.values())
+            deleted = {audience_id for container, audience_id in self.deleted if container == "audience"}
+        count = total + len(created)
+        start, end = self._page_bounds(request, count, AUDIENCE_MAX_LIMIT, default_limit=AUDIENCE_MAX_LIMIT)
+        children = [self._audience(i) if i < total else created[i - total] for i in range(start, end)]
+        children = [a for a in children if a["id"] not in deleted]
+        page = {"start": start, "limit": end - start, "count": len(children)}
+        if self.config.advertise_totals:
+            page["totalCount"] = count
+        if end < count:
+            page["next"] = str(end)
+        return 200, {"children": children, "_page": page, "_links": {"next": {"href": f"?start={end}"} if end < count else {}}}, {}
+
+    def _find_audience(self, audience_id):
+        if ("audience", audience_id) in self.deleted:
+            return None
+        if audience_id in self.created_audiences:
+            return self.created_audiences[audience_id]
+        index = _index_of(audience_id, self.config.audiences)
+        if index is None or _uuid_id("audience", index) != audience_id:
+            return None
+        return self._audience(index)
+
+    def _get_audience(self, request):
+        with self._lock:
+            audience = self._find_audience(request.groups[0])
+        if audience is None:
+            return 404, {"status": 404, "title": "Not Found", "detail": f"Audience {request.groups[0]} not found"}, {}
+        return 200, audience, {}
+
+    def _create_audience(self, request):
+        payload = request.json() or {}
+        expression = (payload.get("expression") or {}).get("value")
+        if not payload.get("name") or not expression:
+            return 400, {"status": 400, "title": "Bad Request", "detail": "name and expression are required"}, {}
+        audience = dict(payload, id=str(uuid.uuid4()), namespace="AEPSegments", createdAt=self._now_ms(),
+                        updateTime=self._now_ms())
+        with self._lock:
+            self.created_audiences[audience["id"]] = audience
+        return 200, audience, {}
+
+    def _delete_audience(self, request):
+        with self._lock:
+            audience = self._find_audience(request.groups[0])
+            if audience is None:
+                return 404, {"status": 404, "title": "Not Found"}, {}
+            self.created_audiences.pop(audience["id"], None)
+            self.deleted.add(("audience", audience["id"]))
+        return 204, None, {}
+
+    def _list_segment_definitions(self, request):
+        total = self.config.segment_definitions
+        start, end = self._page_bounds(request, total, SEGMENT_MAX_LIMIT, default_limit=SEGMENT_MAX_LIMIT)
+        segments = [dict(self._audience(i), id=_uuid_id("audience", i)) for i in range(start, end)]
+        return 200, {"segments": segments, "page": {"totalCount": total, "totalPages": -(-total // SEGMENT_MAX_LIMIT),
+                                                    "pageOffset": str(start), "pageSize": len(segments)},
+                     "link": {"next": f"?start={end}" if end < total else ""}}, {}
+
+    def _new_job(self, kind, payload, status):
+        job_id = str(uuid.uuid4()) if kind != "export" else str(1000 + len(self.jobs))
+        job = {"id": job_id, "kind": kind, "status": status, "polls": 0, "payload": payload,
+               "creationTime": self._now_ms()}
+        with self._lock:
+            self.jobs[job_id] = job
+        return job
+
+    def _job_view(self, job):
+        view = {"id": job["id"], "status": job["status"], "creationTime": job["creationTime"]}
+        if job["kind"] == "export":
+            payload = job["payload"]
+            view.update(filter={"segments": [{"segmentId": payload.get("segmentId")}]},
+                        destination={"datasetId": payload.get("datasetId")},
+                        mergePolicy={"id": payload.get("mergePolicyId")}, jobType="BATCH")
+            if job["status"] == "SUCCEEDED":
+                view["metrics"] = {"profileExportTime": {"start": job["creationTime"], "end": self._now_ms()},
+                                   "totalExportedProfileCounter": 100_000}
+        elif job["kind"] == "segment":
+            view["segments"] = [{"segmentId": s.get("segmentId")} for s in job["payload"] or []]
+        else:
+            view.update(name=(job["payload"] or {}).get("name"), profileType="all")
+        return view
+
+    def _create_segment_job(self, request):
+        payload = request.json()
+        segments = payload if isinstance(payload, list) else (payload or {}).get("segments", [])
+        if not segments:
+            return 400, {"status": 400, "title": "Bad Request", "detail": "At least one segmentId is required"}, {}
+        return 200, self._job_view(self._new_job("segment", segments, "NEW")), {}
+
+    def _create_export_job(self, request):
+        payload = request.json() or {}
+        if not payload.get("datasetId") and not (payload.get("destination") or {}).get("datasetId"):
+            return 400, {"status": 400, "title": "Bad Request", "detail": "datasetId is required"}, {}
+        return 200, self._job_view(self._new_job("export", payload, "NEW")), {}
+
+    def _create_snapshot(self, request):
+        return 202, self._job_view(self._new_job("snapshot", request.json() or {}, "PROCESSING")), {}
+
+    def _get_job(self, request):
+        with self._lock:
+            job = self.jobs.get(request.groups[0])
+            if job is None:
+                return 404, {"status": 404, "title": "Not Found", "detail": f"Job {request.groups[0]} not found"}, {}
+            job["polls"] += 1
+            if job["status"] not in ("SUCCEEDED", "FAILED", "CANCELLED"):
+                job["status"] = "SUCCEEDED" if job["polls"] > self.config.export_polls else "PROCESSING"
+            return 200, self._job_view(job), {}
+
+    def _list_merge_policies(self, request):
+        total = self.config.merge_policies
+        start, end = self._page_bounds(request, total, 100)
+        return 200, {"_page": {"totalCount": total, "pageSize": end - start},
+                     "children": [self._merge_policy(i) for i in range(start, end)], "_links": {}}, {}
+
+    def _get_merge_policy(self, request):
+        index = _index_of(request.groups[0], self.config.merge_policies)
+        if index is None or _uuid_id("merge_policy", index) != request.groups[0]:
+            return 404, {"status": 404, "title": "Not Found"}, {}
+        return 200, self._merge_policy(index), {}
+
+    # ── Profile access ───────────────────────────────────────────────────
+
+    def _get_entities(self, request):
+        if request.param("schema.name", "_xdm.context.profile") == "_xdm.context.experienceevent":
+            return self._experience_events(request)
+        namespace, value = request.param("entityIdNS"), request.param("entityId")
+        if not namespace or not value:
+            return 400, {"status": 400, "title": "Bad Request", "detail": "entityId and entityIdNS are required"}, {}
+        profile = self._profile(namespace, value)
+        return 200, {profile["entityId"]: profile}, {}
+
+    def _batch_entities(self, request):
+        payload = request.json() or {}
+        found = {}
+        for identity in payload.get("identities", []):
+            namespace = (identity.get("entityIdNS") or {}).get("code", "")
+            value = identity.get("entityId")
+            profile = self._profile(namespace, value)
+            found[profile["entityId"]] = {"requestedIdentity": identity, "entityId": profile["entityId"],
+                                          "entity": profile["entity"], "sources": profile["sources"]}
+        return 200, found, {}
+
+    def _experience_events(self, request):
+        value = request.param("relatedEntityId", "")
+        namespace = request.param("relatedEntityIdNS", "")
+        start_time = request.int_param("startTime", 0)
+        end_time = request.int_param("endTime", self._now_ms())
+        total = self.config.events_per_profile
+        span = max(end_time - start_time, 1)
+        timestamps = [start_time + (span * (i + 1)) // (total + 1) for i in range(total)]
+        start, end = self._page_bounds(request, total, EVENT_MAX_LIMIT)
+        children = [{
+            "relatedEntityId": value, "entityId": _digest("event", f"{namespace}:{value}:{i}")[:24],
+            "timestamp": timestamps[i],
+            "entity": {"eventType": ("web.webpagedetails.pageViews", "commerce.purchases")[i % 2],
+                       "timestamp": _iso(timestamps[i]), "_id": _digest("event-id", f"{value}:{i}")},
+        } for i in range(start, end)]
+        links = {}
+        if end < total:
+            query = "&".join(f"{quote(k)}={quote(v[0])}" for k, v in request.query.items() if k != "start")
+            links["next"] = {"href": f"/entities?{query}&start={end}"}
+        return 200, {"_page": {"count": len(children), "next": str(end) if end < total else ""},
+                     "children": children, "_links": links}, {}
+
+    def _identity_cluster(self, request):
+        namespace, value = request.param("namespace", ""), request.param("id", "")
+        if not value:
+            return 400, {"status": 400, "title": "Bad Request", "detail": "id is required"}, {}
+        h = _digest("cluster", f"{namespace}:{value}")
+        members = [{"namespace": {"code": namespace}, "id": value},
+                   {"namespace": {"code": "ECID"}, "id": str(int(h[:15], 16))},
+                   {"namespace": {"code": "Email"}, "id": f"{h[15:25]}@example.com"}]
+        return 200, {"members": members}, {}
+
+    # ── Flow Service ─────────────────────────────────────────────────────
+
+    def _flow_total(self, resource):
+        config = self.config
+        return {"connections": config.connections, "sourceConnections": config.connections,
+                "targetConnections": config.flows, "flows": config.flows,
+                "runs": config.flows * config.runs_per_flow}[resource]
+
+    def _list_flow(self, request):
+        resource = request.groups[0]
+        total = self._flow_total(resource)
+        start = request.int_param("continuationToken", 0)
+        limit = min(max(request.int_param("limit", FLOW_MAX_LIMIT), 1), FLOW_MAX_LIMIT)
+
+        filters = []
+        for prop in request.query.get("property", []):
+            for clause in prop.split(","):
+                match = re.match(r"^(\w+)(==|>=|<=|>|<)(.*)$", clause)
+                if match:
+                    filters.append(match.groups())
+        if resource == "runs":
+            flow_ids = [v for k, op, v in filters if k == "flowId" and op == "=="]
+            if flow_ids:
+                flow_index = _index_of(flow_ids[0], self.config.flows)
+                if flow_index is None:
+                    return 200, {"items": [], "_links": {}}, {}
+                indexes = range(flow_index * self.config.runs_per_flow, (flow_index + 1) * self.config.runs_per_flow)
+            else:
+                indexes = range(total)
+        else:
+            indexes = range(total)
+
+        items = [self._flow_item(resource, i) for i in indexes]
+        for key, op, value in filters:
+            if key == "flowId":
+                continue
+            items = [item for item in items if _compare(item.get(key), op, value)]
+        with self._lock:
+            items = [item for item in items if (resource, item["id"]) not in self.deleted]
+        order = request.param("orderby")
+        if order:
+            items.sort(key=lambda item: item.get(order.lstrip("-+"), 0), reverse=order.startswith("-"))
+
+        page = items[start:start + limit]
+        links = {}
+        if start + limit < len(items):
+            query = "&".join(f"{quote(k)}={quote(v)}" for k, values in request.query.items()
+                             if k != "continuationToken" for v in values)
+            links["next"] = {"href": f"/{resource}?{query}&continuationToken={start + limit}"}
+        return 200, {"items": page, "_links": links}, {}
+
+    def _create_connection(self, request):
+        payload = request.json() or {}
+        if not payload.get("name"):
+            return 400, {"code": "CONNECTOR-1001-400", "message": "name is required"}, {}
+        return 201, {"id": str(uuid.uuid4()), "etag": f"\"{uuid.uuid4().hex[:8]}\""}, {}
+
+    def _test_connection(self, request):
+        index = _index_of(request.groups[0], self.config.connections)
+        if index is None:
+            return 404, {"code": "CONNECTOR-1404-404", "message": "Connection not found"}, {}
+        if index % 7 == 3:
+            return 400, {"code": "CONNECTOR-2005-400", "message": "Invalid credentials for the source system"}, {}
+        return 200, {"status": "OK"}, {}
+
+    def _delete_flow_item(self, request):
+        resource, item_id = request.groups
+        if _index_of(item_id, self._flow_total(resource)) is None:
+            return 404, {"code": "CONNECTOR-1404-404", "message": f"{item_id} not found"}, {}
+        with self._lock:
+            self.deleted.add((resource, item_id))
+        return 204, None, {}
+
+
+def _alt_id(resource_id):
+    tail = resource_id.rstrip("/").split("/")
+    return f"_{'.'.join(tail[-3:])}" if "emulator" in resource_id else f"_xdm.{'.'.join(tail[-2:])}"
+
+
+def _compare(actual, op, expected):
+    if actual is None:
+        return False
+    try:
+        actual, expected = float(actual), float(expected)
+    except (TypeError, ValueError):
+        actual, expected = str(actual), expected
+    return {"==": actual == expected, ">=": actual >= expected, "<=": actual <= expected,
+            ">": actual > expected, "<": actual < expected}[op]
@@ -0,0 +1,163 @@
+# rtcdp/core/field_index.py
+
+import os
+import re
+import json
+import time
+import logging
+
+FIELD_INDEX_PATH = os.path.join("logs", "field_index.json")
+IDENTITY_DESCRIPTOR = "xdm:descriptorIdentity"
+
+
+def flatten_schema(resolved, prefix=""):
+    """Yield (dotted path, type) for every field of a resolved schema, descending into objects and arrays."""
+    for name, definition in (resolved.get("properties") or {}).items():
+        path = f"{prefix}.{name}" if prefix else name
+        field_type = definition.get("meta:xdmType") or definition.get("type", "object")
+        if definition.get("properties"):
+            yield path, field_type
+            yield from flatten_schema(definition, path)
+        elif field_type == "array" and isinstance(definition.get("items"), dict):
+            items = definition["items"]
+            item_type = items.get("meta:xdmType") or items.get("type", "object")
+            yield path, f"array<{item_type}>"
+            if items.get("properties"):
+                yield from flatten_schema(items, path)
+        else:
+            yield path, field_type
+
+
+def pointer_to_path(pointer):
+    """Descriptor source property (``/_tenant/email``) to a dotted field path."""
+    return ".".join(part for part in pointer.strip("/").split("/") if part)
+
+
+def query_table_name(dataset):
+    """Query Service table name of a catalog dataset."""
+    tags = dataset.get("tags", {}).get("adobe/pqs/table")
+    if tags:
+        return tags[0]
+    return re.sub(r"\W+", "_", dataset.get("name", "")).strip("_").lower()
+
+
+class FieldIndex:
+    """
+    Inverted index from flattened field paths and identity namespaces to the
+    schemas and datasets that contain them.
+
+    Built once from the local schema registry mirror plus the dataset catalog;
+    every lookup afterwards is a dictionary access. ``mirror_version`` records
+    the mirror fingerprint it was built from, so a stale index can be detected.
+    """
+
+    def __init__(self, fields=None, namespaces=None, schemas=None, datasets=None, built_at=None,
+                 mirror_version=None):
+        self.fields = fields or {}              # path -> {"types": [...], "schemas": [...]}
+        self.namespaces = namespaces or {}      # NAMESPACE -> [{"schema", "path", "primary"}]
+        self.schemas = schemas or {}            # schema id -> {"title", "fields": {path: type}, "datasets": [...]}
+        self.datasets = datasets or {}          # dataset id -> {"name", "table", "schema"}
+        self.built_at = built_at
+        self.mirror_version = mirror_version
+
+    @classmethod
+    def build(cls, mirror, datasets, descriptors=()):
+        """
+        Index every mirrored schema.
+
+        ``datasets`` is an iterable of catalog dataset dicts (with ``id``,
+        ``name`` and ``schemaRef``); ``descriptors`` are registry descriptors.
+        """
+        index = cls(built_at=time.time(), mirror_version=mirror.fingerprint())
+        for schema_id, entry in mirror.resources("schemas").items():
+            try:
+                resolved = mirror.resolve(schema_id)
+            except (ValueError, KeyError) as e:
+                logging.warning(f"Skipping schema {schema_id} in field index: {e}")
+                continue
+            fields = dict(flatten_schema(resolved))
+            index.schemas[schema_id] = {"title": entry.get("title"), "fields": fields, "datasets": []}
+            for path, field_type in fields.items():
+                posting = index.fields.setdefault(path, {"types": [], "schemas": []})
+                posting["schemas"].append(schema_id)
+                if field_type not in posting["types"]:
+                    posting["types"].append(field_type)
+
+        for descriptor in descriptors:
+            if descriptor.get("@type") != IDENTITY_DESCRIPTOR:
+                continue
+            schema_id = mirror.canonical_id(descriptor.get("xdm:sourceSchema", ""))
+            namespace = str(descriptor.get("xdm:namespace", "")).upper()
+            index.namespaces.setdefault(namespace, []).append({
+                "schema": schema_id,
+                "path": pointer_to_path(descriptor.get("xdm:sourceProperty", "")),
+                "primary": bool(descriptor.get("xdm:isPrimary")),
+            })
+
+        for dataset in datasets:
+            schema_id = mirror.canonical_id((dataset.get("schemaRef") or {}).get("id", ""))
+            index.datasets[dataset["id"]] = {
+                "name": dataset.get("name"), "table": query_table_name(dataset), "schema": schema_id,
+            }
+            if schema_id in index.schemas:
+                index.schemas[schema_id]["datasets"].append(dataset["id"])
+
+        logging.info(f"Built field index: {len(index.fields)} paths, {len(index.schemas)} schemas, "
+                     f"{len(index.datasets)} datasets, {len(index.namespaces)} namespaces")
+        return index
+
+    def save(self, path=FIELD_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.__dict__, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=FIELD_INDEX_PATH):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return cls(**json.load(f))
+
+    def _datasets_for_schemas(self, schema_ids):
+        return [
+            dataset_id
+            for schema_id in dict.fromkeys(schema_ids)
+            for dataset_id in self.schemas.get(schema_id, {}).get("datasets", [])
+        ]
+
+    def datasets_with_field(self, path):
+        return self._datasets_for_schemas(self.fields.get(path, {}).get("schemas", []))
+
+    def datasets_with_namespace(self, namespace):
+        """Datasets whose schema has an identity field in ``namespace``, with the identity paths."""
+        matches = {}
+        for entry in self.namespaces.get(namespace.upper(), []):
+            for dataset_id in self._datasets_for_schemas([entry["schema"]]):
+                matches.setdefault(dataset_id, []).append(entry["path"])
+        return matches
+
+    def search_fields(self, term):
+        """Field paths containing ``term`` (case-insensitive), with their types."""
+        term = term.lower()
+        return {path: posting["types"] for path, posting in self.fields.items() if term in path.lower()}
+
+    def projection(self, dataset_id, prefix=None, leaves_only=True):
+        """Field paths of a dataset's schema, optionally under ``prefix`` (e.g. ``_tenant.mobilePhone``)."""
+        schema_id = self.datasets.get(dataset_id, {}).get("schema")
+        fields = self.schemas.get(schema_id, {}).get("fields", {})
+        paths = [p for p in fields if prefix is None or p == prefix or p.startswith(f"{prefix}.")]
+        if leaves_only:
+            parents = {p.rsplit(".", 1)[0] for p in paths if "." in p}
+            paths = [p for p in paths if p not in parents]
+        return paths
+
+    def projection_sql(self, dataset_id, prefix=None, limit=None):
+        table = self.datasets.get(dataset_id, {}).get("table", dataset_id)
+        paths = self.projection(dataset_id, prefix)
+        columns = ",\n".join(f"    {p}" for p in paths) or "    *"
+        sql = f"SELECT\n{columns}\nFROM {table}"
+        return f"{sql}\nLIMIT {limit};" if limit else f"{sql};"
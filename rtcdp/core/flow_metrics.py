@@ -0,0 +1,79 @@
+# rtcdp/core/flow_metrics.py
+
+import os
+import pandas as pd
+from rtcdp.core.timeseries import TimeSeriesStore
+
+FLOW_METRICS_DIR = os.path.join("logs", "flow_metrics")
+# Runs created this long before the cursor are re-harvested so in-flight runs get their final metrics
+REHARVEST_WINDOW_MS = 24 * 60 * 60 * 1000
+
+
+def open_store(path=FLOW_METRICS_DIR):
+    return TimeSeriesStore(path, time_column="created_at", key_column="run_id")
+
+
+def _epoch_ms(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp() * 1000)
+
+
+def run_record(run, flow_name=""):
+    """Flatten one Flow Service run into a time-series row."""
+    metrics = run.get("metrics", {})
+    durations = metrics.get("durationSummary", {})
+    records = metrics.get("recordSummary", {})
+    sizes = metrics.get("sizeSummary", {})
+    started = _epoch_ms(durations.get("startedAtUTC"))
+    completed = _epoch_ms(durations.get("completedAtUTC"))
+    errors = metrics.get("statusSummary", {}).get("errors") or []
+    return {
+        "run_id": run.get("id"),
+        "flow_id": run.get("flowId"),
+        "flow_name": flow_name,
+        "created_at": pd.Timestamp(run.get("createdAt", 0), unit="ms", tz="UTC"),
+        "status": metrics.get("statusSummary", {}).get("status", "unknown"),
+        "duration_s": (completed - started) / 1000 if started and completed else None,
+        "records_read": records.get("inputRecordCount", 0),
+        "records_written": records.get("outputRecordCount", 0),
+        "records_failed": records.get("failedRecordCount", 0),
+        "bytes_read": sizes.get("inputBytes", 0),
+        "bytes_written": sizes.get("outputBytes", 0),
+        "error_codes": ",".join(sorted({str(e.get("code")) for e in errors if e.get("code")})),
+    }
+
+
+def _per_flow(runs, freq):
+    """Group runs by flow ID and period; flow names aren't unique, so they only label the rows."""
+    runs = runs.assign(flow_name=runs["flow_name"].replace("", pd.NA))
+    return runs.groupby(["flow_id", pd.Grouper(key="created_at", freq=freq)])
+
+
+def throughput_trend(runs, freq="D"):
+    """Records written per second of run time, per flow and period."""
+    if runs.empty:
+        return pd.DataFrame()
+    grouped = _per_flow(runs, freq)
+    trend = grouped.agg(flow_name=("flow_name", "last"), runs=("run_id", "count"),
+                        records_written=("records_written", "sum"),
+                        duration_s=("duration_s", "sum"))
+    trend["flow_name"] = trend["flow_name"].fillna("")
+    trend["records_per_s"] = (trend["records_written"] / trend["duration_s"].where(trend["duration_s"] > 0)).round(1)
+    return trend
+
+
+def failure_rate_trend(runs, freq="D"):
+    """Share of failed records and failed runs, per flow and period."""
+    if runs.empty:
+        return pd.DataFrame()
+    runs = runs.assign(run_failed=(runs["status"] == "failed").astype(int))
+    grouped = _per_flow(runs, freq)
+    trend = grouped.agg(flow_name=("flow_name", "last"), runs=("run_id", "count"), failed_runs=("run_failed", "sum"),
+                        records_read=("records_read", "sum"), records_failed=("records_failed", "sum"))
+    trend["flow_name"] = trend["flow_name"].fillna("")
+    trend["record_failure_rate"] = (trend["records_failed"] / trend["records_read"].where(trend["records_read"] > 0)).round(4)
+    trend["run_failure_rate"] = (trend["failed_runs"] / trend["runs"]).round(4)
+    return trend
@@ -0,0 +1,269 @@
+# rtcdp/core/fragments.py
+
+import os
+import json
+import logging
+import threading
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from rtcdp.core.snapshot import load_profile_snapshot
+from rtcdp.core.identity_graph import identity_key, hash_identities, normalize_identity_keys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; segments fall back to pickle
+    pq = None
+
+IDENTITY_COLUMN = "_fragment.identity"
+DATASET_COLUMN = "_fragment.datasetId"
+TIMESTAMP_COLUMN = "_fragment.timestamp"
+FRAGMENT_COLUMNS = (IDENTITY_COLUMN, DATASET_COLUMN, TIMESTAMP_COLUMN)
+
+# Tried in order when no timestamp column is named explicitly
+TIMESTAMP_CANDIDATES = (
+    "extSourceSystemAudit.lastUpdatedDate",
+    "_repo.modifyDate",
+    "timestamp",
+    "lastModifiedAt",
+)
+
+
+def attribute_columns(frame):
+    return [c for c in frame.columns if c not in FRAGMENT_COLUMNS]
+
+
+def prepare_fragments(frame, identity_column="_id", identity_namespace=None,
+                      dataset_id=None, dataset_column=None, timestamp_column=None):
+    """
+    Normalize an exported fragment frame to the columns the local engines expect.
+
+    Adds ``_fragment.identity`` ("NS:value" when a namespace is given or the
+    value is already pre-joined, normalized like identity graph keys),
+    ``_fragment.datasetId`` and a UTC ``_fragment.timestamp``.
+    """
+    if identity_column not in frame.columns:
+        raise ValueError(f"Identity column '{identity_column}' not found in fragments.")
+
+    fragments = frame.copy()
+    identities = fragments[identity_column].astype(str).str.strip()
+    if identity_namespace:
+        identities = identity_key(identity_namespace, "") + identities
+    fragments[IDENTITY_COLUMN] = normalize_identity_keys(identities)
+
+    if dataset_column:
+        fragments[DATASET_COLUMN] = fragments[dataset_column].astype(str)
+    else:
+        fragments[DATASET_COLUMN] = dataset_id or "unknown"
+
+    timestamp_column = timestamp_column or next((c for c in TIMESTAMP_CANDIDATES if c in fragments.columns), None)
+    if timestamp_column:
+        raw = fragments[timestamp_column]
+        unit = "ms" if pd.api.types.is_numeric_dtype(raw) else None
+        fragments[TIMESTAMP_COLUMN] = pd.to_datetime(raw, errors="coerce", utc=True, unit=unit)
+    else:
+        logging.warning("No timestamp column found in fragments; timestamp ordering will follow file order.")
+        fragments[TIMESTAMP_COLUMN] = pd.NaT
+
+    return fragments
+
+
+def load_fragments(path, **options):
+    """
+    Load fragments from a ``FragmentStore`` directory, or load an exported
+    fragment file/directory and normalize it with ``prepare_fragments``.
+    """
+    if FragmentStore.is_store(path):
+        return FragmentStore(path).to_frame()
+    return prepare_fragments(load_profile_snapshot(path), **options)
+
+
+FRAGMENT_STORE_DIR = os.path.join("logs", "fragments")
+STORE_BUCKETS = 16
+SEGMENT_CACHE_SIZE = 64
+
+MANIFEST_FILE = "manifest.json"
+INDEX_HASHES_FILE = "index_hashes.npy"      # sorted 64-bit hashes of _fragment.identity
+INDEX_SEGMENTS_FILE = "index_segments.npy"  # segment id holding each indexed row
+INDEX_ROWS_FILE = "index_rows.npy"          # row position within that segment
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _read_segment(path):
+    # Segments are immutable once written, so caching by path is safe
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _arrow_safe(frame):
+    """Stringify object columns that mix value types (e.g. ints and strings), which parquet can't store."""
+    mixed = [c for c in frame.columns
+             if frame[c].dtype == object and frame[c].dropna().map(type).nunique() > 1]
+    if not mixed:
+        return frame
+    frame = frame.copy()
+    for column in mixed:
+        frame[column] = frame[column].map(
+            lambda v: v if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v))
+            else json.dumps(v, default=str) if isinstance(v, (dict, list)) else str(v))
+    logging.info(f"Stored mixed-type columns as text: {', '.join(mixed)}")
+    return frame
+
+
+def _write_segment(frame, path):
+    if pq is not None:
+        path += ".parquet"
+        try:
+            _arrow_safe(frame).to_parquet(path, index=False)
+        except pa.lib.ArrowException as e:
+            raise ValueError(f"Cannot write fragment segment {path}: {e}") from e
+    else:
+        path += ".pkl"
+        frame.to_pickle(path)
+    return path
+
+
+def _save_array(path, array):
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+class FragmentStore:
+    """
+    Append-only on-disk store of prepared profile fragments.
+
+    Rows are partitioned by dataset and by a hash bucket of the fragment identity
+    (``<root>/<datasetId>/bucket=NN/seg-NNNNNN.parquet``). A sorted, memory-mapped
+    secondary index over the identity hash maps each "NS:value" to its segment and
+    row, so point lookups read only the segments that hold that identity.
+    """
+
+    def __init__(self, path=FRAGMENT_STORE_DIR, buckets=STORE_BUCKETS):
+        self.path = path
+        self._lock = threading.Lock()
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"buckets": buckets, "segments": []}
+        self._load_index()
+
+    @staticmethod
+    def is_store(path):
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+    @property
+    def buckets(self):
+        return self.manifest["buckets"]
+
+    @property
+    def segments(self):
+        return self.manifest["segments"]
+
+    @property
+    def datasets(self):
+        return sorted({segment["dataset"] for segment in self.segments})
+
+    def __len__(self):
+        return sum(segment["rows"] for segment in self.segments)
+
+    def _load_index(self):
+        files = [os.path.join(self.path, name) for name in (INDEX_HASHES_FILE, INDEX_SEGMENTS_FILE, INDEX_ROWS_FILE)]
+        if all(os.path.exists(f) for f in files):
+            self.index_hashes, self.index_segments, self.index_rows = (np.load(f, mmap_mode="r") for f in files)
+        else:
+            self.index_hashes = np.array([], dtype=np.uint64)
+            self.index_segments = np.array([], dtype=np.int32)
+            self.index_rows = np.array([], dtype=np.int32)
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.path, self.segments[segment_id]["file"])
+
+    def append(self, fragments):
+        """Append prepared fragments (see ``prepare_fragments``); returns the number of rows written."""
+        missing = [c for c in FRAGMENT_COLUMNS if c not in fragments.columns]
+        if missing:
+            raise ValueError(f"Fragments are missing columns {missing}; run prepare_fragments first.")
+        if fragments.empty:
+            return 0
+
+        fragments = fragments.reset_index(drop=True)
+        # Keys must be stored exactly as lookup_many normalizes them, or the index never matches
+        fragments[IDENTITY_COLUMN] = normalize_identity_keys(fragments[IDENTITY_COLUMN])
+        hashes = hash_identities(fragments[IDENTITY_COLUMN].to_numpy(dtype=object))
+        bucket_of = (hashes % np.uint64(self.buckets)).astype(np.int64)
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            new_hashes, new_segments, new_rows = [], [], []
+            partitions = fragments.groupby([fragments[DATASET_COLUMN].astype(str), bucket_of], sort=True).indices
+            for (dataset, bucket), rows in partitions.items():
+                segment_id = len(self.segments)
+                directory = os.path.join(self.path, dataset.replace(os.sep, "_"), f"bucket={bucket:02d}")
+                os.makedirs(directory, exist_ok=True)
+                file = _write_segment(fragments.iloc[rows], os.path.join(directory, f"seg-{segment_id:06d}"))
+                self.segments.append({
+                    "dataset": dataset, "bucket": int(bucket), "rows": len(rows),
+                    "file": os.path.relpath(file, self.path),
+                })
+                new_hashes.append(hashes[rows])
+                new_segments.append(np.full(len(rows), segment_id, dtype=np.int32))
+                new_rows.append(np.arange(len(rows), dtype=np.int32))
+
+            all_hashes = np.concatenate([np.asarray(self.index_hashes)] + new_hashes)
+            order = np.argsort(all_hashes, kind="stable")
+            _save_array(os.path.join(self.path, INDEX_HASHES_FILE), all_hashes[order])
+            _save_array(os.path.join(self.path, INDEX_SEGMENTS_FILE), np.concatenate([np.asarray(self.index_segments)] + new_segments)[order])
+            _save_array(os.path.join(self.path, INDEX_ROWS_FILE), np.concatenate([np.asarray(self.index_rows)] + new_rows)[order])
+
+            tmp = os.path.join(self.path, f"{MANIFEST_FILE}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(tmp, os.path.join(self.path, MANIFEST_FILE))
+            self._load_index()
+
+        logging.info(f"Appended {len(fragments)} fragments to {self.path} in {len(partitions)} segments")
+        return len(fragments)
+
+    def append_snapshot(self, path, **options):
+        """Load an exported snapshot, normalize it with ``prepare_fragments`` and append it."""
+        return self.append(load_fragments(path, **options))
+
+    def lookup(self, namespace, value=None):
+        """All stored fragments for one identity, found through the secondary index."""
+        identity = identity_key(namespace, value) if value is not None else namespace
+        return self.lookup_many([identity])
+
+    def lookup_many(self, identities):
+        """Fragments for many "NS:value" identity keys; only the segments holding them are read."""
+        identities = normalize_identity_keys(pd.Series(list(identities), dtype=object))
+        hashes = np.unique(hash_identities(identities))
+        lo = np.searchsorted(self.index_hashes, hashes, side="left")
+        hi = np.searchsorted(self.index_hashes, hashes, side="right")
+        if not (hi > lo).any():
+            return pd.DataFrame(columns=list(FRAGMENT_COLUMNS))
+
+        positions = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi) if b > a])
+        segments = np.asarray(self.index_segments)[positions]
+        rows = np.asarray(self.index_rows)[positions]
+        wanted = set(identities)
+        parts = []
+        for segment_id in np.unique(segments):
+            frame = _read_segment(self._segment_path(int(segment_id))).iloc[np.sort(rows[segments == segment_id])]
+            # Guard against 64-bit hash collisions
+            parts.append(frame[frame[IDENTITY_COLUMN].isin(wanted)])
+        return pd.concat(parts, ignore_index=True)
+
+    def scan(self, dataset=None):
+        """Yield every segment frame, optionally for one dataset only."""
+        for segment_id, segment in enumerate(self.segments):
+            if dataset is None or segment["dataset"] == dataset:
+                yield _read_segment(self._segment_path(segment_id))
+
+    def to_frame(self, dataset=None):
+        parts = list(self.scan(dataset))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(FRAGMENT_COLUMNS))
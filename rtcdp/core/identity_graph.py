@@ -0,0 +1,294 @@
+# rtcdp/core/identity_graph.py
+
+import os
+import csv
+import logging
+import numpy as np
+import pandas as pd
+
+GRAPH_DIR = os.path.join("logs", "identity_graph")
+EDGE_CHUNK_SIZE = 1_000_000
+
+KEYS_FILE = "keys.npy"              # sorted 64-bit identity hashes; position = integer code
+PARENT_FILE = "parent.npy"          # union-find parent per code (fully compressed to roots)
+MEMBERS_FILE = "members.npy"        # codes ordered by root
+MEMBER_ROOTS_FILE = "member_roots.npy"
+OFFSETS_FILE = "offsets.npy"        # byte offsets into identities.bin per code
+IDENTITIES_FILE = "identities.bin"
+
+
+def identity_key(namespace, value):
+    return f"{str(namespace).strip().upper()}:{str(value).strip()}"
+
+
+def hash_identities(identities):
+    """Vectorized 64-bit hash of identity strings (pandas' siphash)."""
+    return pd.util.hash_array(np.asarray(identities, dtype=object), categorize=False)
+
+
+def _find_roots(parent, nodes):
+    roots = parent[nodes]
+    while True:
+        next_roots = parent[roots]
+        if np.array_equal(next_roots, roots):
+            return roots
+        roots = next_roots
+
+
+def union_edges(parent, left, right):
+    """
+    Union a batch of edges into ``parent`` (a numpy or memory-mapped array).
+
+    Roots always hook onto the smaller code, so the forest never cycles and
+    each pass resolves at least one conflicting root per edge batch.
+    """
+    while len(left):
+        left_roots = _find_roots(parent, left)
+        right_roots = _find_roots(parent, right)
+        pending = left_roots != right_roots
+        if not pending.any():
+            return
+        left, right = left[pending], right[pending]
+        high = np.maximum(left_roots[pending], right_roots[pending])
+        low = np.minimum(left_roots[pending], right_roots[pending])
+        np.minimum.at(parent, high, low)
+
+
+def compress(parent):
+    """Full path compression: point every node directly at its root."""
+    while True:
+        grandparents = parent[parent]
+        if np.array_equal(grandparents, parent):
+            return parent
+        parent[:] = grandparents
+
+
+def _read_edge_chunks(source, chunk_size):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start:start + chunk_size]
+    elif isinstance(source, str) and source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif isinstance(source, str):
+        yield from pd.read_csv(source, dtype=str, chunksize=chunk_size)
+    else:
+        yield from source
+
+
+def _join_keys(namespaces, values):
+    """Vectorized ``identity_key`` over two Series."""
+    keys = namespaces.astype(str).str.strip().str.upper() + ":" + values.astype(str).str.strip()
+    return keys.to_numpy(dtype=object)
+
+
+def normalize_identity_keys(joined):
+    """Vectorized ``identity_key`` over pre-joined "NS:value" strings; values without a namespace are kept."""
+    joined = joined.astype(str).str.strip()
+    parts = joined.str.split(":", n=1, expand=True)
+    if parts.shape[1] < 2:
+        return joined.to_numpy(dtype=object)
+    keys = parts[0].str.strip().str.upper() + ":" + parts[1].str.strip()
+    return keys.where(parts[1].notna(), joined).to_numpy(dtype=object)
+
+
+def _edge_identities(chunk):
+    """Accept (namespace_a, id_a, namespace_b, id_b) or two pre-joined "NS:value" columns."""
+    chunk = chunk.dropna()
+    if chunk.shape[1] >= 4:
+        cols = chunk.columns
+        return _join_keys(chunk[cols[0]], chunk[cols[1]]), _join_keys(chunk[cols[2]], chunk[cols[3]])
+    if chunk.shape[1] == 2:
+        return normalize_identity_keys(chunk.iloc[:, 0]), normalize_identity_keys(chunk.iloc[:, 1])
+    raise ValueError("Identity links need 2 (NS:value) or 4 (namespace, id, namespace, id) columns.")
+
+
+def _map_spool(path, count):
+    if not count:
+        return np.empty(0, dtype=np.uint64)
+    return np.memmap(path, dtype=np.uint64, mode="r", shape=(count,))
+
+
+def _unique_keys(left_hashes, right_hashes, chunk_size):
+    """Sorted distinct hashes of both spools, deduplicated chunk by chunk."""
+    keys = np.empty(0, dtype=np.uint64)
+    pending, pending_size = [], 0
+    for start in range(0, len(left_hashes), chunk_size):
+        chunk = np.unique(np.concatenate([left_hashes[start:start + chunk_size], right_hashes[start:start + chunk_size]]))
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size > 4 * chunk_size:
+            keys = np.unique(np.concatenate([keys] + pending))
+            pending, pending_size = [], 0
+    return np.unique(np.concatenate([keys] + pending))
+
+
+class IdentityGraph:
+    """
+    Connected components of exported identity links, stored as memory-mapped arrays.
+
+    Identities are integer-encoded by the rank of their 64-bit hash, so lookups
+    are a binary search plus array indexing and never load the whole graph.
+    """
+
+    def __init__(self, path=GRAPH_DIR):
+        self.path = path
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.keys = load(KEYS_FILE)
+        self.parent = load(PARENT_FILE)
+        self.members = load(MEMBERS_FILE)
+        self.member_roots = load(MEMBER_ROOTS_FILE)
+        self.offsets = load(OFFSETS_FILE)
+        blob_path = os.path.join(path, IDENTITIES_FILE)
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.array([], np.uint8)
+
+    @classmethod
+    def build(cls, source, path=GRAPH_DIR, chunk_size=EDGE_CHUNK_SIZE):
+        """Ingest identity links from a CSV/Parquet path, DataFrame or iterable of DataFrames."""
+        os.makedirs(path, exist_ok=True)
+        left_spool = os.path.join(path, "_left.u64")
+        right_spool = os.path.join(path, "_right.u64")
+        label_spool = os.path.join(path, "_labels.csv")
+
+        # Pass 1: hash every endpoint to disk and keep one label per hash per chunk
+        edges = 0
+        with open(left_spool, "wb") as lf, open(right_spool, "wb") as rf, open(label_spool, "w", newline="") as labels:
+            label_writer = csv.writer(labels)
+            for chunk in _read_edge_chunks(source, chunk_size):
+                left, right = _edge_identities(chunk)
+                left_hashes, right_hashes = hash_identities(left), hash_identities(right)
+                left_hashes.tofile(lf)
+                right_hashes.tofile(rf)
+                hashes, first = np.unique(np.concatenate([left_hashes, right_hashes]), return_index=True)
+                names = np.concatenate([left, right])[first]
+                label_writer.writerows(zip(hashes.tolist(), names.tolist()))
+                edges += len(left)
+
+        # The spools hold 16 bytes per link; map them instead of reading hundreds of millions of links into memory
+        left_hashes = _map_spool(left_spool, edges)
+        right_hashes = _map_spool(right_spool, edges)
+        keys = _unique_keys(left_hashes, right_hashes, chunk_size)
+        np.save(os.path.join(path, KEYS_FILE), keys)
+        n = len(keys)
+
+        # Pass 2: union-find over integer codes, backed by a memory-mapped parent array
+        parent = np.lib.format.open_memmap(os.path.join(path, PARENT_FILE), mode="w+", dtype=np.int64, shape=(n,))
+        parent[:] = np.arange(n, dtype=np.int64)
+        for start in range(0, edges, chunk_size):
+            u = np.searchsorted(keys, left_hashes[start:start + chunk_size])
+            v = np.searchsorted(keys, right_hashes[start:start + chunk_size])
+            union_edges(parent, u, v)
+        del left_hashes, right_hashes
+        compress(parent)
+
+        order = np.argsort(parent, kind="stable")
+        np.save(os.path.join(path, MEMBERS_FILE), order)
+        np.save(os.path.join(path, MEMBER_ROOTS_FILE), np.asarray(parent)[order])
+        parent.flush()
+        del parent
+
+        cls._write_labels(path, keys, label_spool)
+        for spool in (left_spool, right_spool, label_spool):
+            os.remove(spool)
+
+        logging.info(f"Built identity graph at {path}: {n} identities, {edges} links")
+        return cls(path)
+
+    @staticmethod
+    def _write_labels(path, keys, label_spool):
+        lengths = np.zeros(len(keys), dtype=np.int64)
+        seen = np.zeros(len(keys), dtype=bool)
+        for chunk in pd.read_csv(label_spool, header=None, names=["hash", "identity"], dtype=str,
+                                 keep_default_na=False, chunksize=EDGE_CHUNK_SIZE):
+            codes = np.searchsorted(keys, chunk["hash"].astype(np.uint64).to_numpy())
+            lengths[codes] = chunk["identity"].str.encode("utf-8").str.len().to_numpy()
+
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        np.save(os.path.join(path, OFFSETS_FILE), offsets)
+
+        blob_path = os.path.join(path, IDENTITIES_FILE)
+        with open(blob_path, "wb") as f:
+            f.truncate(int(offsets[-1]))
+        if not offsets[-1]:
+            return
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r+")
+        for chunk in pd.read_csv(label_spool, header=None, names=["hash", "identity"], dtype=str,
+                                 keep_default_na=False, chunksize=EDGE_CHUNK_SIZE):
+            codes = np.searchsorted(keys, chunk["hash"].astype(np.uint64).to_numpy())
+            codes, first = np.unique(codes, return_index=True)
+            fresh = ~seen[codes]
+            codes, first = codes[fresh], first[fresh]
+            if not len(codes):
+                continue
+            identities = chunk["identity"].to_numpy(dtype=object)[first]
+            encoded = [identity.encode("utf-8") for identity in identities]
+            data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            sizes = lengths[codes]
+            # Scatter every label into its slot in one vectorized write
+            source_starts = np.cumsum(sizes) - sizes
+            blob[np.repeat(offsets[codes] - source_starts, sizes) + np.arange(len(data))] = data
+            seen[codes] = True
+        blob.flush()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def code(self, namespace, value=None):
+        identity = identity_key(namespace, value) if value is not None else namespace
+        h = hash_identities([identity])[0]
+        index = int(np.searchsorted(self.keys, h))
+        if index < len(self.keys) and self.keys[index] == h:
+            return index
+        return None
+
+    def identity(self, code):
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].tobytes().decode("utf-8")
+
+    def cluster(self, namespace, value=None):
+        """Every identity stitched together with the given one (empty if unknown)."""
+        code = self.code(namespace, value)
+        if code is None:
+            return []
+        root = self.parent[code]
+        lo = np.searchsorted(self.member_roots, root, side="left")
+        hi = np.searchsorted(self.member_roots, root, side="right")
+        return [self.identity(c) for c in self.members[lo:hi]]
+
+    def resolve(self, identities):
+        """
+        Map identity keys to a stitched profile key (the root identity of each cluster).
+
+        Vectorized over the whole input; identities missing from the graph map to themselves.
+        """
+        identities = np.asarray(identities, dtype=object)
+        hashes = hash_identities(identities)
+        codes = np.minimum(np.searchsorted(self.keys, hashes), len(self.keys) - 1) if len(self.keys) else np.zeros(len(identities), dtype=np.int64)
+        known = (self.keys[codes] == hashes) if len(self.keys) else np.zeros(len(identities), dtype=bool)
+
+        resolved = identities.copy()
+        if known.any():
+            roots = np.asarray(self.parent)[codes[known]]
+            unique_roots, inverse = np.unique(roots, return_inverse=True)
+            labels = np.array([self.identity(r) for r in unique_roots], dtype=object)
+            resolved[known] = labels[inverse]
+        return resolved
+
+    def same_profile(self, first, second):
+        a, b = self.code(first), self.code(second)
+        return a is not None and b is not None and self.parent[a] == self.parent[b]
+
+    def component_sizes(self):
+        _, counts = np.unique(self.member_roots, return_counts=True)
+        return pd.Series(counts).value_counts().sort_index()
+
+    def compare_cluster(self, namespace, value, platform_identities):
+        """Diff the local cluster against identity keys returned by the platform."""
+        local = set(self.cluster(namespace, value))
+        remote = {identity_key(ns, v) for ns, v in platform_identities}
+        return {
+            "matching": sorted(local & remote),
+            "local_only": sorted(local - remote),
+            "platform_only": sorted(remote - local),
+        }
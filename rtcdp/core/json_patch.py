@@ -0,0 +1,86 @@
+# rtcdp/core/json_patch.py
+
+import copy
+
+
+def escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(source, target, path=""):
+    """
+    Minimal RFC 6902 operations that turn ``source`` into ``target``.
+
+    Objects are diffed key by key and arrays element by element after trimming
+    the common prefix and suffix, so only the parts that actually differ are
+    sent; a value is replaced wholesale only when its type changes.
+    """
+    if source == target:
+        return []
+    if isinstance(source, dict) and isinstance(target, dict):
+        ops = [{"op": "remove", "path": f"{path}/{escape(k)}"} for k in source if k not in target]
+        for key, value in target.items():
+            child = f"{path}/{escape(key)}"
+            if key not in source:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_patch(source[key], value, child))
+        return ops
+    if isinstance(source, list) and isinstance(target, list):
+        return _diff_lists(source, target, path)
+    return [{"op": "replace", "path": path, "value": target}]
+
+
+def _diff_lists(source, target, path):
+    start = 0
+    while start < len(source) and start < len(target) and source[start] == target[start]:
+        start += 1
+    end_source, end_target = len(source), len(target)
+    while end_source > start and end_target > start and source[end_source - 1] == target[end_target - 1]:
+        end_source -= 1
+        end_target -= 1
+
+    ops = []
+    overlap = min(end_source, end_target) - start
+    for i in range(start, start + overlap):
+        ops.extend(make_patch(source[i], target[i], f"{path}/{i}"))
+    # Remove from the back so earlier indices stay valid
+    for i in range(end_source - 1, start + overlap - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{i}"})
+    for i in range(start + overlap, end_target):
+        ops.append({"op": "add", "path": f"{path}/{i}", "value": target[i]})
+    return ops
+
+
+def apply_patch(document, ops):
+    """Apply RFC 6902 add/remove/replace operations to a copy of ``document``."""
+    document = copy.deepcopy(document)
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            if op["op"] == "remove":
+                document = None
+            else:
+                document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return document
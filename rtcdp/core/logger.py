@@ -0,0 +1,172 @@
+# rtcdp/core/logger.py
+
+"""
+Process-wide logging for the kit.
+
+Modules keep calling ``logging.info(...)``/``logging.getLogger(__name__)`` and
+never configure anything at import time; entry points call
+``setup_logging(component)`` once. Records are handed to a queue on the
+calling thread and written by a background listener, so a worker pool that
+logs heavily never waits on disk. The listener writes one JSON object per
+line to ``logs/rtcdp.log``, rotates it by size and gzips rotated files.
+
+    {"ts": "2026-05-04T10:22:31.512Z", "level": "INFO", "logger": "root",
+     "component": "headless", "pid": 4242, "thread": "ThreadPoolExecutor-0_3",
+     "module": "datasets", "message": "Fetched 212 datasets"}
+
+Anything passed through ``extra=`` is added as top-level fields. Set
+``RTCDP_LOG_LEVEL`` to change the level and ``RTCDP_LOG_FORMAT=text`` for the
+old plain-text lines.
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_DIR = "logs"
+DEFAULT_LOG_FILE = "rtcdp.log"
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+MAX_LOG_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 10
+# Legacy per-module logs untouched this long are gzipped in the background
+STALE_LOG_DAYS = 7
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, component=None):
+        super().__init__()
+        self.component = component
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "component": self.component,
+            "pid": record.process,
+            "thread": record.threadName,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps extras and exceptions as separate fields instead of folding them into the message."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotating_handler(path, max_bytes=MAX_LOG_BYTES, backup_count=BACKUP_COUNT):
+    """Size-based rotating file handler whose rotated files are gzipped (``rtcdp.log.1.gz`` ...)."""
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding="utf-8", delay=True)
+    handler.namer = lambda name: f"{name}.gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def compress_stale_logs(log_dir=LOG_DIR, older_than_days=STALE_LOG_DAYS, keep=(DEFAULT_LOG_FILE,)):
+    """Gzip ``*.log`` files nobody has written to recently. Returns the paths compressed."""
+    cutoff = time.time() - older_than_days * 86400
+    compressed = []
+    for name in os.listdir(log_dir):
+        path = os.path.join(log_dir, name)
+        if not name.endswith(".log") or name in keep or not os.path.isfile(path) or os.path.getmtime(path) > cutoff:
+            continue
+        tmp = f"{path}.gz.tmp"
+        try:
+            with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, f"{path}.gz")
+            os.remove(path)
+            compressed.append(path)
+        except OSError as e:
+            logging.warning(f"Could not compress {path}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return compressed
+
+
+def setup_logging(component=None, level=None, log_dir=LOG_DIR, log_file=DEFAULT_LOG_FILE,
+                  max_bytes=MAX_LOG_BYTES, backup_count=BACKUP_COUNT):
+    """
+    Configure the root logger once per process; later calls are no-ops.
+
+    Args:
+        component (str): Entry point tag added to every record (``menu``, ``headless``, ``daemon``...).
+        level (int|str): Defaults to ``RTCDP_LOG_LEVEL`` or INFO.
+        log_dir (str): Directory for the log file, created on first use.
+        log_file (str): File name inside ``log_dir``.
+        max_bytes (int): Rotate once the file reaches this size.
+        backup_count (int): Rotated (gzipped) files to keep.
+    """
+    global _configured, _listener
+    with _lock:
+        if _configured:
+            return
+        os.makedirs(log_dir, exist_ok=True)
+        level = level or os.environ.get("RTCDP_LOG_LEVEL", "INFO")
+
+        handler = rotating_handler(os.path.join(log_dir, log_file), max_bytes, backup_count)
+        if os.environ.get("RTCDP_LOG_FORMAT") == "text":
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        else:
+            handler.setFormatter(JsonFormatter(component))
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_StructuredQueueHandler(log_queue))
+        root.setLevel(level)
+        _configured = True
+
+    threading.Thread(target=compress_stale_logs, args=(log_dir,), name="rtcdp-log-compress", daemon=True).start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener; registered with ``atexit``."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
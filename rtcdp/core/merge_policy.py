@@ -0,0 +1,111 @@
+# rtcdp/core/merge_policy.py
+
+import logging
+import numpy as np
+import pandas as pd
+from rtcdp.core.fragments import (
+    IDENTITY_COLUMN, DATASET_COLUMN, TIMESTAMP_COLUMN, attribute_columns
+)
+
+PROFILE_COLUMN = "_profile.id"
+FRAGMENT_COUNT_COLUMN = "_profile.fragments"
+MERGE_BATCHES = 16
+
+TIMESTAMP_ORDERED = "timestampOrdered"
+DATASET_PRECEDENCE = "dataSetPrecedence"
+
+
+class MergePolicy:
+    """Local view of an AEP merge policy definition (attribute merge + identity graph)."""
+
+    def __init__(self, attribute_merge=TIMESTAMP_ORDERED, dataset_order=None, identity_graph="pdg", name=None):
+        if attribute_merge not in (TIMESTAMP_ORDERED, DATASET_PRECEDENCE):
+            raise ValueError(f"Unsupported attribute merge type: {attribute_merge}")
+        if attribute_merge == DATASET_PRECEDENCE and not dataset_order:
+            raise ValueError("Dataset precedence merge policies need a dataset order.")
+        self.attribute_merge = attribute_merge
+        self.dataset_order = list(dataset_order or [])
+        self.identity_graph = identity_graph
+        self.name = name or attribute_merge
+
+    @classmethod
+    def from_definition(cls, definition):
+        """Build from the JSON returned by ``/data/core/ups/config/mergePolicies``."""
+        attribute_merge = definition.get("attributeMerge", {})
+        return cls(
+            attribute_merge=attribute_merge.get("type", TIMESTAMP_ORDERED),
+            dataset_order=attribute_merge.get("data", {}).get("order"),
+            identity_graph=definition.get("identityGraph", {}).get("type", "pdg"),
+            name=definition.get("name"),
+        )
+
+    def sort_keys(self, fragments):
+        """Columns and directions that put each profile's winning fragment first."""
+        if self.attribute_merge == DATASET_PRECEDENCE:
+            rank = {dataset_id: i for i, dataset_id in enumerate(self.dataset_order)}
+            precedence = fragments[DATASET_COLUMN].map(rank).fillna(len(rank)).astype(np.int64)
+            return {"_precedence": precedence}, ["_precedence", TIMESTAMP_COLUMN], [True, False]
+        return {}, [TIMESTAMP_COLUMN], [False]
+
+
+def assign_profiles(fragments, policy, graph=None):
+    """Group key per fragment: the stitched profile when the policy uses the identity graph."""
+    identities = fragments[IDENTITY_COLUMN].to_numpy(dtype=object)
+    if graph is not None and policy.identity_graph != "none":
+        return pd.Series(graph.resolve(identities), index=fragments.index)
+    return pd.Series(identities, index=fragments.index)
+
+
+def _merge_batch(batch, policy, columns):
+    extra, sort_columns, ascending = policy.sort_keys(batch)
+    ordered = batch.assign(**extra).sort_values(sort_columns, ascending=ascending, na_position="last", kind="stable")
+    grouped = ordered.groupby(PROFILE_COLUMN, sort=False)
+    # first() takes the first non-null value per column, i.e. the highest-priority fragment that has it
+    merged = grouped[columns].first()
+    merged[FRAGMENT_COUNT_COLUMN] = grouped.size()
+    return merged
+
+
+def merge_profiles(fragments, policy, graph=None, batches=MERGE_BATCHES):
+    """
+    Merge prepared fragments into profiles according to ``policy``.
+
+    Fragments are hash-partitioned by stitched profile into ``batches`` groups
+    and each group is merged with one vectorized sort + groupby.
+    """
+    columns = attribute_columns(fragments)
+    profiles = assign_profiles(fragments, policy, graph)
+    partition = pd.util.hash_array(profiles.to_numpy(dtype=object), categorize=True) % np.uint64(max(batches, 1))
+    fragments = fragments.assign(**{PROFILE_COLUMN: profiles.to_numpy()})
+
+    merged = [
+        _merge_batch(fragments[partition == b], policy, columns)
+        for b in range(max(batches, 1))
+        if (partition == b).any()
+    ]
+    result = pd.concat(merged) if merged else pd.DataFrame(columns=columns + [FRAGMENT_COUNT_COLUMN])
+    logging.info(f"Merged {len(fragments)} fragments into {len(result)} profiles using {policy.name}")
+    return result.sort_index()
+
+
+def compare_policies(fragments, current, proposed, graph=None):
+    """
+    Show what changes if ``proposed`` replaces ``current``.
+
+    Returns per-attribute counts of profiles whose merged value changes and the
+    IDs of affected profiles.
+    """
+    before = merge_profiles(fragments, current, graph)
+    after = merge_profiles(fragments, proposed, graph)
+    before, after = before.align(after, join="outer")
+    columns = [c for c in before.columns if c != FRAGMENT_COUNT_COLUMN]
+
+    # Compare as strings so NaN == NaN and mixed dtypes don't raise
+    changed = before[columns].astype("string").fillna("<NA>") != after[columns].astype("string").fillna("<NA>")
+    per_attribute = changed.sum().astype(int).sort_values(ascending=False)
+    return {
+        "profiles_before": int(before[FRAGMENT_COUNT_COLUMN].notna().sum()),
+        "profiles_after": int(after[FRAGMENT_COUNT_COLUMN].notna().sum()),
+        "changed_profiles": changed.any(axis=1)[lambda s: s].index.tolist(),
+        "changed_attributes": per_attribute[per_attribute > 0],
+    }
@@ -0,0 +1,449 @@
+# rtcdp/core/pql.py
+
+import re
+import time
+import logging
+from functools import lru_cache
+import pandas as pd
+from rtcdp.core.snapshot import load_profile_snapshot
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|==|=|<|>|\(|\)|\[|\]|,)
+      | (?P<name>\.?[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"and", "or", "not", "exists", "in", "true", "false", "null", "occurs", "before", "after", "now", "today"}
+COMPARATORS = {"=", "==", "!=", "<", "<=", ">", ">="}
+TIME_UNITS = {
+    "second": "s", "seconds": "s",
+    "minute": "min", "minutes": "min",
+    "hour": "h", "hours": "h",
+    "day": "D", "days": "D",
+    "week": "W", "weeks": "W",
+}
+STRING_METHODS = {"contains", "startsWith", "endsWith", "equals", "matches", "isNull", "isNotNull"}
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+class PQLError(ValueError):
+    """Raised when an expression falls outside the PQL subset the local evaluator understands."""
+
+
+# --- Tokenizer ---
+
+def tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise PQLError(f"Unexpected character at position {pos}: {expression[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "string":
+            value = bytes(value[1:-1], "utf-8").decode("unicode_escape")
+        elif kind == "name" and value.lower() in KEYWORDS:
+            kind, value = "keyword", value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+# --- Parser (recursive descent into a small tuple AST) ---
+
+class _Parser:
+    def __init__(self, expression):
+        self.tokens = tokenize(expression)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind, value=None):
+        if not self.accept(kind, value):
+            raise PQLError(f"Expected {value or kind}, found {self.peek()[1]!r}")
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] is not None:
+            raise PQLError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.accept("keyword", "or"):
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_unary()
+        while self.accept("keyword", "and"):
+            node = ("and", node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.accept("keyword", "not"):
+            return ("not", self.parse_unary())
+        if self.accept("op", "("):
+            node = self.parse_or()
+            self.expect("op", ")")
+            return node
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        left = self.parse_value()
+
+        if self.accept("keyword", "not"):
+            self.expect("keyword", "exists")
+            return ("not", ("exists", left))
+        if self.accept("keyword", "exists"):
+            return ("exists", left)
+        if self.accept("keyword", "in"):
+            return ("in", left, self.parse_list())
+        if self.accept("keyword", "occurs"):
+            return self.parse_occurs(left)
+
+        kind, value = self.peek()
+        if kind == "op" and value in COMPARATORS:
+            self.next()
+            return ("cmp", "=" if value == "==" else value, left, self.parse_value())
+
+        if left[0] == "method":
+            return left
+        if left[0] == "path":
+            return ("cmp", "=", left, ("literal", True))
+        raise PQLError(f"Expected a condition after {left[1]!r}")
+
+    def parse_occurs(self, left):
+        kind, op = self.next()
+        if kind != "op" or op not in COMPARATORS:
+            raise PQLError("Expected a comparison after 'occurs'")
+        kind, amount = self.next()
+        if kind != "number":
+            raise PQLError("Expected a number in 'occurs' clause")
+        kind, unit = self.next()
+        if unit not in TIME_UNITS:
+            raise PQLError(f"Unsupported time unit: {unit!r}")
+        direction = "before" if self.accept("keyword", "before") else None
+        if direction is None:
+            self.expect("keyword", "after")
+            direction = "after"
+        anchor = self.parse_value()
+        return ("occurs", "=" if op == "==" else op, left, amount, TIME_UNITS[unit], direction, anchor)
+
+    def parse_list(self):
+        self.expect("op", "[")
+        items = []
+        while not self.accept("op", "]"):
+            item = self.parse_value()
+            if item[0] != "literal":
+                raise PQLError("Only literal values are supported inside 'in' lists")
+            items.append(item[1])
+            if not self.accept("op", ","):
+                self.expect("op", "]")
+                break
+        return items
+
+    def parse_value(self):
+        kind, value = self.next()
+
+        if kind in ("number", "string"):
+            return ("literal", value)
+        if kind == "keyword":
+            if value in ("true", "false"):
+                return ("literal", value == "true")
+            if value == "null":
+                return ("literal", None)
+            if value in ("now", "today"):
+                if self.accept("op", "("):
+                    self.expect("op", ")")
+                return ("time", value)
+        if kind == "name" and not value.startswith("."):
+            return self.parse_path(value)
+        raise PQLError(f"Unexpected token {value!r}")
+
+    def parse_path(self, path):
+        # identityMap["ECID"].id  ->  identityMap.ECID.id
+        while self.peek() == ("op", "["):
+            self.next()
+            kind, key = self.next()
+            if kind != "string":
+                raise PQLError("Map keys must be quoted strings")
+            self.expect("op", "]")
+            path = f"{path}.{key}"
+            kind, suffix = self.peek()
+            if kind == "name" and suffix.startswith("."):
+                self.next()
+                path += suffix
+
+        if self.peek() == ("op", "(") and "." in path:
+            target, method = path.rsplit(".", 1)
+            if method not in STRING_METHODS:
+                raise PQLError(f"Unsupported function: {method}()")
+            self.next()
+            args = []
+            while not self.accept("op", ")"):
+                arg = self.parse_value()
+                if arg[0] != "literal":
+                    raise PQLError(f"Arguments to {method}() must be literals")
+                args.append(arg[1])
+                if not self.accept("op", ","):
+                    self.expect("op", ")")
+                    break
+            return ("method", method, ("path", target), args)
+
+        return ("path", path)
+
+
+def parse_pql(expression):
+    """Parse a PQL expression into a tuple-based AST."""
+    return _Parser(expression).parse()
+
+
+# --- Compiler (AST -> vectorized predicate over a snapshot DataFrame) ---
+
+def _column(frame, path):
+    for candidate in (path, path[len("profile."):] if path.startswith("profile.") else None):
+        if candidate and candidate in frame.columns:
+            return frame[candidate]
+    return pd.Series(pd.NA, index=frame.index, dtype="object")
+
+
+def _exists(frame, path):
+    if path.startswith("profile.") and path not in frame.columns:
+        path = path[len("profile."):]
+    prefix = f"{path}."
+    columns = [c for c in frame.columns if c == path or c.startswith(prefix)]
+    if not columns:
+        return pd.Series(False, index=frame.index)
+    return frame[columns].notna().any(axis=1)
+
+
+def _time_anchor(name):
+    now = pd.Timestamp.now(tz="UTC")
+    return now.normalize() if name == "today" else now
+
+
+def _as_timestamp(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _coerce(series, value):
+    if isinstance(value, bool):
+        if series.dtype == bool:
+            return series
+        return series.map(lambda v: str(v).lower() == "true" if pd.notna(v) else pd.NA)
+    if isinstance(value, (int, float)):
+        return pd.to_numeric(series, errors="coerce")
+    if isinstance(value, pd.Timestamp):
+        return pd.to_datetime(series, errors="coerce", utc=True)
+    return series.astype("string")
+
+
+def _resolve_literal(node):
+    if node[0] == "time":
+        return _time_anchor(node[1])
+    value = node[1]
+    if isinstance(value, str) and ISO_DATE_RE.match(value):
+        try:
+            return _as_timestamp(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _known(result, *operands):
+    """
+    ``result`` as a nullable boolean that is NA wherever an operand is null.
+
+    Comparisons against a missing value are unknown rather than False, so
+    ``not`` leaves them unknown too and ``run`` drops them whatever the
+    column's dtype, as the platform does.
+    """
+    known = pd.Series(True, index=result.index)
+    for operand in operands:
+        if isinstance(operand, pd.Series):
+            known &= operand.notna()
+    return result.astype("boolean").where(known)
+
+
+def _compare(series, op, value):
+    if value is None:
+        return series.isna() if op == "=" else series.notna()
+    left = _coerce(series, value)
+    if op == "=":
+        result = left == value
+    elif op == "!=":
+        result = left != value
+    elif op == "<":
+        result = left < value
+    elif op == "<=":
+        result = left <= value
+    elif op == ">":
+        result = left > value
+    elif op == ">=":
+        result = left >= value
+    else:
+        raise PQLError(f"Unsupported comparison: {op}")
+    return _known(result, left, value)
+
+
+def _method(series, method, args):
+    if method == "isNull":
+        return series.isna()
+    if method == "isNotNull":
+        return series.notna()
+    if not args:
+        raise PQLError(f"{method}() requires an argument")
+
+    text = series.astype("string")
+    needle = str(args[0])
+    case_sensitive = args[1] if len(args) > 1 and isinstance(args[1], bool) else True
+    if not case_sensitive:
+        text, needle = text.str.lower(), needle.lower()
+
+    if method == "contains":
+        return text.str.contains(needle, regex=False)
+    if method == "startsWith":
+        return text.str.startswith(needle)
+    if method == "endsWith":
+        return text.str.endswith(needle)
+    if method == "equals":
+        return text == needle
+    if method == "matches":
+        try:
+            return text.str.match(needle)
+        except ValueError as e:  # pyarrow's regex engine rejects a few patterns Python's accepts
+            raise PQLError(f"Invalid pattern for matches(): {e}") from e
+    raise PQLError(f"Unsupported function: {method}()")
+
+
+def _occurs(series, op, amount, unit, direction, anchor):
+    timestamps = pd.to_datetime(series, errors="coerce", utc=True)
+    reference = _time_anchor(anchor[1]) if anchor[0] == "time" else _as_timestamp(anchor[1])
+    offset = (reference - timestamps) if direction == "before" else (timestamps - reference)
+    elapsed = offset / pd.Timedelta(1, unit=unit)
+    in_direction = elapsed >= 0
+
+    if op == "=":
+        return _known(in_direction & (elapsed.floordiv(1) == amount), timestamps)
+    return _known(in_direction & _compare(elapsed, op, float(amount)), timestamps)
+
+
+def _compile(node):
+    kind = node[0]
+
+    if kind == "and":
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda df: left(df) & right(df)
+    if kind == "or":
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda df: left(df) | right(df)
+    if kind == "not":
+        inner = _compile(node[1])
+        return lambda df: ~inner(df)
+    if kind == "exists":
+        if node[1][0] != "path":
+            raise PQLError("'exists' can only be applied to a field path")
+        path = node[1][1]
+        return lambda df: _exists(df, path)
+    if kind == "in":
+        path, values = node[1], node[2]
+        if path[0] != "path":
+            raise PQLError("'in' can only be applied to a field path")
+        sample = values[0] if values else ""
+
+        def contained(df):
+            column = _coerce(_column(df, path[1]), sample)
+            return _known(column.isin(values), column)
+        return contained
+    if kind == "method":
+        _, method, path, args = node
+        if method == "matches" and args:
+            try:
+                re.compile(str(args[0]))
+            except re.error as e:
+                raise PQLError(f"Invalid pattern for matches(): {e}") from e
+        return lambda df: _method(_column(df, path[1]), method, args)
+    if kind == "occurs":
+        _, op, path, amount, unit, direction, anchor = node
+        if path[0] != "path":
+            raise PQLError("'occurs' can only be applied to a field path")
+        return lambda df: _occurs(_column(df, path[1]), op, amount, unit, direction, anchor)
+    if kind == "cmp":
+        _, op, left, right = node
+        if left[0] != "path" and right[0] == "path":
+            flipped = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(op, op)
+            left, right, op = right, left, flipped
+        if left[0] != "path":
+            raise PQLError("Comparisons need a field path on one side")
+        if right[0] == "path":
+            return lambda df: _compare(_column(df, left[1]), op, _column(df, right[1]))
+        return lambda df: _compare(_column(df, left[1]), op, _resolve_literal(right))
+
+    raise PQLError(f"Unsupported expression node: {kind}")
+
+
+@lru_cache(maxsize=256)
+def compile_pql(expression):
+    """
+    Compile a PQL expression into a predicate ``fn(frame) -> boolean Series``.
+
+    Supports comparisons, ``exists``, ``in [...]``, ``and``/``or``/``not``,
+    string functions (contains, startsWith, endsWith, equals, matches, isNull,
+    isNotNull) and ``occurs <op> N <unit> before|after now|today``.
+    """
+    predicate = _compile(parse_pql(expression))
+
+    def run(frame):
+        mask = predicate(frame)
+        if not isinstance(mask, pd.Series):
+            mask = pd.Series(bool(mask), index=frame.index)
+        return mask.fillna(False).astype(bool)
+
+    return run
+
+
+def preview_audience(pql_expr, snapshot, sample_size=10):
+    """
+    Evaluate a PQL expression against a local profile snapshot.
+
+    ``snapshot`` is a DataFrame or a path accepted by ``load_profile_snapshot``.
+    Returns the matched count, total, ratio, a sample of members and timing.
+    """
+    frame = snapshot if isinstance(snapshot, pd.DataFrame) else load_profile_snapshot(snapshot)
+
+    started = time.perf_counter()
+    mask = compile_pql(pql_expr)(frame)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    matched = int(mask.sum())
+    total = len(frame)
+    logging.info(f"PQL preview matched {matched}/{total} profiles in {elapsed_ms:.1f} ms: {pql_expr}")
+    return {
+        "matched": matched,
+        "total": total,
+        "ratio": matched / total if total else 0.0,
+        "sample": frame[mask].head(sample_size),
+        "elapsed_ms": elapsed_ms,
+    }
@@ -0,0 +1,280 @@
+# rtcdp/core/schema_registry.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+REGISTRY_DIR = os.path.join("logs", "schema_registry")
+RESOURCE_TYPES = ("behaviors", "classes", "fieldgroups", "datatypes", "schemas")
+INDEX_FILE = "index.json"
+DESCRIPTORS_FILE = "descriptors.json"
+
+# Resource metadata that shouldn't leak into the schema that references it
+STRUCTURAL_META = ("meta:xdmType", "meta:xdmField", "meta:enum", "meta:titleId", "meta:descriptionId")
+RESOURCE_KEYS = ("$id", "$schema", "title", "description", "definitions", "version", "imsOrg")
+
+
+def _file_key(resource_id):
+    return hashlib.sha1(resource_id.encode("utf-8")).hexdigest()[:20]
+
+
+def resource_version(resource):
+    """Registry version of a resource, or a content hash when it has none."""
+    version = resource.get("version") or resource.get("meta:registryMetadata", {}).get("eTag")
+    if version:
+        return str(version)
+    return hashlib.sha1(json.dumps(resource, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def _structural(resolved):
+    return {
+        key: value for key, value in resolved.items()
+        if key not in RESOURCE_KEYS and (not key.startswith("meta:") or key in STRUCTURAL_META)
+    }
+
+
+def _deep_merge(base, extra):
+    """Merge ``extra`` into a copy of ``base``; nested objects merge, other values are replaced."""
+    merged = dict(base)
+    for key, value in extra.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        elif key == "required" and isinstance(value, list) and isinstance(merged.get(key), list):
+            merged[key] = list(dict.fromkeys(merged[key] + value))
+        else:
+            merged[key] = value
+    return merged
+
+
+def _pointer(doc, pointer):
+    node = doc
+    for part in pointer.lstrip("#/").split("/"):
+        if not part:
+            continue
+        node = node[part.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+class SchemaRegistryMirror:
+    """
+    Versioned local copy of schema registry resources with a memoized resolver.
+
+    Raw resources are stored per version under ``<root>/<container>/<type>/``.
+    ``$ref``/``allOf`` are resolved through a dependency DAG: every resource is
+    resolved at most once and the result is shared by all schemas that use it.
+    Storing a new version of a resource invalidates it and everything that
+    depends on it, in memory and on disk.
+    """
+
+    def __init__(self, path=REGISTRY_DIR):
+        self.path = path
+        self._lock = threading.RLock()
+        self._raw = {}
+        self._resolved = {}
+        self._closure = {}
+        self._dependents = {}
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"resources": {}, "altIds": {}}
+
+    def __contains__(self, resource_id):
+        return self.canonical_id(resource_id) in self.index["resources"]
+
+    def __len__(self):
+        return len(self.index["resources"])
+
+    def canonical_id(self, resource_id):
+        return self.index["altIds"].get(resource_id, resource_id)
+
+    def version(self, resource_id):
+        entry = self.index["resources"].get(self.canonical_id(resource_id))
+        return entry["version"] if entry else None
+
+    def resources(self, resource_type=None, container=None):
+        return {
+            rid: entry for rid, entry in self.index["resources"].items()
+            if (resource_type is None or entry["type"] == resource_type)
+            and (container is None or entry["container"] == container)
+        }
+
+    def fingerprint(self):
+        """Digest of every mirrored resource version and the descriptor list; changes whenever the mirror does."""
+        digest = hashlib.sha1()
+        for resource_id, entry in sorted(self.index["resources"].items()):
+            digest.update(f"{resource_id}@{entry['version']}\n".encode("utf-8"))
+        descriptors = os.path.join(self.path, DESCRIPTORS_FILE)
+        if os.path.exists(descriptors):
+            with open(descriptors, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    def save_index(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, f"{INDEX_FILE}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+
+    def put(self, resource, container, resource_type):
+        """Store one raw resource. Returns False if that version is already mirrored."""
+        resource_id = resource["$id"]
+        version = resource_version(resource)
+        with self._lock:
+            entry = self.index["resources"].get(resource_id)
+            if entry and entry["version"] == version:
+                return False
+
+            directory = os.path.join(self.path, container, resource_type)
+            os.makedirs(directory, exist_ok=True)
+            file = os.path.join(container, resource_type, f"{_file_key(resource_id)}@{version}.json")
+            with open(os.path.join(self.path, file), "w") as f:
+                json.dump(resource, f)
+
+            self.index["resources"][resource_id] = {
+                "container": container, "type": resource_type, "version": version,
+                "title": resource.get("title"), "file": file,
+            }
+            if resource.get("meta:altId"):
+                self.index["altIds"][resource["meta:altId"]] = resource_id
+            self._raw[resource_id] = resource
+            self.invalidate(resource_id)
+        return True
+
+    def put_descriptors(self, descriptors):
+        """Replace the mirrored descriptor list (identity, relationship, ... descriptors)."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, DESCRIPTORS_FILE), "w") as f:
+            json.dump(list(descriptors), f)
+
+    def descriptors(self):
+        path = os.path.join(self.path, DESCRIPTORS_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def raw(self, resource_id):
+        resource_id = self.canonical_id(resource_id)
+        if resource_id not in self._raw:
+            entry = self.index["resources"].get(resource_id)
+            if entry is None:
+                return None
+            with open(os.path.join(self.path, entry["file"]), "r") as f:
+                self._raw[resource_id] = json.load(f)
+        return self._raw[resource_id]
+
+    def invalidate(self, resource_id):
+        """Drop cached resolutions of ``resource_id`` and of every resource that depends on it."""
+        with self._lock:
+            pending = [resource_id]
+            while pending:
+                current = pending.pop()
+                self._resolved.pop(current, None)
+                self._closure.pop(current, None)
+                cached = self._resolved_path(current)
+                if os.path.exists(cached):
+                    os.remove(cached)
+                pending.extend(self._dependents.pop(current, ()))
+
+    def discard(self, resource_id):
+        """Forget a resource (e.g. after it was changed remotely) until the next sync."""
+        with self._lock:
+            resource_id = self.canonical_id(resource_id)
+            self.invalidate(resource_id)
+            self._raw.pop(resource_id, None)
+            if self.index["resources"].pop(resource_id, None) is not None:
+                self.index["altIds"] = {alt: rid for alt, rid in self.index["altIds"].items() if rid != resource_id}
+                self.save_index()
+
+    def _resolved_path(self, resource_id):
+        return os.path.join(self.path, "resolved", f"{_file_key(resource_id)}.json")
+
+    def resolve(self, resource_id):
+        """
+        Fully resolved resource (all ``$ref`` and ``allOf`` inlined).
+
+        The result is shared with the memo and other resolved schemas; treat it as read-only.
+        """
+        resource_id = self.canonical_id(resource_id)
+        with self._lock:
+            if resource_id in self._resolved:
+                return self._resolved[resource_id]
+            cached = self._load_resolved(resource_id)
+            if cached is not None:
+                return cached
+            resolved = self._resolve_resource(resource_id, ())
+            self._store_resolved(resource_id, resolved)
+            return resolved
+
+    def _load_resolved(self, resource_id):
+        path = self._resolved_path(resource_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            cached = json.load(f)
+        # Still valid only if every resource it was built from is at the same version
+        if any(self.version(rid) != version for rid, version in cached["versions"].items()):
+            return None
+        self._resolved[resource_id] = cached["resolved"]
+        self._closure[resource_id] = set(cached["versions"])
+        for dependency in cached["versions"]:
+            if dependency != resource_id:
+                self._dependents.setdefault(dependency, set()).add(resource_id)
+        return cached["resolved"]
+
+    def _store_resolved(self, resource_id, resolved):
+        path = self._resolved_path(resource_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        versions = {rid: self.version(rid) for rid in self._closure.get(resource_id, {resource_id})}
+        with open(path, "w") as f:
+            json.dump({"versions": versions, "resolved": resolved}, f)
+
+    def _resolve_resource(self, resource_id, stack):
+        if resource_id in self._resolved:
+            return self._resolved[resource_id]
+        if resource_id in stack:
+            raise ValueError(f"Circular $ref: {' → '.join(stack + (resource_id,))}")
+
+        doc = self.raw(resource_id)
+        closure = {resource_id}
+        resolved = self._resolve_node(doc, doc, stack + (resource_id,), closure)
+        self._resolved[resource_id] = resolved
+        self._closure[resource_id] = closure
+        for dependency in closure - {resource_id}:
+            self._dependents.setdefault(dependency, set()).add(resource_id)
+        return resolved
+
+    def _resolve_ref(self, ref, doc, stack, closure):
+        if ref.startswith("#"):
+            return self._resolve_node(_pointer(doc, ref), doc, stack, closure)
+        target = self.canonical_id(ref)
+        if target not in self.index["resources"]:
+            logging.warning(f"Unresolved $ref {ref} (not mirrored)")
+            return {"$ref": ref}
+        resolved = self._resolve_resource(target, stack)
+        closure.update(self._closure.get(target, {target}))
+        return _structural(resolved)
+
+    def _resolve_node(self, node, doc, stack, closure):
+        if isinstance(node, list):
+            return [self._resolve_node(item, doc, stack, closure) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        result = {}
+        if isinstance(node.get("$ref"), str):
+            result = _deep_merge(result, self._resolve_ref(node["$ref"], doc, stack, closure))
+        for part in node.get("allOf", []):
+            result = _deep_merge(result, self._resolve_node(part, doc, stack, closure))
+        # The node's own keys win over whatever it references
+        own = {
+            key: self._resolve_node(value, doc, stack, closure)
+            for key, value in node.items()
+            if key not in ("$ref", "allOf", "definitions")
+        }
+        return _deep_merge(result, own)
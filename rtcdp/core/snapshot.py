@@ -0,0 +1,73 @@
+# rtcdp/core/snapshot.py
+
+import os
+import json
+import logging
+import pandas as pd
+
+SNAPSHOT_DIR = os.path.join("logs", "snapshots")
+SNAPSHOT_EXTENSIONS = (".json", ".jsonl", ".ndjson", ".csv", ".parquet")
+
+_snapshot_cache = {}
+
+
+def read_json_records(path):
+    """Profile records of a JSON/NDJSON export, unwrapping API-style envelopes."""
+    with open(path, "r") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+
+    # Exports come back either as a bare array or wrapped like the API responses
+    if isinstance(data, dict):
+        for key in ("children", "rows", "records", "profiles"):
+            if isinstance(data.get(key), list):
+                return data[key]
+        return [data]
+    return data
+
+
+def _read_snapshot_file(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.json_normalize(read_json_records(path), sep=".")
+
+
+def snapshot_files(path):
+    """The export files of a snapshot: the path itself, or the files of a multi-part directory."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith(SNAPSHOT_EXTENSIONS)
+        )
+    return [path]
+
+
+def load_profile_snapshot(path):
+    """
+    Load a locally stored profile snapshot export into a flat DataFrame.
+
+    Nested XDM fields become dotted columns (e.g. ``person.name.firstName``).
+    A directory is treated as a multi-part export and its files are concatenated.
+    Frames are cached per path and reloaded only when a file changes.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Snapshot not found: {path}")
+
+    files = snapshot_files(path)
+    if not files:
+        raise FileNotFoundError(f"No snapshot files found in: {path}")
+
+    signature = tuple((f, os.path.getmtime(f)) for f in files)
+    cached = _snapshot_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    frames = [_read_snapshot_file(f) for f in files]
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    _snapshot_cache[path] = (signature, frame)
+    logging.info(f"Loaded profile snapshot {path}: {len(frame)} rows, {len(frame.columns)} columns")
+    return frame
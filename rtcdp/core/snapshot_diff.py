@@ -0,0 +1,197 @@
+# rtcdp/core/snapshot_diff.py
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from rtcdp.core.snapshot import snapshot_files, read_json_records
+
+DIFF_DIR = os.path.join("logs", "snapshot_diffs")
+DIFF_PARTITIONS = 64
+DIFF_CHUNK_SIZE = 250_000
+MISSING = "\x00<missing>"
+
+
+def _flatten(record, prefix="", out=None):
+    """Dotted fields of one record with each leaf as its canonical JSON text (strings as-is)."""
+    out = {} if out is None else out
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            _flatten(value, f"{name}.", out)
+        elif value is not None:
+            out[name] = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    return out
+
+
+def _records_frame(records):
+    # Values are text from the raw records, so a field missing in one row can't turn
+    # another row's 30 into 30.0 the way json_normalize's column dtypes would
+    return pd.DataFrame.from_records([_flatten(record) for record in records])
+
+
+def _iter_snapshot_chunks(path, chunk_size=DIFF_CHUNK_SIZE):
+    """Stream a snapshot export (file or multi-part directory) as flat DataFrame chunks."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Snapshot not found: {path}")
+    for file in snapshot_files(path):
+        if file.endswith(".csv"):
+            yield from pd.read_csv(file, dtype=str, chunksize=chunk_size)
+        elif file.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size):
+                # Nullable ints stay ints instead of becoming floats in chunks with gaps
+                yield batch.to_pandas(integer_object_nulls=True)
+        elif file.endswith((".jsonl", ".ndjson")):
+            records = []
+            with open(file, "r") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(json.loads(line))
+                    if len(records) >= chunk_size:
+                        yield _records_frame(records)
+                        records = []
+            if records:
+                yield _records_frame(records)
+        else:
+            records = read_json_records(file)
+            for start in range(0, len(records), chunk_size):
+                yield _records_frame(records[start:start + chunk_size])
+
+
+def partition_snapshot(path, work_dir, id_column="_id", partitions=DIFF_PARTITIONS, chunk_size=DIFF_CHUNK_SIZE):
+    """
+    Spool a snapshot to ``work_dir/part-NNNN/`` by hash of profile ID.
+
+    Only one chunk is held in memory at a time; returns the number of rows spooled.
+    """
+    rows = 0
+    for n, chunk in enumerate(_iter_snapshot_chunks(path, chunk_size)):
+        if id_column not in chunk.columns:
+            raise ValueError(f"ID column '{id_column}' not found in snapshot {path}.")
+        chunk = chunk.dropna(subset=[id_column])
+        ids = chunk[id_column].astype(str).to_numpy(dtype=object)
+        buckets = pd.util.hash_array(ids, categorize=False) % np.uint64(partitions)
+        for bucket, positions in pd.Series(np.arange(len(chunk))).groupby(buckets).indices.items():
+            directory = os.path.join(work_dir, f"part-{bucket:04d}")
+            os.makedirs(directory, exist_ok=True)
+            chunk.iloc[positions].to_pickle(os.path.join(directory, f"chunk-{n:06d}.pkl"))
+        rows += len(chunk)
+    return rows
+
+
+def _load_partition(directory, id_column):
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=[id_column]).set_index(id_column)
+    parts = [pd.read_pickle(os.path.join(directory, name)) for name in sorted(os.listdir(directory))]
+    frame = pd.concat(parts, ignore_index=True)
+    frame[id_column] = frame[id_column].astype(str)
+    # Later parts win if a profile appears twice in one export
+    return frame.drop_duplicates(subset=[id_column], keep="last").set_index(id_column)
+
+
+def _as_text(frame, columns):
+    return frame.reindex(columns=columns).astype("string").fillna(MISSING)
+
+
+def _diff_partition(task):
+    """Worker: diff one partition pair and write its deltas as NDJSON."""
+    old_dir, new_dir, out_path, id_column = task
+    old = _load_partition(old_dir, id_column)
+    new = _load_partition(new_dir, id_column)
+    columns = sorted(set(old.columns) | set(new.columns))
+
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+    common = old.index.intersection(new.index)
+
+    old_text = _as_text(old.loc[common], columns)
+    new_text = _as_text(new.loc[common], columns)
+    # One content hash per row, so unchanged profiles never go through a field-by-field compare
+    changed_mask = (pd.util.hash_pandas_object(old_text, index=False).to_numpy()
+                    != pd.util.hash_pandas_object(new_text, index=False).to_numpy())
+    changed = common[changed_mask]
+
+    field_counts = Counter()
+    with open(out_path, "w") as f:
+        for profile_id in added:
+            f.write(json.dumps({"id": profile_id, "change": "added"}) + "\n")
+        for profile_id in removed:
+            f.write(json.dumps({"id": profile_id, "change": "removed"}) + "\n")
+        if len(changed):
+            before, after = old_text[changed_mask], new_text[changed_mask]
+            deltas = (before != after).to_numpy()
+            before_values, after_values = before.to_numpy(dtype=object), after.to_numpy(dtype=object)
+            for row, profile_id in enumerate(changed):
+                fields = {}
+                for col in np.flatnonzero(deltas[row]):
+                    field = columns[col]
+                    old_value, new_value = before_values[row, col], after_values[row, col]
+                    fields[field] = [None if old_value == MISSING else old_value,
+                                     None if new_value == MISSING else new_value]
+                    field_counts[field] += 1
+                f.write(json.dumps({"id": profile_id, "change": "changed", "fields": fields}) + "\n")
+
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "changed": len(changed),
+        "unchanged": len(common) - len(changed),
+        "fields": field_counts,
+    }
+
+
+def diff_snapshots(old_path, new_path, id_column="_id", output_path=None,
+                   partitions=DIFF_PARTITIONS, max_workers=None, chunk_size=DIFF_CHUNK_SIZE):
+    """
+    Compare two snapshot exports and report added, removed and changed profiles.
+
+    Both exports are spooled to disk in ``partitions`` hash buckets by profile ID,
+    then bucket pairs are diffed in parallel worker processes. Memory use is
+    bounded by one input chunk while spooling and one partition per worker while
+    diffing. Field-level deltas are written to ``output_path`` as NDJSON.
+    """
+    started = time.perf_counter()
+    os.makedirs(DIFF_DIR, exist_ok=True)
+    output_path = output_path or os.path.join(DIFF_DIR, f"diff-{time.strftime('%Y%m%dT%H%M%S')}.ndjson")
+    work_dir = tempfile.mkdtemp(prefix="snapshot_diff_", dir=DIFF_DIR)
+
+    try:
+        old_rows = partition_snapshot(old_path, os.path.join(work_dir, "old"), id_column, partitions, chunk_size)
+        new_rows = partition_snapshot(new_path, os.path.join(work_dir, "new"), id_column, partitions, chunk_size)
+
+        tasks = [
+            (os.path.join(work_dir, "old", f"part-{p:04d}"),
+             os.path.join(work_dir, "new", f"part-{p:04d}"),
+             os.path.join(work_dir, f"delta-{p:04d}.ndjson"),
+             id_column)
+            for p in range(partitions)
+        ]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_diff_partition, tasks))
+
+        with open(output_path, "wb") as out:
+            for _, _, delta_path, _ in tasks:
+                with open(delta_path, "rb") as f:
+                    shutil.copyfileobj(f, out)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {key: sum(r[key] for r in results) for key in ("added", "removed", "changed", "unchanged")}
+    field_counts = sum((r["fields"] for r in results), Counter())
+    summary.update({
+        "old_rows": old_rows,
+        "new_rows": new_rows,
+        "changed_fields": dict(field_counts.most_common()),
+        "output_path": output_path,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    })
+    logging.info(f"Snapshot diff {old_path} → {new_path}: {summary['added']} added, "
+                 f"{summary['removed']} removed, {summary['changed']} changed")
+    return summary
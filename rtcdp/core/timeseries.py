@@ -0,0 +1,138 @@
+# rtcdp/core/timeseries.py
+
+import os
+import json
+import time
+import logging
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; partitions fall back to compressed CSV
+    pq = None
+
+CURSOR_FILE = "cursors.json"
+
+
+def _utc(value):
+    if value is None:
+        return None
+    stamp = pd.Timestamp(value)
+    return stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+
+
+class TimeSeriesStore:
+    """
+    Append-only local time-series store partitioned by month.
+
+    Each append writes one compressed part under ``<root>/month=YYYY-MM/``;
+    reads only open the months that overlap the requested range. With a
+    ``key_column`` the months an append touches are compacted into a single
+    part, deduplicated on that key (latest append wins), so re-harvesting an
+    overlapping window replaces rows instead of piling up copies. Per-source
+    cursors are kept alongside the data for incremental harvesting.
+    """
+
+    def __init__(self, path, time_column="timestamp", key_column=None):
+        self.path = path
+        self.time_column = time_column
+        self.key_column = key_column
+        os.makedirs(path, exist_ok=True)
+
+    # Cursors ---------------------------------------------------------------
+
+    def cursors(self):
+        cursor_path = os.path.join(self.path, CURSOR_FILE)
+        if not os.path.exists(cursor_path):
+            return {}
+        with open(cursor_path, "r") as f:
+            return json.load(f)
+
+    def save_cursors(self, cursors):
+        tmp = os.path.join(self.path, f"{CURSOR_FILE}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(cursors, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, CURSOR_FILE))
+
+    # Writes ----------------------------------------------------------------
+
+    def append(self, frame):
+        """Append rows; ``time_column`` must hold UTC timestamps. Returns the number of rows written."""
+        if frame.empty:
+            return 0
+        frame = frame.copy()
+        frame[self.time_column] = pd.to_datetime(frame[self.time_column], utc=True)
+        stamp = f"{time.time_ns()}"
+        for month, rows in frame.groupby(frame[self.time_column].dt.strftime("%Y-%m")):
+            directory = os.path.join(self.path, f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            existing = self._part_files(directory) if self.key_column else []
+            if existing:
+                rows = pd.concat([self._read_parts(existing), rows], ignore_index=True)
+                rows = rows.drop_duplicates(subset=[self.key_column], keep="last")
+            self._write_part(directory, f"part-{stamp}", rows)
+            # The new part already holds every surviving row; a crash before this only leaves duplicates for read()
+            for file in existing:
+                os.remove(file)
+        logging.info(f"Appended {len(frame)} rows to time-series store {self.path}")
+        return len(frame)
+
+    def _write_part(self, directory, name, rows):
+        suffix = ".parquet" if pq is not None else ".csv.gz"
+        target = os.path.join(directory, name + suffix)
+        tmp = os.path.join(directory, f".{name}{suffix}.tmp")
+        if pq is not None:
+            rows.to_parquet(tmp, index=False, compression="zstd")
+        else:
+            rows.to_csv(tmp, index=False, compression="gzip")
+        os.replace(tmp, target)
+
+    # Reads -----------------------------------------------------------------
+
+    def _months(self, start, end):
+        months = sorted(name[len("month="):] for name in os.listdir(self.path) if name.startswith("month="))
+        if start is not None:
+            months = [m for m in months if m >= start.strftime("%Y-%m")]
+        if end is not None:
+            months = [m for m in months if m <= end.strftime("%Y-%m")]
+        return months
+
+    @staticmethod
+    def _part_files(directory):
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith((".parquet", ".csv.gz"))]
+
+    def _read_parts(self, files):
+        parts = []
+        for file in files:
+            if file.endswith(".parquet"):
+                parts.append(pd.read_parquet(file))
+            else:
+                parts.append(pd.read_csv(file, compression="gzip", parse_dates=[self.time_column]))
+        frame = pd.concat(parts, ignore_index=True)
+        frame[self.time_column] = pd.to_datetime(frame[self.time_column], utc=True)
+        return frame
+
+    def read(self, start=None, end=None, **filters):
+        """
+        Rows between ``start`` and ``end`` (inclusive), optionally filtered by
+        column equality, e.g. ``read(start, flow_id="...")``.
+        """
+        start, end = _utc(start), _utc(end)
+
+        files = []
+        for month in self._months(start, end):
+            files.extend(self._part_files(os.path.join(self.path, f"month={month}")))
+        if not files:
+            return pd.DataFrame(columns=[self.time_column])
+
+        frame = self._read_parts(files)
+        if self.key_column:
+            frame = frame.drop_duplicates(subset=[self.key_column], keep="last")
+        if start is not None:
+            frame = frame[frame[self.time_column] >= start]
+        if end is not None:
+            frame = frame[frame[self.time_column] <= end]
+        for column, value in filters.items():
+            frame = frame[frame[column] == value]
+        return frame.sort_values(self.time_column).reset_index(drop=True)
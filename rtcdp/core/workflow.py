@@ -0,0 +1,301 @@
+# rtcdp/core/workflow.py
+
+"""
+Workflow manifests: named steps with dependencies, run by a parallel DAG scheduler.
+
+    name: nightly
+    workers: 4
+    steps:
+      token:
+        action: token.refresh
+      audience_counts:
+        action: query.run
+        needs: [token]
+        with: {name: sample_0, output: logs/audience_counts.parquet}
+        retry: {attempts: 3, backoff: 5}
+        cache: true
+        outputs: [logs/audience_counts.parquet]
+      report:
+        action: shell
+        needs: [audience_counts]
+        with: {command: "python rtcdp/sql/query_6_to_CSV.py ${steps.audience_counts.output}"}
+
+Steps whose dependencies are satisfied run concurrently on a worker pool. A
+step's fingerprint covers its action, its resolved parameters, the size and
+mtime of its declared ``inputs`` and the results of the steps it needs; a
+``cache: true`` step whose fingerprint matches its last successful run (and
+whose ``outputs`` still exist) is skipped. ``resume`` additionally reuses
+every step that completed in the previous run, so a run that failed halfway
+picks up where it stopped. State lives in ``logs/workflows/<name>/``.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+WORKFLOW_DIR = os.path.join("logs", "workflows")
+STATE_FILE = "state.json"
+HISTORY_FILE = "runs.ndjson"
+DEFAULT_WORKERS = 4
+TEMPLATE_PATTERN = re.compile(r"\$\{(steps|env)\.([\w-]+)(?:\.([\w.-]+))?\}")
+
+OK_STATUSES = ("succeeded", "cached")
+
+
+class WorkflowError(ValueError):
+    """Invalid manifest: unknown action or dependency, cycle, malformed step."""
+
+
+class Step:
+    def __init__(self, step_id, spec):
+        if not isinstance(spec, dict) or "action" not in spec:
+            raise WorkflowError(f"Step '{step_id}' needs an 'action'")
+        self.id = step_id
+        self.action = spec["action"]
+        self.needs = list(spec.get("needs") or [])
+        self.params = dict(spec.get("with") or {})
+        self.cache = bool(spec.get("cache", False))
+        self.inputs = list(spec.get("inputs") or [])
+        self.outputs = list(spec.get("outputs") or [])
+        retry = spec.get("retry") or {}
+        if isinstance(retry, int):
+            retry = {"attempts": retry}
+        self.attempts = max(1, int(retry.get("attempts", 1)))
+        self.backoff = float(retry.get("backoff", 1.0))
+
+
+class Workflow:
+    def __init__(self, name, steps, workers=DEFAULT_WORKERS):
+        self.name = name
+        self.steps = steps
+        self.workers = workers
+        self.levels()  # Validate the graph up front
+
+    @classmethod
+    def from_dict(cls, manifest, default_name="workflow"):
+        steps = manifest.get("steps")
+        if not isinstance(steps, dict) or not steps:
+            raise WorkflowError("Manifest has no steps")
+        return cls(str(manifest.get("name") or default_name),
+                   {step_id: Step(step_id, spec) for step_id, spec in steps.items()},
+                   int(manifest.get("workers", DEFAULT_WORKERS)))
+
+    @classmethod
+    def load(cls, path):
+        import yaml
+        with open(path, "r") as f:
+            manifest = yaml.safe_load(f) or {}
+        return cls.from_dict(manifest, os.path.splitext(os.path.basename(path))[0])
+
+    def levels(self):
+        """
+        Steps grouped into waves that can run together; raises on unknown
+        dependencies, cycles, or a ``${steps.X}`` reference to a step missing
+        from ``needs`` (it would resolve depending on scheduling and stay out
+        of the fingerprint).
+        """
+        for step in self.steps.values():
+            unknown = [dep for dep in step.needs if dep not in self.steps]
+            if unknown:
+                raise WorkflowError(f"Step '{step.id}' needs unknown step(s): {', '.join(unknown)}")
+            undeclared = sorted(_step_references([step.params, step.inputs]) - set(step.needs))
+            if undeclared:
+                raise WorkflowError(f"Step '{step.id}' references step(s) missing from its needs: "
+                                    f"{', '.join(undeclared)}")
+        remaining = {step_id: set(step.needs) for step_id, step in self.steps.items()}
+        levels = []
+        while remaining:
+            ready = sorted(step_id for step_id, deps in remaining.items() if not deps)
+            if not ready:
+                raise WorkflowError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+            levels.append(ready)
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return levels
+
+
+def _step_references(value):
+    """Step IDs named by ``${steps.<id>...}`` anywhere in ``value``."""
+    if isinstance(value, dict):
+        return set().union(*map(_step_references, value.values()))
+    if isinstance(value, list):
+        return set().union(*map(_step_references, value))
+    if not isinstance(value, str):
+        return set()
+    return {name for scope, name, _ in TEMPLATE_PATTERN.findall(value) if scope == "steps"}
+
+
+def _resolve(value, results):
+    """Substitute ``${steps.<id>.<key>}`` and ``${env.<NAME>}`` references, recursively."""
+    if isinstance(value, dict):
+        return {k: _resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    if not isinstance(value, str):
+        return value
+
+    def lookup(match):
+        scope, name, key = match.groups()
+        if scope == "env":
+            return os.environ.get(name, "")
+        result = results.get(name, {})
+        for part in (key or "").split(".") if key else []:
+            result = result.get(part) if isinstance(result, dict) else None
+        return result
+
+    whole = TEMPLATE_PATTERN.fullmatch(value)
+    if whole:
+        return lookup(whole)  # Keep the referenced value's type (lists, numbers)
+    return TEMPLATE_PATTERN.sub(lambda m: str(lookup(m)), value)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return [path, stat.st_size, stat.st_mtime_ns]
+    except FileNotFoundError:
+        return [path, None, None]
+
+
+def fingerprint(step, params, results):
+    payload = {
+        "action": step.action,
+        "with": params,
+        "inputs": [_file_signature(p) for p in _resolve(step.inputs, results)],
+        "needs": {dep: results.get(dep) for dep in sorted(step.needs)},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class WorkflowRunner:
+    """Runs a ``Workflow`` against a registry of ``action name -> callable(**params) -> dict``."""
+
+    def __init__(self, workflow, actions, state_dir=None):
+        unknown = sorted({s.action for s in workflow.steps.values()} - set(actions))
+        if unknown:
+            raise WorkflowError(f"Unknown action(s): {', '.join(unknown)}")
+        self.workflow = workflow
+        self.actions = actions
+        self.state_dir = state_dir or os.path.join(WORKFLOW_DIR, workflow.name)
+        self._lock = threading.Lock()
+
+    # State -----------------------------------------------------------------
+
+    def load_state(self):
+        path = os.path.join(self.state_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return {"steps": {}}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp = os.path.join(self.state_dir, f"{STATE_FILE}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp, os.path.join(self.state_dir, STATE_FILE))
+
+    # Execution -------------------------------------------------------------
+
+    def _reusable(self, step, record, digest, previous_run, resume):
+        if not record or record.get("status") not in OK_STATUSES or record.get("fingerprint") != digest:
+            return False
+        if any(not os.path.exists(p) for p in step.outputs):
+            return False
+        return step.cache or (resume and record.get("run_id") == previous_run)
+
+    def _execute(self, step, params):
+        action = self.actions[step.action]
+        for attempt in range(1, step.attempts + 1):
+            try:
+                result = action(**params)
+                return attempt, result if isinstance(result, dict) else {"value": result}
+            except Exception as e:
+                if attempt == step.attempts:
+                    raise
+                delay = step.backoff * (2 ** (attempt - 1))
+                logging.warning(f"Workflow step '{step.id}' attempt {attempt} failed: {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def run(self, resume=False, force=False, max_workers=None, on_step=None):
+        """
+        Run every step whose dependencies succeeded; independent branches keep
+        going when a step fails. ``on_step(record)`` is called in the calling
+        thread as each step finishes. Returns the run's state dict.
+        """
+        previous = self.load_state()
+        run_id = uuid.uuid4().hex[:12]
+        state = {"workflow": self.workflow.name, "run_id": run_id, "previous_run_id": previous.get("run_id"),
+                 "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "steps": {}}
+        results = {}
+        pending = set(self.workflow.steps)
+        running = {}
+
+        def finish(record):
+            state["steps"][record["step"]] = record
+            if record["status"] in OK_STATUSES:
+                results[record["step"]] = record.get("result") or {}
+            with self._lock:
+                self._save_state(state)
+            if on_step:
+                on_step(record)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.workflow.workers) as pool:
+            while pending or running:
+                for step_id in sorted(pending):
+                    step = self.workflow.steps[step_id]
+                    statuses = [state["steps"].get(dep, {}).get("status") for dep in step.needs]
+                    if any(s in ("failed", "blocked") for s in statuses):
+                        pending.discard(step_id)
+                        finish({"step": step_id, "run_id": run_id, "status": "blocked",
+                                "error": "upstream step failed"})
+                        continue
+                    if not all(s in OK_STATUSES for s in statuses):
+                        continue
+
+                    pending.discard(step_id)
+                    params = _resolve(step.params, results)
+                    digest = fingerprint(step, params, results)
+                    record = previous["steps"].get(step_id)
+                    if not force and self._reusable(step, record, digest, previous.get("run_id"), resume):
+                        finish(dict(record, status="cached", cached_from=record.get("run_id"), run_id=run_id))
+                        continue
+                    logging.info(f"Workflow {self.workflow.name}: starting step '{step_id}' ({step.action})")
+                    running[pool.submit(self._execute, step, params)] = (step_id, digest, time.time())
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id, digest, started = running.pop(future)
+                    record = {"step": step_id, "run_id": run_id, "fingerprint": digest,
+                              "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                              "elapsed_s": round(time.time() - started, 3)}
+                    try:
+                        attempts, result = future.result()
+                        record.update(status="succeeded", attempts=attempts, result=result)
+                    except Exception as e:
+                        logging.error(f"Workflow step '{step_id}' failed: {e}")
+                        record.update(status="failed", attempts=self.workflow.steps[step_id].attempts, error=str(e))
+                    finish(record)
+
+        state["finished"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        state["status"] = "succeeded" if all(r["status"] in OK_STATUSES for r in state["steps"].values()) else "failed"
+        with self._lock:
+            self._save_state(state)
+            with open(os.path.join(self.state_dir, HISTORY_FILE), "a") as f:
+                counts = {}
+                for r in state["steps"].values():
+                    counts[r["status"]] = counts.get(r["status"], 0) + 1
+                f.write(json.dumps({"run_id": run_id, "started": state["started"], "finished": state["finished"],
+                                    "status": state["status"], "steps": counts}) + "\n")
+        logging.info(f"Workflow {self.workflow.name} run {run_id} {state['status']}")
+        return state
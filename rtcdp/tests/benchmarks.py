@@ -0,0 +1,414 @@
+# rtcdp/tests/benchmarks.py
+
+"""
+Benchmarks for the kit's hot paths, run against the local AEP emulator.
+
+    python -m rtcdp.tests.benchmarks                       # quick scale, compare with the baseline
+    python -m rtcdp.tests.benchmarks --scale full          # 1M-row query, 20k datasets, ...
+    python -m rtcdp.tests.benchmarks --only query_roundtrip --repeat 5
+    python -m rtcdp.tests.benchmarks --update-baseline     # accept the current numbers
+
+The emulator runs in a separate process so its serialization doesn't compete
+with the kit for the GIL. Each scenario runs in a scratch working directory,
+so CSVs, mirrors and logs never touch the checkout.
+
+Results go to ``logs/benchmarks/results-<timestamp>.json`` and
+``logs/benchmarks/latest.json``. Each scenario records its median wall time,
+throughput and the HTTP call count and latency percentiles taken from
+``rtcdp.utils.metrics``. A scenario is flagged when its throughput drops, or
+its HTTP p95 grows, by more than ``--tolerance`` (a fraction) relative to
+``benchmark_baseline.json``. The command then exits 1.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+RESULTS_DIR = os.path.join("logs", "benchmarks")
+DEFAULT_TOLERANCE = 0.25
+SCALES = ("quick", "full")
+
+SCENARIOS = {}
+
+
+class Scenario:
+    def __init__(self, name, func, unit, sizes, emulator=None, setup=None):
+        self.name = name
+        self.func = func
+        self.unit = unit
+        self.sizes = sizes
+        self.emulator = emulator or {}
+        self.setup = setup
+
+    def size(self, scale):
+        return self.sizes[scale]
+
+
+def scenario(name, unit, quick, full, emulator=None, setup=None):
+    """Register ``func(run, size, state)``; it returns the number of ``unit`` processed.
+
+    ``emulator`` holds the emulator settings for the scenario, or a callable taking the size.
+    """
+    def register(func):
+        SCENARIOS[name] = Scenario(name, func, unit, {"quick": quick, "full": full}, emulator, setup)
+        return func
+    return register
+
+
+# ── emulator process ─────────────────────────────────────────────────────
+
+class EmulatorProcess:
+    """``rtcdp emulator serve`` in a child process, steered through its control endpoints."""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.process = None
+        self.url = None
+        self.credentials = None
+
+    def start(self):
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, RTCDP_NO_DAEMON="1")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "rtcdp", "emulator", "serve", "--port", "0", "--credentials", "credentials.json"],
+            cwd=self.workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        line = self.process.stdout.readline()  # The serve command announces itself on its first line
+        if not line:
+            self.stop()
+            raise RuntimeError("AEP emulator did not start")
+        info = json.loads(line)
+        self.url = info["url"]
+        self.credentials = os.path.join(self.workdir, info["credentials"])
+        return self
+
+    def configure(self, **settings):
+        from rtcdp.utils import http_client
+        http_client.post(f"{self.url}/__emulator/reset").raise_for_status()
+        http_client.patch(f"{self.url}/__emulator/config", json=settings).raise_for_status()
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+class BenchmarkRun:
+    """One emulator and scratch directory shared by every scenario in a run."""
+
+    def __init__(self, scale="quick"):
+        if scale not in SCALES:
+            raise ValueError(f"Unknown scale '{scale}' (expected one of {', '.join(SCALES)})")
+        self.scale = scale
+        self.workdir = None
+        self.emulator = None
+        self._saved_env = None
+
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp(prefix="rtcdp-bench-")
+        self.emulator = EmulatorProcess(self.workdir).start()
+        self._saved_env = os.environ.get("RTCDP_CREDENTIALS")
+        os.environ["RTCDP_CREDENTIALS"] = self.emulator.credentials
+        return self
+
+    def __exit__(self, *exc):
+        if self._saved_env is None:
+            os.environ.pop("RTCDP_CREDENTIALS", None)
+        else:
+            os.environ["RTCDP_CREDENTIALS"] = self._saved_env
+        self.emulator.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    @contextlib.contextmanager
+    def _scratch(self, name):
+        path = os.path.join(self.workdir, name)
+        os.makedirs(path, exist_ok=True)
+        cwd = os.getcwd()
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+    def run(self, name, repeat=3):
+        """Run one scenario ``repeat`` times; returns its result record."""
+        from rtcdp.utils import metrics
+        from rtcdp.utils.auth_helper import AuthHelper
+        spec = SCENARIOS[name]
+        size = spec.size(self.scale)
+        settings = spec.emulator(size) if callable(spec.emulator) else spec.emulator
+        self.emulator.configure(**settings)
+        timings, items = [], None
+        observed = metrics.RequestMetrics()
+        with self._scratch(name), _quiet():
+            state = spec.setup(self, size) if spec.setup else None
+            AuthHelper().get_access_token()  # The one-off validation ping belongs to setup, not the first run
+            metrics.registry.take()  # Setup traffic isn't part of the measurement
+            for _ in range(repeat):
+                started = time.perf_counter()
+                items = spec.func(self, size, state)
+                timings.append(time.perf_counter() - started)
+                observed.merge(metrics.registry.take())
+        seconds = statistics.median(timings)
+        return {
+            "scenario": name, "scale": self.scale, "unit": spec.unit, "items": items, "repeat": repeat,
+            "seconds": round(seconds, 4), "best_seconds": round(min(timings), 4),
+            "throughput": round(items / seconds, 2) if seconds else None,
+            "http": _http_stats(observed, repeat),
+        }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Managers narrate every step; keep the benchmark output to the result table."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _http_stats(observed, repeat):
+    from rtcdp.utils import metrics
+    series = observed.series()
+    if not series:
+        return {"calls": 0}
+    combined = {"buckets": [0] * (len(observed.buckets) + 1), "count": 0, "sum": 0.0, "max": 0.0, "throttled": 0}
+    for value in series.values():
+        combined["buckets"] = [a + b for a, b in zip(combined["buckets"], value["buckets"])]
+        combined["count"] += value["count"]
+        combined["sum"] += value["sum"]
+        combined["max"] = max(combined["max"], value["max"])
+        combined["throttled"] += value["throttled"]
+    stats = {"calls": combined["count"] // repeat, "throttled": combined["throttled"] // repeat,
+             "mean_ms": round(1000 * combined["sum"] / combined["count"], 2)}
+    for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+        estimate = metrics._quantile(observed.buckets, combined["buckets"], combined["count"], q)
+        stats[label] = round(1000 * min(estimate, combined["max"]), 2)
+    return stats
+
+
+@contextlib.contextmanager
+def _patched(module, **values):
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def _write_rows(path, count, fmt):
+    """Synthetic query-result rows (the emulator's generator) as a JSON array or CSV."""
+    from rtcdp.core.emulator import AEPEmulator
+    rows = AEPEmulator()._query_row
+    if fmt == "json":
+        with open(path, "w") as f:
+            f.write("[")
+            f.write(",".join(json.dumps(rows(i)) for i in range(count)))
+            f.write("]")
+    else:
+        import csv
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows(0)))
+            writer.writeheader()
+            writer.writerows(rows(i) for i in range(count))
+    return path
+
+
+# ── scenarios ────────────────────────────────────────────────────────────
+
+@scenario("catalog_pagination", "datasets", quick=2_000, full=20_000,
+          emulator=lambda size: {"datasets": size})
+def bench_catalog_pagination(run, size, state):
+    from rtcdp.api.modules.dataset_data.datasets import DatasetManager
+    count = sum(1 for _ in DatasetManager().iter_datasets(limit=100))
+    assert count == size, f"listed {count} of {size} datasets"
+    return count
+
+
+@scenario("token_acquisition", "tokens", quick=30, full=300)
+def bench_token_acquisition(run, size, state):
+    """IMS client-credentials exchange followed by the validation ping, as on a cold start."""
+    import importlib.util
+    from rtcdp.utils import auth_helper
+    spec = importlib.util.spec_from_file_location(
+        "ims_token_refresh", os.path.join(REPO_ROOT, "rtcdp", "config", "ims.token_refresh.py"))
+    refresher_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(refresher_module)
+
+    for _ in range(size):
+        refresher = refresher_module.AEPTokenRefresher(run.emulator.credentials)
+        assert refresher.refresh_token(), "IMS token exchange failed"
+        auth_helper._validated_tokens.invalidate()
+        assert auth_helper.AuthHelper().get_access_token(), "token validation failed"
+    return size
+
+
+@scenario("query_roundtrip", "rows", quick=50_000, full=1_000_000, emulator={"query_polls": 2})
+def bench_query_roundtrip(run, size, state):
+    """Submit, poll to completion, download the rows and write the results CSV."""
+    from rtcdp.api.modules.inspect_data import queries
+    with _patched(queries, POLL_INTERVAL_SECONDS=0):
+        handler = queries.QueryHandler()
+        query_id = handler.submit_query(f"SELECT * FROM emulator_profiles LIMIT {size}")
+        assert handler.poll_query_status(query_id) == "SUCCEEDED"
+        handler.download_query_results(query_id)
+    with open(queries.RESULT_CSV_PATH) as f:
+        rows = sum(1 for _ in f) - 1
+    assert rows == size, f"downloaded {rows} of {size} rows"
+    return rows
+
+
+@scenario("export_monitoring", "jobs", quick=10, full=100, emulator={"export_polls": 3})
+def bench_export_monitoring(run, size, state):
+    """Create segment export jobs and monitor each until it succeeds."""
+    from rtcdp.api.modules.segment_data import segment_exporter
+    with _patched(segment_exporter, EXPORT_POLL_SECONDS=0):
+        exporter = segment_exporter.SegmentExporter(run.emulator.credentials, {"sandbox_id": "emulator"})
+        for n in range(size):
+            job_id = exporter.export_segment_to_dataset(f"segment-{n}", "dataset", "merge-policy")
+            assert exporter.monitor_export_status(job_id) == "SUCCEEDED"
+    return size
+
+
+def _setup_json_rows(run, size):
+    return _write_rows("rows.json", size, "json")
+
+
+@scenario("json_to_csv", "records", quick=50_000, full=1_000_000, setup=_setup_json_rows)
+def bench_json_to_csv(run, size, state):
+    from rtcdp.utils.json_csv_convert import convert_json_to_csv
+    convert_json_to_csv(state, "rows.csv")
+    return size
+
+
+def _setup_result_csv(run, size):
+    return _write_rows("results.csv", size, "csv")
+
+
+@scenario("report_rendering", "rows", quick=50_000, full=1_000_000, setup=_setup_result_csv)
+def bench_report_rendering(run, size, state):
+    """The report menu's table preview and JSON export of the last query results."""
+    from rtcdp.cli.report_cli import render_results_table, export_results_json
+    assert render_results_table(state)
+    export_results_json(state)
+    return size
+
+
+# ── baselines and reporting ──────────────────────────────────────────────
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = load_baseline(path)
+    for result in results:
+        entry = {"seconds": result["seconds"], "throughput": result["throughput"], "items": result["items"]}
+        if result["http"].get("calls"):
+            entry["http_p95_ms"] = result["http"]["p95_ms"]
+            entry["http_calls"] = result["http"]["calls"]
+        baseline.setdefault(result["scale"], {})[result["scenario"]] = entry
+    baseline["meta"] = _environment()
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE, timing=True):
+    """
+    Regressions of ``result`` against its baseline entry (empty when there is no baseline).
+
+    ``timing=False`` checks only the HTTP call count, which doesn't depend on the machine or its load.
+    """
+    base = baseline.get(result["scale"], {}).get(result["scenario"])
+    if not base:
+        return []
+    regressions = []
+    if timing and base.get("throughput") and result["throughput"] < base["throughput"] * (1 - tolerance):
+        regressions.append(f"{result['scenario']}: throughput {result['throughput']:.1f} {result['unit']}/s "
+                           f"vs baseline {base['throughput']:.1f} (-{1 - result['throughput'] / base['throughput']:.0%})")
+    p95 = result["http"].get("p95_ms")
+    if timing and base.get("http_p95_ms") and p95 is not None and p95 > base["http_p95_ms"] * (1 + tolerance):
+        regressions.append(f"{result['scenario']}: HTTP p95 {p95:.1f}ms vs baseline {base['http_p95_ms']:.1f}ms")
+    if base.get("http_calls") and result["http"].get("calls", 0) > base["http_calls"]:
+        regressions.append(f"{result['scenario']}: {result['http']['calls']} HTTP calls vs baseline {base['http_calls']}")
+    return regressions
+
+
+def _environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+            "cpus": os.cpu_count()}
+
+
+def write_results(results, regressions, output_dir=RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": _environment(),
+              "results": results, "regressions": regressions}
+    path = os.path.join(output_dir, f"results-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for target in (path, os.path.join(output_dir, "latest.json")):
+        with open(target, "w") as f:
+            json.dump(report, f, indent=2)
+    return path
+
+
+def print_table(results, baseline):
+    print(f"{'SCENARIO':<20} {'ITEMS':>9} {'MEDIAN':>9} {'THROUGHPUT':>16} {'VS BASE':>8} {'CALLS':>6} {'P95':>9}")
+    for r in results:
+        base = baseline.get(r["scale"], {}).get(r["scenario"], {})
+        delta = f"{r['throughput'] / base['throughput'] - 1:+.0%}" if base.get("throughput") else "-"
+        p95 = f"{r['http']['p95_ms']:.1f}ms" if r["http"].get("calls") else "-"
+        print(f"{r['scenario']:<20} {r['items']:>9} {r['seconds']:>8.3f}s "
+              f"{r['throughput']:>10.1f} {r['unit'][:5]}/s {delta:>8} {r['http'].get('calls', 0):>6} {p95:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RTCDP API Kit benchmarks (against the local AEP emulator)")
+    parser.add_argument("--scale", choices=SCALES, default="quick")
+    parser.add_argument("--only", action="append", choices=sorted(SCENARIOS), help="Run just these scenarios")
+    parser.add_argument("--repeat", type=int, help="Runs per scenario (default: 3 quick, 1 full)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a scenario is flagged (default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+
+    repeat = args.repeat or (3 if args.scale == "quick" else 1)
+    baseline = load_baseline()
+    results, regressions = [], []
+    with BenchmarkRun(args.scale) as run:
+        for name in args.only or SCENARIOS:
+            result = run.run(name, repeat=repeat)
+            results.append(result)
+            regressions += compare(result, baseline, args.tolerance)
+
+    print_table(results, baseline)
+    path = write_results(results, regressions, args.output_dir)
+    print(f"\nResults written to {path}")
+    if args.update_baseline:
+        print(f"Baseline updated: {save_baseline(results)}")
+        return 0
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# rtcdp/tests/test_benchmarks.py
+
+"""
+Quick-scale benchmark smoke test.
+
+Runs every scenario from ``benchmarks.py`` once against the local AEP emulator
+and checks only what doesn't depend on the machine: item counts, no
+throttling, and no more HTTP calls than the stored baseline. Timing
+regressions are judged by ``make bench`` (``python -m rtcdp.tests.benchmarks``),
+where the tolerance and the baseline's machine are under your control.
+"""
+
+import pytest
+
+from rtcdp.tests import benchmarks
+
+
+@pytest.fixture(scope="module")
+def bench_run():
+    with benchmarks.BenchmarkRun("quick") as run:
+        yield run
+
+
+@pytest.mark.parametrize("name", sorted(benchmarks.SCENARIOS))
+def test_scenario_counts(bench_run, name):
+    result = bench_run.run(name, repeat=1)
+
+    assert result["items"] == benchmarks.SCENARIOS[name].size("quick")
+    assert result["http"].get("throttled", 0) == 0
+    regressions = benchmarks.compare(result, benchmarks.load_baseline(), timing=False)
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,75 @@
+# rtcdp/tests/test_cassette.py
+
+"""
+Record a session against the local AEP emulator, then replay it with the
+emulator stopped: same results, same polling sequence, no secrets on disk.
+"""
+
+import gzip
+
+import pytest
+
+from rtcdp.core.emulator import AEPEmulator, EmulatorConfig
+from rtcdp.utils import http_client, cassette, auth_helper, metrics
+from rtcdp.utils.auth_helper import AuthHelper
+
+
+def _session():
+    from rtcdp.api.modules.dataset_data.datasets import DatasetManager
+    from rtcdp.api.modules.inspect_data import queries
+
+    datasets = [d["id"] for d in DatasetManager().iter_datasets(limit=50)]
+    handler = queries.QueryHandler()
+    query_id = handler.submit_query("SELECT * FROM emulator_profiles LIMIT 500")
+    state = handler.poll_query_status(query_id)
+    return datasets, state, handler.fetch_query_results(query_id)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    from rtcdp.api.modules.inspect_data import queries
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(queries, "POLL_INTERVAL_SECONDS", 0)
+    yield tmp_path
+    http_client.use_cassette(None)
+    metrics.registry.take()  # Keep the atexit flush from writing emulator calls into the checkout
+
+
+def test_replay_matches_recording_offline(workdir, monkeypatch):
+    path = str(workdir / "session.jsonl.gz")
+    with AEPEmulator(EmulatorConfig(datasets=120, query_polls=3)) as emulator:
+        credentials = emulator.write_credentials(str(workdir / "credentials.json"))
+        monkeypatch.setenv("RTCDP_CREDENTIALS", credentials)
+        recording = http_client.use_cassette(path, "record")
+        recorded = _session()
+        http_client.use_cassette(None)
+
+    auth_helper._validated_tokens.invalidate()  # Replay the token validation ping as well
+    replay = http_client.use_cassette(path)
+    assert replay.mode == "replay"
+    assert _session() == recorded
+    assert replay.misses == 0 and replay.hits == recording.recorded
+
+    assert len(recorded[0]) == 120 and recorded[1] == "SUCCEEDED" and len(recorded[2]) == 500
+    with gzip.open(path, "rt") as f:
+        text = f.read()
+    for secret in (AuthHelper(credentials).credentials["access_token"], "emulator-api-key"):
+        assert secret not in text
+
+
+def test_replay_miss_raises(workdir):
+    path = str(workdir / "empty.jsonl.gz")
+    http_client.use_cassette(path, "record").close()
+    http_client.use_cassette(path, "replay")
+    with pytest.raises(cassette.CassetteMiss):
+        http_client.get("https://platform.adobe.io/data/foundation/catalog/dataSets")
+
+
+def test_scrub_bodies_and_urls():
+    form = cassette.scrub_body("grant_type=client_credentials&client_id=abc&client_secret=s3cr3t",
+                               "application/x-www-form-urlencoded")
+    assert "s3cr3t" not in form and "abc" not in form and "grant_type=client_credentials" in form
+    token = cassette.scrub_body('{"access_token": "eyJhbGciOi", "expires_in": 86399}', "application/json")
+    assert "eyJhbGciOi" not in token and "86399" in token
+    assert cassette.scrub_url("https://ims/token?code=1&client_secret=x") == \
+        "https://ims/token?client_secret=%3Cscrubbed%3E&code=1"
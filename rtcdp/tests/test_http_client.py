@@ -0,0 +1,68 @@
+# rtcdp/tests/test_http_client.py
+
+"""
+Retry policy of ``http_client.request``: gateway errors are retried only for
+idempotent methods, throttling for every method.
+"""
+
+import pytest
+import requests
+
+from rtcdp.utils import http_client, metrics
+
+
+class _ScriptedSession:
+    """Answers each request with the next status in ``statuses`` (the last one repeats)."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(method)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(*statuses):
+        scripted = _ScriptedSession(*statuses)
+        monkeypatch.setattr(http_client, "get_session", lambda: scripted)
+        return scripted
+
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    yield install
+    metrics.registry.take()  # Keep the atexit flush from writing these calls into the checkout
+
+
+def test_post_gateway_error_is_not_retried(session):
+    scripted = session(502, 201)
+    assert http_client.post("https://platform.adobe.io/data/foundation/catalog/dataSets").status_code == 502
+    assert scripted.calls == ["POST"]
+
+
+def test_patch_gateway_error_is_not_retried(session):
+    scripted = session(504, 200)
+    assert http_client.patch("https://platform.adobe.io/data/foundation/schemaregistry/x").status_code == 504
+    assert len(scripted.calls) == 1
+
+
+def test_post_throttling_is_retried(session):
+    scripted = session(429, 201)
+    assert http_client.post("https://platform.adobe.io/data/foundation/catalog/dataSets").status_code == 201
+    assert len(scripted.calls) == 2
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+def test_idempotent_gateway_error_is_retried(session, method):
+    scripted = session(503, 200)
+    assert http_client.request(method, "https://platform.adobe.io/data/foundation/catalog/dataSets").status_code == 200
+    assert len(scripted.calls) == 2
+
+
+def test_post_opts_in_to_gateway_retries(session):
+    scripted = session(502, 502, 200)
+    response = http_client.post("https://platform.adobe.io/data/core/ups/access/entities", retry_unsafe=True)
+    assert response.status_code == 200 and len(scripted.calls) == 3
@@ -0,0 +1,34 @@
+# rtcdp/tests/test_merge_policy.py
+
+"""
+Local merge simulation: fragments whose identities arrive pre-joined as
+"ns:value" are normalized like identity graph keys, so the graph stitches them.
+"""
+
+import pandas as pd
+
+from rtcdp.core.fragments import prepare_fragments, IDENTITY_COLUMN
+from rtcdp.core.identity_graph import IdentityGraph
+from rtcdp.core.merge_policy import MergePolicy, merge_profiles
+
+
+def test_pre_joined_identities_are_stitched(tmp_path):
+    graph = IdentityGraph.build(pd.DataFrame({"a": ["ECID:1"], "b": ["CRM:x"]}), path=str(tmp_path / "graph"))
+    fragments = prepare_fragments(pd.DataFrame({
+        "_id": ["ecid:1", " crm:x ", "ecid:2"],
+        "person.name": ["Ann", None, "Bob"],
+        "loyalty.tier": [None, "gold", "silver"],
+        "timestamp": ["2026-01-01", "2026-01-02", "2026-01-03"],
+    }), dataset_id="ds")
+
+    assert fragments[IDENTITY_COLUMN].tolist() == ["ECID:1", "CRM:x", "ECID:2"]
+    merged = merge_profiles(fragments, MergePolicy(), graph)
+    assert len(merged) == 2
+    stitched = merged[merged["_profile.fragments"] == 2].iloc[0]
+    assert (stitched["person.name"], stitched["loyalty.tier"]) == ("Ann", "gold")
+
+
+def test_namespace_prefix_matches_pre_joined():
+    given = prepare_fragments(pd.DataFrame({"_id": ["1"]}), identity_namespace="ecid")
+    joined = prepare_fragments(pd.DataFrame({"_id": ["Ecid:1"]}))
+    assert given[IDENTITY_COLUMN].tolist() == joined[IDENTITY_COLUMN].tolist() == ["ECID:1"]
@@ -0,0 +1,59 @@
+# rtcdp/tests/test_pql.py
+
+"""
+Local PQL evaluator: comparisons on a missing field are unknown, so negating
+them never matches profiles where the field is null, whatever its dtype.
+"""
+
+import pandas as pd
+import pytest
+
+from rtcdp.core.pql import compile_pql, preview_audience, PQLError
+
+
+@pytest.fixture
+def profiles():
+    return pd.DataFrame({
+        "person.age": [30, 40, None, 20],
+        "homeAddress.countryCode": ["US", "FR", None, "US"],
+        "person.name.first": ["Ann", "Bob", "Cy", None],
+    })
+
+
+def _matched(expression, frame):
+    return compile_pql(expression)(frame).tolist()
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ('person.age = 30', [True, False, False, False]),
+    ('not (person.age = 30)', [False, True, False, True]),
+    ('not (person.age > 25)', [False, False, False, True]),
+    ('person.age != 30', [False, True, False, True]),
+    ('homeAddress.countryCode = "US"', [True, False, False, True]),
+    ('not (homeAddress.countryCode = "US")', [False, True, False, False]),
+    ('not (homeAddress.countryCode in ["US"])', [False, True, False, False]),
+    ('not (person.name.first.startsWith("A"))', [False, True, True, False]),
+    ('person.age = null', [False, False, True, False]),
+    ('not (person.age = null)', [True, True, False, True]),
+    ('person.age not exists', [False, False, True, False]),
+    ('not (person.age > 25) or homeAddress.countryCode = "FR"', [False, True, False, True]),
+])
+def test_null_and_negation(profiles, expression, expected):
+    assert _matched(expression, profiles) == expected
+
+
+def test_negation_agrees_across_dtypes():
+    numeric = pd.DataFrame({"score": [1.0, None]})
+    text = pd.DataFrame({"score": ["1", None]})
+    assert _matched('not (score = 1)', numeric) == _matched('not (score = "1")', text) == [False, False]
+
+
+def test_invalid_regex_is_a_pql_error(profiles):
+    with pytest.raises(PQLError):
+        compile_pql('person.name.first.matches("(")')
+
+
+def test_preview_counts(profiles):
+    result = preview_audience('homeAddress.countryCode = "US" and person.age >= 25', profiles)
+    assert (result["matched"], result["total"]) == (1, 4)
+    assert result["sample"]["person.age"].tolist() == [30]
@@ -0,0 +1,86 @@
+# rtcdp/tests/test_startup.py
+
+"""
+Cold-start budget for the headless CLI.
+
+Runs ``python -X importtime`` in a fresh interpreter from an empty working
+directory and fails if importing the CLI (and building its parser) gets
+slower than the budget, pulls in heavy dependencies, or writes to disk.
+Override the budget with ``RTCDP_STARTUP_BUDGET_MS`` on slow machines.
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STARTUP_BUDGET_MS = float(os.environ.get("RTCDP_STARTUP_BUDGET_MS", 150))
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "yaml", "requests", "rich")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+PROBE = (
+    "import sys\n"
+    "import rtcdp.cli.headless as headless\n"
+    "headless.build_parser()\n"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+)
+
+
+def _run_importtime(code, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def _cumulative_us(stderr, prefix):
+    """Sum the cumulative import time of top-level imports of modules under ``prefix``."""
+    total = 0
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1 and match.group(4).startswith(prefix):
+            total += int(match.group(2))
+    return total
+
+
+@pytest.fixture
+def empty_cwd(tmp_path):
+    return str(tmp_path)
+
+
+def test_headless_cold_start_within_budget(empty_cwd):
+    # Best of three so a noisy CI neighbour doesn't fail the build
+    timings = []
+    for _ in range(3):
+        result = _run_importtime(PROBE.format(heavy=HEAVY_MODULES), empty_cwd)
+        timings.append(_cumulative_us(result.stderr, "rtcdp") / 1000)
+    assert min(timings) <= STARTUP_BUDGET_MS, (
+        f"headless CLI import took {min(timings):.1f}ms (budget {STARTUP_BUDGET_MS:.0f}ms)")
+
+
+def test_headless_import_skips_heavy_dependencies(empty_cwd):
+    result = _run_importtime(PROBE.format(heavy=HEAVY_MODULES), empty_cwd)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    assert not loaded, f"headless CLI imports {loaded} at startup; import them where they're used"
+
+
+@pytest.mark.parametrize("module", [
+    "rtcdp.utils.auth_helper",
+    "rtcdp.api.modules.credentials_data.credentials",
+    "rtcdp.api.modules.dataset_data.datasets",
+    "rtcdp.api.modules.schema_data.schemas",
+    "rtcdp.api.modules.inspect_data.queries",
+    "rtcdp.api.modules.inspect_data.lookup_identity",
+    "rtcdp.api.modules.flow_data.flow",
+    "rtcdp.api.modules.segment_data.audience",
+    "rtcdp.cli.main",
+])
+def test_module_import_has_no_side_effects(module, empty_cwd):
+    code = f"import sys, {module}\nprint(','.join(m for m in ('pandas', 'numpy', 'pyarrow', 'yaml') if m in sys.modules))"
+    result = _run_importtime(code, empty_cwd)
+    assert not [m for m in result.stdout.strip().split(",") if m], f"{module} imports data libraries eagerly"
+    assert not os.listdir(empty_cwd), f"importing {module} wrote {os.listdir(empty_cwd)}"
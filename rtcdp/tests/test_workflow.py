@@ -0,0 +1,87 @@
+# rtcdp/tests/test_workflow.py
+
+"""
+Workflow scheduler: undeclared step references are rejected, a failed run
+resumes where it stopped, and cached steps rerun only when their inputs change.
+"""
+
+import pytest
+
+from rtcdp.core.workflow import Workflow, WorkflowRunner, WorkflowError
+
+
+class _Actions(dict):
+    """Action registry that counts calls; ``fail`` names steps that raise."""
+
+    def __init__(self):
+        super().__init__(emit=self._emit, read=self._read)
+        self.calls = []
+        self.fail = set()
+
+    def _emit(self, name, **params):
+        self.calls.append(name)
+        if name in self.fail:
+            raise RuntimeError(f"{name} broke")
+        return {"name": name, **params}
+
+    def _read(self, name, path):
+        self.calls.append(name)
+        with open(path) as f:
+            return {"name": name, "text": f.read()}
+
+
+def _statuses(state):
+    return {step_id: record["status"] for step_id, record in state["steps"].items()}
+
+
+def test_reference_missing_from_needs_is_rejected():
+    with pytest.raises(WorkflowError, match="missing from its needs: a"):
+        Workflow.from_dict({"steps": {
+            "a": {"action": "emit", "with": {"name": "a"}},
+            "b": {"action": "emit", "with": {"name": "b", "from": "${steps.a.name}"}},
+        }})
+
+
+def test_failed_run_resumes_from_the_failed_step(tmp_path):
+    workflow = Workflow.from_dict({"name": "resume", "steps": {
+        "a": {"action": "emit", "with": {"name": "a"}},
+        "b": {"action": "emit", "needs": ["a"], "with": {"name": "b", "from": "${steps.a.name}"}},
+        "c": {"action": "emit", "needs": ["b"], "with": {"name": "c"}},
+        "side": {"action": "emit", "with": {"name": "side"}},
+    }})
+    actions = _Actions()
+    runner = WorkflowRunner(workflow, actions, state_dir=str(tmp_path))
+
+    actions.fail = {"b"}
+    first = runner.run()
+    assert first["status"] == "failed"
+    assert _statuses(first) == {"a": "succeeded", "b": "failed", "c": "blocked", "side": "succeeded"}
+
+    actions.fail, actions.calls = set(), []
+    second = runner.run(resume=True)
+    assert second["status"] == "succeeded"
+    assert _statuses(second) == {"a": "cached", "b": "succeeded", "c": "succeeded", "side": "cached"}
+    assert sorted(actions.calls) == ["b", "c"]
+    assert second["steps"]["b"]["result"]["from"] == "a"
+
+
+def test_cached_step_reruns_only_when_inputs_change(tmp_path):
+    source = tmp_path / "input.txt"
+    source.write_text("one")
+    workflow = Workflow.from_dict({"name": "cache", "steps": {
+        "load": {"action": "read", "cache": True, "inputs": [str(source)],
+                 "with": {"name": "load", "path": str(source)}},
+    }})
+    actions = _Actions()
+    runner = WorkflowRunner(workflow, actions, state_dir=str(tmp_path / "state"))
+
+    assert _statuses(runner.run()) == {"load": "succeeded"}
+    assert _statuses(runner.run()) == {"load": "cached"}
+    assert actions.calls == ["load"]
+
+    source.write_text("two, longer")
+    state = runner.run()
+    assert _statuses(state) == {"load": "succeeded"}
+    assert state["steps"]["load"]["result"]["text"] == "two, longer"
+    assert _statuses(runner.run(force=True)) == {"load": "succeeded"}
+    assert actions.calls == ["load"] * 3
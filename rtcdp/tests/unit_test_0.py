@@ -1,7 +1,14 @@
-from BOUNTEOUS.KIT.rtcdp_api_kit.cli.segments_cli import SegmentHandler
+# Manual smoke run of the segmentation handlers against the local AEP emulator; no credentials needed.
+import os
+import tempfile
+from rtcdp.core.emulator import AEPEmulator
 from rtcdp.utils.auth_helper import AuthHelper
+from rtcdp.api.modules.segment_data.audience import AudienceHandler
 
 if __name__ == "__main__":
-    auth = AuthHelper()
-    handler = SegmentHandler(auth)
-    handler.run_cli()
+    with AEPEmulator() as emulator:
+        auth = AuthHelper(emulator.write_credentials(os.path.join(tempfile.mkdtemp(), "credentials.json")))
+        handler = AudienceHandler(auth)
+        audiences = handler.list_audiences()
+        if audiences:
+            handler.get_audience_by_id(audiences[0]["id"])
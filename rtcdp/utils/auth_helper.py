@@ -3,21 +3,17 @@ import json
 import time
 import logging
 import subprocess
-import requests
+from rtcdp.utils.helpers import TTLCache
 
-# Logging setup
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-
-logging.basicConfig(
-    filename=os.path.join(LOG_DIR, "token.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+DEFAULT_CREDENTIALS_PATH = "rtcdp/config/cit-credentials.json"
+# A token that passed the API ping is trusted for this long, so each manager doesn't re-ping
+TOKEN_VALIDATION_TTL = 300
+_validated_tokens = TTLCache(ttl=TOKEN_VALIDATION_TTL, maxsize=64)
 
 class AuthHelper:
-    def __init__(self, credentials_path="rtcdp/config/cit-credentials.json"):
-        self.credentials_path = credentials_path
+    def __init__(self, credentials_path=None):
+        # RTCDP_CREDENTIALS points every manager at another environment, e.g. the local emulator
+        self.credentials_path = credentials_path or os.environ.get("RTCDP_CREDENTIALS", DEFAULT_CREDENTIALS_PATH)
         self.credentials = self.load_credentials()
 
     def load_credentials(self):
@@ -45,7 +41,8 @@ class AuthHelper:
     def refresh_token(self):
         try:
             print("[cyan]🔄 Refreshing token via ims.token_refresh.py...[/cyan]")
-            subprocess.run(["python3", "rtcdp/config/ims.token_refresh.py"], check=True, capture_output=True, text=True)
+            subprocess.run(["python3", "rtcdp/config/ims.token_refresh.py", self.credentials_path],
+                           check=True, capture_output=True, text=True)
             logging.info("Access token refreshed successfully.")
             self.credentials = self.load_credentials()
         except subprocess.CalledProcessError as e:
@@ -66,8 +63,11 @@ class AuthHelper:
         }
 
         try:
-            response = requests.get(test_url, headers=headers)
+            # Pooled, instrumented session: a long-lived process (e.g. the daemon) keeps the TLS connection open
+            from rtcdp.utils import http_client
+            response = http_client.get(test_url, headers=headers)
             if response.status_code == 200:
+                _validated_tokens.set(self.credentials["access_token"], True)
                 logging.info("Token validated successfully with API.")
                 return True
             elif response.status_code == 401:
@@ -91,6 +91,9 @@ class AuthHelper:
             print("[yellow]⚠️ Token expired. Attempting refresh...[/yellow]")
             self.refresh_token()
 
+        if self.credentials.get("access_token") in _validated_tokens:
+            return self.credentials["access_token"]
+
         if not self.validate_token_with_ping():
             print("[red bold]❌ Token validation failed after refresh.[/red bold]")
             return None
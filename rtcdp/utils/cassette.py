@@ -0,0 +1,323 @@
+# rtcdp/utils/cassette.py
+
+"""
+Record/replay transport for ``rtcdp.utils.http_client``.
+
+A cassette is a gzip-compressed JSON Lines file: a header line, then one
+recorded request/response pair per line. Secrets are scrubbed before anything
+is written:
+
+- credential headers (Authorization, x-api-key, cookies, org id);
+- token and secret fields in JSON and form bodies and in query strings;
+- any credential value seen in a request header, wherever it appears later.
+
+Modes:
+
+    record   every request goes to the platform and is written to the cassette
+    replay   requests are answered from the cassette only; a miss raises CassetteMiss
+    cache    replay exact matches from the cassette, fetch and append everything else;
+             new recordings are replayed from the next session on
+
+Replay is deterministic. Repeated requests (status polls, pagination) get
+their recorded responses in order, and the last one is repeated once they run
+out. In replay mode, a request that doesn't match exactly falls back to the
+same method and path, so a changed timestamp in a query string or body still
+finds its recording.
+
+    rtcdp --cassette crawl.jsonl.gz --cassette-mode record datasets list
+    rtcdp --cassette crawl.jsonl.gz datasets list      # replays offline
+    RTCDP_CASSETTE=demo.jsonl.gz python main.py
+"""
+
+import io
+import re
+import os
+import gzip
+import json
+import time
+import atexit
+import base64
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay", "cache")
+SCRUBBED = "<scrubbed>"
+SECRET_HEADERS = ("authorization", "x-api-key", "x-gw-ims-org-id", "cookie", "set-cookie", "proxy-authorization")
+SECRET_FIELDS = ("access_token", "refresh_token", "id_token", "client_id", "client_secret", "api_key",
+                 "password", "jwt_token", "private_key", "token")
+# The stored body is already decoded, so these would describe the wire format, not the cassette
+DROPPED_RESPONSE_HEADERS = ("content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive")
+# Literal secrets shorter than this are not scrubbed wherever they appear (too likely to hit ordinary text)
+MIN_SECRET_LENGTH = 8
+_BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+")
+
+
+class CassetteMiss(requests.ConnectionError):
+    """A replay-only cassette has no recording for this request."""
+
+
+def resolve_mode(path, mode=None):
+    """Explicit mode, else replay an existing cassette and record a new one."""
+    if mode is None:
+        return "replay" if os.path.exists(path) else "record"
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {', '.join(MODES)})")
+    return mode
+
+
+# ── scrubbing ────────────────────────────────────────────────────────────
+
+def _is_secret_field(name):
+    return str(name).lower() in SECRET_FIELDS
+
+
+def scrub_headers(headers):
+    return {name: SCRUBBED if name.lower() in SECRET_HEADERS else value for name, value in headers.items()}
+
+
+def scrub_url(url):
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = sorted((k, SCRUBBED if _is_secret_field(k) else v) for k, v in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _scrub_json(value):
+    if isinstance(value, dict):
+        return {k: SCRUBBED if _is_secret_field(k) and v is not None else _scrub_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub_json(v) for v in value]
+    return value
+
+
+def scrub_body(body, content_type=""):
+    """Scrubbed body text; JSON is re-serialized only when something was scrubbed."""
+    if not body:
+        return body
+    if "x-www-form-urlencoded" in content_type:
+        pairs = [(k, SCRUBBED if _is_secret_field(k) else v) for k, v in parse_qsl(body, keep_blank_values=True)]
+        return urlencode(pairs)
+    if "json" in content_type or body[:1] in ("{", "["):
+        try:
+            parsed = json.loads(body)
+        except ValueError:
+            pass
+        else:
+            scrubbed = _scrub_json(parsed)
+            if scrubbed != parsed:
+                return json.dumps(scrubbed)
+    return _BEARER.sub(r"\1" + SCRUBBED, body)
+
+
+def _encode_body(content):
+    if content is None:
+        return {}
+    if isinstance(content, str):
+        return {"body": content}
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(entry):
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return (entry.get("body") or "").encode("utf-8")
+
+
+def _match_keys(method, url, body):
+    """(exact, loose) keys: exact covers the query and body, loose only method and path."""
+    parts = urlsplit(url)
+    loose = f"{method} {parts.scheme}://{parts.netloc}{parts.path}"
+    digest = hashlib.sha1(f"{method} {url}\n{body or ''}".encode("utf-8")).hexdigest()[:16]
+    return digest, loose
+
+
+# ── cassette ─────────────────────────────────────────────────────────────
+
+class Cassette:
+    """Recorded interactions for one session, with replay cursors per request."""
+
+    def __init__(self, path, mode=None, skip_statuses=()):
+        self.path = path
+        self.mode = resolve_mode(path, mode)
+        self.skip_statuses = tuple(skip_statuses)
+        self.entries = []
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._exact = {}
+        self._loose = {}
+        self._secrets = set()
+        self._lock = threading.Lock()
+        self._file = None
+        if self.mode == "record":
+            self._open_for_writing()
+        else:
+            self.load()
+        atexit.register(self.close)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            if self.mode == "replay":
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if "request" in entry:
+                        self._index(entry)
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            # An interrupted recording still replays up to the last complete line
+            logging.warning(f"Cassette {self.path} is truncated ({e}); using {len(self.entries)} interactions")
+        logging.info(f"Loaded {len(self.entries)} interactions from cassette {self.path} ({self.mode})")
+
+    def _index(self, entry):
+        entry["_used"] = False
+        self.entries.append(entry)
+        self._exact.setdefault(entry["match"], []).append(entry)
+        self._loose.setdefault(entry["loose"], []).append(entry)
+
+    def _request_fields(self, request):
+        body = request.body
+        if isinstance(body, bytes):
+            try:
+                body = body.decode("utf-8")
+            except UnicodeDecodeError:
+                body = hashlib.sha1(body).hexdigest()
+        body = scrub_body(body, request.headers.get("Content-Type", "")) if body else None
+        url = scrub_url(request.url)
+        return url, body
+
+    def play(self, request):
+        """The next recorded response for ``request``, or None."""
+        url, body = self._request_fields(request)
+        exact, loose = _match_keys(request.method, url, body)
+        indexes = (self._exact.get(exact),) if self.mode == "cache" else (self._exact.get(exact), self._loose.get(loose))
+        with self._lock:
+            for candidates in indexes:
+                if not candidates:
+                    continue
+                entry = next((e for e in candidates if not e["_used"]), candidates[-1])
+                entry["_used"] = True
+                self.hits += 1
+                return entry
+            self.misses += 1
+        return None
+
+    def record(self, request, response):
+        if response.status_code in self.skip_statuses:
+            # Throttling and gateway errors are retried by http_client; replaying them would only add back-off
+            return
+        for name, value in request.headers.items():
+            if name.lower() in SECRET_HEADERS:
+                self._remember_secret(value)
+        url, body = self._request_fields(request)
+        exact, loose = _match_keys(request.method, url, body)
+        response_body = response.content
+        if response_body:
+            try:
+                response_body = scrub_body(response_body.decode("utf-8"), response.headers.get("Content-Type", ""))
+            except UnicodeDecodeError:
+                pass
+        entry = {
+            "match": exact,
+            "loose": loose,
+            "recorded_at": round(time.time(), 3),
+            "request": dict({"method": request.method, "url": url,
+                             "headers": scrub_headers(request.headers)}, **({"body": body} if body else {})),
+            "response": dict({"status": response.status_code, "reason": response.reason,
+                              "headers": scrub_headers({k: v for k, v in response.headers.items()
+                                                        if k.lower() not in DROPPED_RESPONSE_HEADERS})},
+                             **_encode_body(response_body)),
+        }
+        line = self._scrub_literals(json.dumps(entry, separators=(",", ":")))
+        with self._lock:
+            if self._file is None:
+                self._open_for_writing()
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+    def _remember_secret(self, value):
+        value = str(value)
+        if value.lower().startswith("bearer "):
+            value = value[7:]
+        if len(value) >= MIN_SECRET_LENGTH:
+            self._secrets.add(value)
+
+    def _scrub_literals(self, text):
+        for secret in self._secrets:
+            text = text.replace(secret, SCRUBBED)
+        return text
+
+    def _open_for_writing(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fresh = self.mode == "record" or not os.path.exists(self.path)
+        # Appending adds a gzip member; readers see one continuous stream
+        self._file = gzip.open(self.path, "wt" if fresh else "at", encoding="utf-8")
+        if fresh:
+            header = {"cassette": CASSETTE_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self._file.write(json.dumps(header) + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logging.info(f"Cassette {self.path}: {self.recorded} interactions recorded")
+
+    def stats(self):
+        return {"path": self.path, "mode": self.mode, "interactions": len(self.entries),
+                "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+def build_response(entry, request):
+    """A ``requests.Response`` carrying a recorded response."""
+    recorded = entry["response"]
+    content = _decode_body(recorded)
+    response = requests.Response()
+    response.status_code = recorded["status"]
+    response.reason = recorded.get("reason")
+    response.headers = CaseInsensitiveDict(recorded.get("headers", {}))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.raw = io.BytesIO(content)
+    response._content = content
+    response._content_consumed = True
+    response.from_cassette = True
+    return response
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter that answers from, and records into, a cassette."""
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode != "record":
+            entry = self.cassette.play(request)
+            if entry is not None:
+                return build_response(entry, request)
+            if self.cassette.mode == "replay":
+                raise CassetteMiss(f"No recording of {request.method} {scrub_url(request.url)} in {self.cassette.path}",
+                                   request=request)
+        response = super().send(request, **kwargs)
+        # Reading the body here means a streamed download is buffered while recording
+        self.cassette.record(request, response)
+        return response
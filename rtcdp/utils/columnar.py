@@ -0,0 +1,119 @@
+# rtcdp/utils/columnar.py
+
+import os
+import csv
+import json
+import logging
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to CSV output
+    pa = None
+    pq = None
+
+ROW_GROUP_SIZE = 10000
+
+
+def _column_type(types):
+    if types <= {bool}:
+        return "bool"
+    if types <= {int}:
+        return "int"
+    if types <= {int, float}:
+        return "float"
+    return "string"
+
+
+class ColumnarWriter:
+    """
+    Streams flat records to a Parquet file (or CSV when pyarrow isn't installed).
+
+    Records are spooled to a temporary NDJSON file while the column set and
+    types are discovered, then written out in row groups on ``close()``, so
+    memory stays bounded no matter how many records are written or how much
+    the columns vary between them.
+    """
+
+    def __init__(self, path, row_group_size=ROW_GROUP_SIZE):
+        self.format = "parquet" if path.endswith(".parquet") and pq is not None else "csv"
+        if path.endswith(".parquet") and self.format == "csv":
+            logging.warning("pyarrow is not installed; writing CSV instead of Parquet.")
+            path = path[: -len(".parquet")] + ".csv"
+        self.path = path
+        self.row_group_size = row_group_size
+        self.columns = {}
+        self.rows = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._spool = tempfile.NamedTemporaryFile("w+", suffix=".ndjson", dir=directory, delete=False)
+
+    def write(self, records):
+        for record in records:
+            for key, value in record.items():
+                if value is not None:
+                    self.columns.setdefault(key, set()).add(type(value))
+                else:
+                    self.columns.setdefault(key, set())
+            self._spool.write(json.dumps(record, default=str) + "\n")
+            self.rows += 1
+
+    def _read_spool(self):
+        self._spool.seek(0)
+        batch = []
+        for line in self._spool:
+            batch.append(json.loads(line))
+            if len(batch) >= self.row_group_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _write_parquet(self):
+        types = {name: _column_type(seen) for name, seen in self.columns.items()}
+        arrow_types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "string": pa.string()}
+        schema = pa.schema([(name, arrow_types[kind]) for name, kind in types.items()])
+
+        def cast(value, kind):
+            if value is None:
+                return None
+            if kind == "string" and not isinstance(value, str):
+                return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+            if kind == "float":
+                return float(value)
+            return value
+
+        with pq.ParquetWriter(self.path, schema) as writer:
+            for batch in self._read_spool():
+                columns = {name: [cast(row.get(name), kind) for row in batch] for name, kind in types.items()}
+                writer.write_table(pa.table(columns, schema=schema))
+
+    def _write_csv(self):
+        with open(self.path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.columns), restval="")
+            writer.writeheader()
+            for batch in self._read_spool():
+                writer.writerows(batch)
+
+    def close(self):
+        try:
+            if self.format == "parquet":
+                self._write_parquet()
+            else:
+                self._write_csv()
+        finally:
+            self._spool.close()
+            os.remove(self._spool.name)
+        logging.info(f"Wrote {self.rows} rows, {len(self.columns)} columns to {self.path}")
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+            os.remove(self._spool.name)
@@ -0,0 +1,132 @@
+# rtcdp/utils/http_client.py
+
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from rtcdp.utils import metrics
+
+POOL_SIZE = 16
+MAX_RETRIES = 3
+RETRY_STATUSES = (429, 502, 503, 504)
+# A 429 was rejected before any work was done; a gateway error on a POST/PATCH may already have been applied
+THROTTLE_STATUSES = (429,)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+BACKOFF_SECONDS = 1.0
+# Record/replay every request through a cassette (see rtcdp.utils.cassette)
+CASSETTE_ENV = "RTCDP_CASSETTE"
+CASSETTE_MODE_ENV = "RTCDP_CASSETTE_MODE"
+
+_session = None
+_session_lock = threading.Lock()
+_cassette = None
+
+
+def get_session():
+    """Return the process-wide pooled session so concurrent calls reuse TLS connections."""
+    global _session, _cassette
+    with _session_lock:
+        if _session is None:
+            if _cassette is None and os.environ.get(CASSETTE_ENV):
+                from rtcdp.utils.cassette import Cassette
+                _cassette = Cassette(os.environ[CASSETTE_ENV], os.environ.get(CASSETTE_MODE_ENV) or None,
+                                     skip_statuses=RETRY_STATUSES)
+            if _cassette is not None:
+                from rtcdp.utils.cassette import CassetteAdapter
+                adapter = CassetteAdapter(_cassette, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            else:
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def use_cassette(path, mode=None):
+    """
+    Send every later request through the cassette at ``path`` (``None`` goes
+    back to the network). ``mode`` is record, replay or cache; by default an
+    existing cassette is replayed and a missing one recorded. Returns the cassette.
+    """
+    global _session, _cassette
+    with _session_lock:
+        if _cassette is not None:
+            _cassette.close()
+        if path is None:
+            _cassette = None
+        else:
+            from rtcdp.utils.cassette import Cassette
+            _cassette = Cassette(path, mode, skip_statuses=RETRY_STATUSES)
+        if _session is not None:
+            _session.close()
+        _session = None
+    return _cassette
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return BACKOFF_SECONDS * (2 ** attempt)
+
+
+def request(method, url, max_retries=MAX_RETRIES, retry_unsafe=False, **kwargs):
+    """
+    Send a request through the shared session, backing off on throttling and gateway errors.
+
+    Gateway errors (502/503/504) are only retried for idempotent methods: a
+    POST or PATCH that timed out at the gateway may still have been applied,
+    and repeating it could create a second job or apply a patch twice. Those
+    are retried on 429 only, unless the caller knows the call is safe to
+    repeat (e.g. a read-only lookup POST) and passes ``retry_unsafe=True``.
+
+    The whole call, retries and back-off included, is timed into the
+    per-endpoint latency histograms in ``rtcdp.utils.metrics``. Responses
+    replayed from a cassette are left out; their latency says nothing.
+    """
+    session = get_session()
+    retry_statuses = RETRY_STATUSES if retry_unsafe or method.upper() in IDEMPOTENT_METHODS else THROTTLE_STATUSES
+    sandbox = (kwargs.get("headers") or {}).get("x-sandbox-name")
+    started = time.perf_counter()
+    throttled = 0
+    status = "error"
+    replayed = False
+    try:
+        for attempt in range(max_retries + 1):
+            response = session.request(method, url, **kwargs)
+            status = response.status_code
+            replayed = getattr(response, "from_cassette", False)
+            throttled += status == 429
+            if status not in retry_statuses or attempt == max_retries:
+                return response
+            delay = _retry_delay(response, attempt)
+            logging.warning(f"{method} {url} returned {status}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+        return response
+    finally:
+        if not replayed:
+            metrics.registry.observe(method, url, status, time.perf_counter() - started,
+                                     sandbox=sandbox, retries=attempt, throttled=throttled)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
@@ -0,0 +1,254 @@
+# rtcdp/utils/metrics.py
+
+"""
+Per-endpoint HTTP latency histograms.
+
+Every call made through ``http_client.request`` is recorded under
+``(method, endpoint template, sandbox, status)``. The endpoint template is the URL
+path with IDs collapsed, e.g. ``/data/foundation/catalog/dataSets/{id}``.
+Each observation costs a bisect and a few additions under a lock.
+
+Observations accumulate in memory. ``flush()`` merges them into
+``logs/metrics/http.json`` and rewrites the OpenMetrics file next to it. It
+runs at process exit and after each daemon command, so ``rtcdp metrics
+summary`` shows every run.
+"""
+
+import os
+import re
+import json
+import atexit
+import bisect
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit, unquote
+
+try:
+    import fcntl
+except ImportError:  # Windows: merges aren't serialized across processes
+    fcntl = None
+
+METRICS_DIR = os.path.join("logs", "metrics")
+STATE_FILE = "http.json"
+OPENMETRICS_FILE = "http.prom"
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LABELS = ("method", "endpoint", "sandbox", "status")
+
+_ID_SEGMENT = re.compile(
+    r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"  # UUID
+    r"|[0-9a-fA-F]{24,}"                                                               # Mongo-style / hex IDs
+    r"|\d+"                                                                            # numeric
+    r"|(?:https?|urn):.*"                                                              # schema $id / URN
+    r"|_?[\w]+\.(?:schemas|mixins|classes|datatypes|fieldgroups)\.[\w]+)$"             # registry altId
+)
+
+
+@lru_cache(maxsize=4096)
+def endpoint_template(url):
+    """``https://platform.adobe.io/data/x/batches/5f1.../files?start=0`` -> ``/data/x/batches/{id}/files``."""
+    path = urlsplit(url).path
+    parts = [("{id}" if _ID_SEGMENT.match(unquote(p)) else p) for p in path.split("/")]
+    return "/".join(parts) or "/"
+
+
+def _quantile(bounds, counts, total, q):
+    """Estimate a quantile by linear interpolation inside the histogram bucket that holds it."""
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(list(bounds) + [None], counts):
+        if count and cumulative + count >= rank:
+            if bound is None:
+                return lower  # +Inf bucket: best we can say is "at least the last bound"
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound if bound is not None else lower
+    return lower
+
+
+class RequestMetrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _empty(self):
+        return {"buckets": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0, "max": 0.0,
+                "retries": 0, "throttled": 0}
+
+    def observe(self, method, url, status, seconds, sandbox=None, retries=0, throttled=0):
+        key = (method.upper(), endpoint_template(url), sandbox or "", str(status))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self._empty()
+            series["buckets"][index] += 1
+            series["count"] += 1
+            series["sum"] += seconds
+            series["max"] = max(series["max"], seconds)
+            series["retries"] += retries
+            series["throttled"] += throttled
+
+    def __len__(self):
+        return len(self._series)
+
+    def take(self):
+        """Return the current series and start over (used when flushing to disk)."""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def series(self):
+        with self._lock:
+            return {key: dict(value, buckets=list(value["buckets"])) for key, value in self._series.items()}
+
+    # Persistence -----------------------------------------------------------
+
+    @staticmethod
+    def _encode(series):
+        return [dict(zip(LABELS, key), **value) for key, value in series.items()]
+
+    @staticmethod
+    def _decode(rows):
+        return {tuple(row[label] for label in LABELS): {k: v for k, v in row.items() if k not in LABELS}
+                for row in rows}
+
+    def merge(self, series):
+        with self._lock:
+            for key, value in series.items():
+                mine = self._series.get(key)
+                if mine is None:
+                    mine = self._series[key] = self._empty()
+                mine["buckets"] = [a + b for a, b in zip(mine["buckets"], value["buckets"])]
+                for field in ("count", "sum", "retries", "throttled"):
+                    mine[field] += value[field]
+                mine["max"] = max(mine["max"], value["max"])
+
+
+def load(metrics_dir=METRICS_DIR):
+    """Cumulative metrics recorded by every flushed process."""
+    stored = RequestMetrics()
+    path = os.path.join(metrics_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            state = json.load(f)
+        if tuple(state.get("buckets", ())) == stored.buckets:
+            stored.merge(RequestMetrics._decode(state.get("series", [])))
+    return stored
+
+
+def flush(metrics_dir=METRICS_DIR):
+    """Merge this process's observations into the on-disk totals and rewrite the OpenMetrics file."""
+    pending = registry.take()
+    if not pending:
+        return 0
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(os.path.join(metrics_dir, ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        totals = load(metrics_dir)
+        totals.merge(pending)
+        tmp = os.path.join(metrics_dir, f"{STATE_FILE}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"buckets": totals.buckets, "series": RequestMetrics._encode(totals.series())}, f)
+        os.replace(tmp, os.path.join(metrics_dir, STATE_FILE))
+        write_openmetrics(totals, os.path.join(metrics_dir, OPENMETRICS_FILE))
+    return len(pending)
+
+
+def reset(metrics_dir=METRICS_DIR):
+    registry.take()
+    for name in (STATE_FILE, OPENMETRICS_FILE):
+        path = os.path.join(metrics_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Export --------------------------------------------------------------------
+
+def _label_text(labels):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels)
+    return ",".join(f'{name}="{value}"' for name, value in zip(LABELS, escaped))
+
+
+def to_openmetrics(metrics):
+    lines = [
+        "# TYPE rtcdp_http_request_duration_seconds histogram",
+        "# UNIT rtcdp_http_request_duration_seconds seconds",
+        "# HELP rtcdp_http_request_duration_seconds Latency of AEP calls made through the kit, retries included.",
+    ]
+    series = sorted(metrics.series().items())
+    for key, value in series:
+        labels = _label_text(key)
+        cumulative = 0
+        for bound, count in zip(list(metrics.buckets) + ["+Inf"], value["buckets"]):
+            cumulative += count
+            lines.append(f'rtcdp_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"rtcdp_http_request_duration_seconds_count{{{labels}}} {value['count']}")
+        lines.append(f"rtcdp_http_request_duration_seconds_sum{{{labels}}} {value['sum']:.6f}")
+    for name, field, help_text in (("rtcdp_http_retries", "retries", "Retried attempts (429 and gateway errors)."),
+                                   ("rtcdp_http_throttled", "throttled", "Attempts answered with 429.")):
+        lines += [f"# TYPE {name} counter", f"# HELP {name} {help_text}"]
+        lines += [f"{name}_total{{{_label_text(key)}}} {value[field]}" for key, value in series]
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_openmetrics(metrics, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(to_openmetrics(metrics))
+    os.replace(tmp, path)
+    return path
+
+
+def summary(metrics):
+    """One row per endpoint series with call counts, error/throttle counts and latency percentiles (ms)."""
+    rows = []
+    for key, value in metrics.series().items():
+        row = dict(zip(LABELS, key))
+        row.update(calls=value["count"], retries=value["retries"], throttled=value["throttled"],
+                   mean_ms=round(1000 * value["sum"] / value["count"], 1) if value["count"] else None,
+                   max_ms=round(1000 * value["max"], 1))
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            estimate = _quantile(metrics.buckets, value["buckets"], value["count"], q)
+            # Interpolation can overshoot inside a wide bucket; the true max is a hard ceiling
+            row[name] = round(1000 * min(estimate, value["max"]), 1) if estimate is not None else None
+        rows.append(row)
+    return sorted(rows, key=lambda r: (-(r["calls"] * (r["mean_ms"] or 0)), r["endpoint"]))
+
+
+def serve(port=9464, host="127.0.0.1", metrics_dir=METRICS_DIR):
+    """Serve ``/metrics`` (flushed totals plus this process's live series) until interrupted."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            current = load(metrics_dir)
+            current.merge(registry.series())
+            body = to_openmetrics(current).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+registry = RequestMetrics()
+atexit.register(flush)
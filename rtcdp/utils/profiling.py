@@ -0,0 +1,222 @@
+# rtcdp/utils/profiling.py
+
+"""
+Opt-in profiling for any kit command.
+
+``profiled(tag)`` runs a block under cProfile and a stack sampler. With
+``memory=True`` it also diffs ``tracemalloc`` snapshots taken before and
+after the block. Each run writes to ``logs/profiles/<tag>-<timestamp>.*``:
+
+    .pstats   cProfile data (``python -m pstats``, snakeviz)
+    .folded   sampled stacks in collapsed format (flamegraph.pl, speedscope, inferno)
+    .txt      wall time, top functions by cumulative time, allocation diff
+
+The headless CLI enables it with ``--profile``/``--profile-memory``. For the
+interactive menus, ``python main.py --profile`` calls ``install_interactive()``:
+every stretch of work between two prompts is profiled as its own command,
+and time spent waiting for input is left out.
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import atexit
+import builtins
+import cProfile
+import pstats
+import logging
+import threading
+import contextlib
+from collections import Counter
+
+PROFILE_DIR = os.path.join("logs", "profiles")
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+# Interactive mode skips stretches shorter than this (menu redraws, typos)
+MIN_INTERACTIVE_SECONDS = 0.25
+# Innermost frames of a thread parked on a lock, queue or listening socket: (file, function)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("thread.py", "_worker"),   # concurrent.futures worker waiting for its next task
+}
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class StackSampler:
+    """
+    Samples the profiled command's stacks at a fixed interval into collapsed-stack counts.
+
+    Only the thread that called ``start()`` and threads started afterwards (the
+    command's pools) are sampled, so a daemon's accept loop or a metrics server
+    doesn't fill the flame graph. Samples of a thread parked in ``IDLE_FRAMES``
+    are dropped as well.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ignored = set()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, thread in threading._active.items():
+                names[ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self._ignored or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._ignored = set(sys._current_frames()) - {threading.get_ident()}
+        self._thread = threading.Thread(target=self._run, name="rtcdp-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, tag, memory=False, output_dir=PROFILE_DIR):
+        self.tag = re.sub(r"[^\w.-]+", "_", tag).strip("_") or "command"
+        self.memory = memory
+        self.output_dir = output_dir
+        self._profile = cProfile.Profile()
+        self._sampler = StackSampler()
+        self._snapshot = None
+        self._started = None
+        self.elapsed = None
+
+    def start(self):
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def halt(self):
+        """Stop collecting without writing anything; returns the elapsed seconds."""
+        self._profile.disable()
+        self._sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+        return self.elapsed
+
+    def discard(self):
+        self.halt()
+        if self.memory:
+            import tracemalloc
+            tracemalloc.stop()
+
+    def stop(self):
+        """Stop collecting and write the profile; returns the output paths."""
+        self.halt()
+        memory_report = self._memory_report() if self.memory else ""
+        paths = self._write(memory_report)
+        print(f"⏱️ {self.tag}: {self.elapsed:.2f}s — profile saved to {paths['summary']}", file=sys.stderr)
+        return paths
+
+    def _memory_report(self):
+        import tracemalloc
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(self._snapshot.filter_traces(filters), "lineno")
+        lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB",
+                 f"Net change: {sum(d.size_diff for d in diff) / 1024 / 1024:+.1f} MiB",
+                 f"Top {TOP_ALLOCATIONS} allocation sites by growth:"]
+        lines += [f"  {d}" for d in diff[:TOP_ALLOCATIONS]]
+        return "\n".join(lines)
+
+    def _write(self, memory_report):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.tag}-{time.strftime('%Y%m%d-%H%M%S')}")
+        paths = {"pstats": f"{base}.pstats", "folded": f"{base}.folded", "summary": f"{base}.txt"}
+        self._profile.dump_stats(paths["pstats"])
+        self._sampler.write(paths["folded"])
+
+        stats_text = io.StringIO()
+        pstats.Stats(self._profile, stream=stats_text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(paths["summary"], "w") as f:
+            f.write(f"Command: {self.tag}\nWall time: {self.elapsed:.3f}s\n"
+                    f"Samples: {sum(self._sampler.stacks.values())} every {SAMPLE_INTERVAL * 1000:.0f}ms\n\n")
+            f.write(stats_text.getvalue())
+            if memory_report:
+                f.write("\n" + memory_report + "\n")
+        logging.info(f"Profile for {self.tag} ({self.elapsed:.2f}s) written to {base}.*")
+        return paths
+
+
+@contextlib.contextmanager
+def profiled(tag, memory=False, output_dir=PROFILE_DIR):
+    """Profile the enclosed block; the summary path is printed to stderr when it ends."""
+    profiler = Profiler(tag, memory, output_dir).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def install_interactive(memory=False, min_seconds=MIN_INTERACTIVE_SECONDS, output_dir=PROFILE_DIR):
+    """
+    Profile each menu action: work between one ``input()`` returning and the
+    next prompt is one profile, tagged ``<menu function>-<answer>``.
+    """
+    original_input = builtins.input
+    state = {"profiler": None}
+
+    def finish():
+        profiler = state["profiler"]
+        state["profiler"] = None
+        if profiler is None:
+            return
+        if time.perf_counter() - profiler._started < min_seconds:
+            profiler.discard()
+        else:
+            profiler.stop()
+
+    def profiling_input(prompt=""):
+        finish()
+        caller = sys._getframe(1).f_code.co_name
+        answer = original_input(prompt)
+        state["profiler"] = Profiler(f"{caller}-{answer.strip()[:20]}", memory, output_dir).start()
+        return answer
+
+    builtins.input = profiling_input
+    atexit.register(finish)  # The action that quits the menu never reaches another prompt
+    return finish
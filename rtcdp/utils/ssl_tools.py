@@ -5,15 +5,6 @@ import requests
 import logging
 import certifi  # ✅ Added missing import
 
-# Configure logging
-logging.basicConfig(
-    filename="adobe_query.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-print(ssl.OPENSSL_VERSION)
-
 class AdobeSSLServiceTest:
     def __init__(self, credentials_file, environment_name):
         """
@@ -99,6 +90,9 @@ class AdobeSSLServiceTest:
 
 # ✅ **Usage Example**
 if __name__ == "__main__":
+    from rtcdp.core.logger import setup_logging
+    setup_logging("ssl_tools")
+    print(ssl.OPENSSL_VERSION)
     creds_path = os.path.join("CREDS", "rol_credentials.json")  # Update path if needed
     environment_name = "Development"
 
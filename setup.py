@@ -28,6 +28,9 @@ setup(
         "Programming Language :: Python :: 3.12",
     ],
     python_requires=">=3.10",
+    entry_points={
+        "console_scripts": ["rtcdp=rtcdp.cli.headless:main"],
+    },
     include_package_data=True,
     zip_safe=False,
 )